@@ -0,0 +1,414 @@
+"""
+Benchmarks for the memory vector store.
+
+Usage:
+    python benchmark_vector_store.py scaling
+    python benchmark_vector_store.py recall --size 100000
+    python benchmark_vector_store.py batch --size 100000
+    python benchmark_vector_store.py compression --size 100000
+    python benchmark_vector_store.py save --size 100000
+    python benchmark_vector_store.py shards --size 500000
+"""
+
+import argparse
+import tempfile
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from core.memory.vector_store import VectorStore
+from core.memory.sharded_store import ShardedVectorStore
+
+
+def _random_vectors(n: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Generate reproducible random float32 vectors."""
+    rng = np.random.default_rng(seed)
+    return rng.random((n, dimension), dtype=np.float32)
+
+
+def _time_ms(func, repeats: int) -> float:
+    """Return the mean wall time of func() in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def bench_scaling(
+    sizes: List[int],
+    dimension: int = 64,
+    k: int = 20,
+    repeats: int = 200
+) -> List[Dict[str, Any]]:
+    """
+    Measure search latency as the store grows.
+
+    The raw FAISS search time is reported separately from the time spent
+    resolving hits to metadata, which should stay flat with store size.
+
+    Args:
+        sizes: Store sizes to measure
+        dimension: Vector dimension
+        k: Number of results per query
+        repeats: Number of queries per size
+
+    Returns:
+        One row of timings per store size
+    """
+    rows = []
+    queries = _random_vectors(repeats, dimension, seed=1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            store = VectorStore(dimension=dimension, store_path=tmp)
+            store.add_vectors(_random_vectors(size, dimension))
+
+            query_iter = iter(np.tile(queries, (2, 1)))
+            search_ms = _time_ms(lambda: store.search(next(query_iter), k=k), repeats)
+
+            query_iter = iter(np.tile(queries, (2, 1)))
+            index_ms = _time_ms(
+                lambda: store.index.search(next(query_iter)[None, :], k),
+                repeats
+            )
+
+            rows.append({
+                'size': size,
+                'search_ms': search_ms,
+                'index_ms': index_ms,
+                'resolve_ms': max(search_ms - index_ms, 0.0)
+            })
+
+    return rows
+
+
+def _recall_at_k(found: List[int], truth: np.ndarray) -> float:
+    """Fraction of the true top-k neighbours present in found."""
+    return len(set(found) & set(truth.tolist())) / len(truth)
+
+
+def bench_recall(
+    size: int,
+    dimension: int = 64,
+    k: int = 10,
+    num_queries: int = 200,
+    configs: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Measure recall@k against exact search, and query latency, per index type.
+
+    Args:
+        size: Number of vectors in the store
+        dimension: Vector dimension
+        k: Number of results per query
+        num_queries: Number of queries to average over
+        configs: (index_type, search kwargs) pairs to measure
+
+    Returns:
+        One row per configuration
+    """
+    if configs is None:
+        nlist = max(1, int(4 * np.sqrt(size)))
+        configs = [('L2', {})]
+        configs += [(f'IVF{nlist},Flat', {'nprobe': p}) for p in (1, 4, 16, 64)]
+        configs += [('HNSW32', {'ef_search': ef}) for ef in (16, 64, 256)]
+        configs += [('IVF-PQ', {'nprobe': p}) for p in (4, 16, 64)]
+
+    vectors = _random_vectors(size, dimension)
+    queries = _random_vectors(num_queries, dimension, seed=1)
+
+    rows = []
+    stores: Dict[str, VectorStore] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Exact neighbours as ground truth
+        exact = VectorStore(dimension=dimension, store_path=tmp)
+        exact.add_vectors(vectors)
+        _, truth = exact.index.search(queries, k)
+
+        for index_type, search_kwargs in configs:
+            build_s = 0.0
+            if index_type not in stores:
+                start = time.perf_counter()
+                stores[index_type] = VectorStore(
+                    dimension=dimension,
+                    index_type=index_type,
+                    store_path=tmp
+                )
+                stores[index_type].add_vectors(vectors)
+                build_s = time.perf_counter() - start
+            store = stores[index_type]
+
+            recalls = []
+            start = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                results = store.search(query, k=k, **search_kwargs)
+                recalls.append(_recall_at_k([r['vector_id'] for r in results], expected))
+            latency_ms = (time.perf_counter() - start) * 1000 / num_queries
+
+            rows.append({
+                'index_type': index_type,
+                'params': ','.join(f'{key}={value}' for key, value in search_kwargs.items()),
+                'recall': float(np.mean(recalls)),
+                'latency_ms': latency_ms,
+                'build_s': build_s
+            })
+
+    return rows
+
+
+def bench_batch(
+    size: int,
+    dimension: int = 64,
+    index_type: str = 'L2',
+    k: int = 10,
+    batch_sizes: Tuple[int, ...] = (1, 5, 10, 20, 50),
+    repeats: int = 20
+) -> List[Dict[str, Any]]:
+    """
+    Compare per-lookup latency of looped search() against search_batch().
+
+    Args:
+        size: Number of vectors in the store
+        dimension: Vector dimension
+        index_type: Index type of the store
+        k: Number of results per query
+        batch_sizes: Numbers of queries per turn to measure
+        repeats: Number of turns per batch size
+
+    Returns:
+        One row per batch size
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(dimension=dimension, index_type=index_type, store_path=tmp)
+        store.add_vectors(_random_vectors(size, dimension))
+
+        for batch_size in batch_sizes:
+            queries = _random_vectors(batch_size, dimension, seed=batch_size)
+
+            loop_ms = _time_ms(lambda: [store.search(q, k=k) for q in queries], repeats)
+            batch_ms = _time_ms(lambda: store.search_batch(queries, k=k), repeats)
+
+            rows.append({
+                'batch_size': batch_size,
+                'loop_ms_per_query': loop_ms / batch_size,
+                'batch_ms_per_query': batch_ms / batch_size,
+                'speedup': loop_ms / batch_ms
+            })
+
+    return rows
+
+
+def bench_compression(
+    size: int,
+    dimension: int = 64,
+    k: int = 10,
+    num_queries: int = 200,
+    index_types: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Measure memory per vector and recall@k of compressed storage modes,
+    with and without exact re-ranking from the float32 side file.
+
+    Args:
+        size: Number of vectors in the store
+        dimension: Vector dimension
+        k: Number of results per query
+        num_queries: Number of queries to average over
+        index_types: Storage modes to measure
+
+    Returns:
+        One row per storage mode and re-ranking setting
+    """
+    if index_types is None:
+        index_types = ['L2', 'SQfp16', 'SQ8', f'PQ{dimension // 4}', f'PQ{dimension // 8}']
+
+    vectors = _random_vectors(size, dimension)
+    queries = _random_vectors(num_queries, dimension, seed=1)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        exact = VectorStore(dimension=dimension, store_path=tmp)
+        exact.add_vectors(vectors)
+        _, truth = exact.index.search(queries, k)
+
+        for index_type in index_types:
+            for rerank in (False, True):
+                with tempfile.TemporaryDirectory() as store_path:
+                    store = VectorStore(
+                        dimension=dimension,
+                        index_type=index_type,
+                        store_path=store_path,
+                        rerank=rerank
+                    )
+                    store.add_vectors(vectors)
+
+                    start = time.perf_counter()
+                    result = store.search_batch(queries, k=k, include_metadata=False)
+                    latency_ms = (time.perf_counter() - start) * 1000 / num_queries
+
+                    recall = np.mean([
+                        _recall_at_k(found.tolist(), expected)
+                        for found, expected in zip(result.vector_ids, truth)
+                    ])
+                    rows.append({
+                        'index_type': index_type,
+                        'rerank': rerank,
+                        'bytes_per_vector': store.get_stats()['bytes_per_vector'],
+                        'recall': float(recall),
+                        'latency_ms': latency_ms
+                    })
+
+    return rows
+
+
+def bench_save(
+    size: int,
+    dimension: int = 64,
+    turn_sizes: Tuple[int, ...] = (1, 10, 100),
+    repeats: int = 20
+) -> List[Dict[str, Any]]:
+    """
+    Compare the cost of saving one turn's changes against a full checkpoint.
+
+    Args:
+        size: Number of vectors in the store
+        dimension: Vector dimension
+        turn_sizes: Numbers of vectors added per turn
+        repeats: Number of turns per turn size
+
+    Returns:
+        One row per turn size
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(dimension=dimension, store_path=tmp, max_segments=repeats + 1)
+        store.add_vectors(_random_vectors(size, dimension))
+        checkpoint_ms = _time_ms(store.checkpoint, 1)
+
+        for turn_size in turn_sizes:
+            vectors = _random_vectors(turn_size, dimension, seed=turn_size)
+
+            def turn():
+                store.add_vectors(vectors)
+                store.save()
+
+            rows.append({
+                'turn_size': turn_size,
+                'save_ms': _time_ms(turn, repeats),
+                'checkpoint_ms': checkpoint_ms
+            })
+            store.checkpoint()
+
+    return rows
+
+
+def bench_shards(
+    size: int,
+    dimension: int = 64,
+    index_type: str = 'L2',
+    k: int = 10,
+    shard_counts: Tuple[int, ...] = (1, 2, 4, 8),
+    repeats: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Measure single-query search latency as the store is split into shards.
+
+    Args:
+        size: Number of vectors in the store
+        dimension: Vector dimension
+        index_type: Index type of each shard
+        k: Number of results per query
+        shard_counts: Numbers of shards to measure
+        repeats: Number of queries per shard count
+
+    Returns:
+        One row per shard count
+    """
+    vectors = _random_vectors(size, dimension)
+    queries = _random_vectors(repeats, dimension, seed=1)
+
+    rows = []
+    for num_shards in shard_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ShardedVectorStore(
+                num_shards=num_shards,
+                store_path=tmp,
+                dimension=dimension,
+                index_type=index_type
+            )
+            store.add_vectors(vectors)
+
+            query_iter = iter(queries)
+            search_ms = _time_ms(lambda: store.search(next(query_iter), k=k), repeats)
+            store.close()
+
+            rows.append({
+                'num_shards': num_shards,
+                'search_ms': search_ms,
+                'qps': 1000 / search_ms
+            })
+
+    return rows
+
+
+def main() -> None:
+    """Run the selected benchmark and print a report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('benchmark', choices=['scaling', 'recall', 'batch', 'compression', 'save', 'shards'])
+    parser.add_argument('--dimension', type=int, default=64)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=[1_000, 10_000, 100_000, 500_000]
+    )
+    parser.add_argument('--size', type=int, default=100_000)
+    parser.add_argument('--index-type', default='L2')
+    args = parser.parse_args()
+
+    if args.benchmark == 'scaling':
+        print(f"{'size':>10} {'search ms':>10} {'index ms':>10} {'resolve ms':>11}")
+        for row in bench_scaling(args.sizes, args.dimension, args.k):
+            print(
+                f"{row['size']:>10} {row['search_ms']:>10.3f} "
+                f"{row['index_ms']:>10.3f} {row['resolve_ms']:>11.3f}"
+            )
+    elif args.benchmark == 'recall':
+        print(f"{'index':>16} {'params':>14} {'recall@' + str(args.k):>10} {'ms/query':>9} {'build s':>8}")
+        for row in bench_recall(args.size, args.dimension, args.k):
+            print(
+                f"{row['index_type']:>16} {row['params']:>14} {row['recall']:>10.3f} "
+                f"{row['latency_ms']:>9.3f} {row['build_s']:>8.2f}"
+            )
+    elif args.benchmark == 'batch':
+        print(f"{'queries':>8} {'loop ms/q':>10} {'batch ms/q':>11} {'speedup':>8}")
+        for row in bench_batch(args.size, args.dimension, args.index_type, args.k):
+            print(
+                f"{row['batch_size']:>8} {row['loop_ms_per_query']:>10.3f} "
+                f"{row['batch_ms_per_query']:>11.3f} {row['speedup']:>7.1f}x"
+            )
+    elif args.benchmark == 'compression':
+        print(f"{'index':>8} {'rerank':>7} {'bytes/vec':>10} {'recall@' + str(args.k):>10} {'ms/query':>9}")
+        for row in bench_compression(args.size, args.dimension, args.k):
+            print(
+                f"{row['index_type']:>8} {str(row['rerank']):>7} {row['bytes_per_vector']:>10.0f} "
+                f"{row['recall']:>10.3f} {row['latency_ms']:>9.3f}"
+            )
+    elif args.benchmark == 'save':
+        print(f"{'vectors':>8} {'save ms':>9} {'checkpoint ms':>14}")
+        for row in bench_save(args.size, args.dimension):
+            print(
+                f"{row['turn_size']:>8} {row['save_ms']:>9.3f} "
+                f"{row['checkpoint_ms']:>14.1f}"
+            )
+    elif args.benchmark == 'shards':
+        print(f"{'shards':>7} {'search ms':>10} {'qps':>8}")
+        for row in bench_shards(args.size, args.dimension, args.index_type, args.k):
+            print(f"{row['num_shards']:>7} {row['search_ms']:>10.3f} {row['qps']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from .short_term import ShortTermMemory
 from .long_term import LongTermMemory
+from .async_long_term import AsyncLongTermMemory
 from .vector_store import VectorStore
+from .sharded_store import ShardedVectorStore
 
-__all__ = ['ShortTermMemory', 'LongTermMemory', 'VectorStore'] 
\ No newline at end of file
+__all__ = ['ShortTermMemory', 'LongTermMemory', 'AsyncLongTermMemory', 'VectorStore', 'ShardedVectorStore'] 
\ No newline at end of file
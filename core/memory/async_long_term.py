@@ -0,0 +1,275 @@
+"""
+Asynchronous facade for long-term memory.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Union, Iterable, Callable
+
+from .long_term import LongTermMemory, MemoryEntry, DEFAULT_BATCH_SIZE
+
+@dataclass
+class WriteOperation:
+    """A write queued for the writer thread."""
+    method: Callable[..., Any]
+    args: tuple
+    future: Future = field(default_factory=Future)
+
+class AsyncLongTermMemory:
+    """
+    Awaitable long-term memory that keeps SQLite off the event loop.
+    
+    Writes are queued to one writer thread, which coalesces whatever is
+    queued into a single group commit, with a savepoint per write so that
+    one failing write does not undo the others. Reads run on a pool of
+    reader threads, each with its own connection; in WAL mode they do not
+    wait for the writer. Cancelling an awaited read interrupts its query;
+    cancelling a write that has not started drops it from the queue.
+    """
+    
+    def __init__(
+        self,
+        db_path: str = "data/memory.db",
+        memory: Optional[LongTermMemory] = None,
+        readers: int = 4,
+        max_group_size: int = 256
+    ):
+        """
+        Initialize asynchronous long-term memory.
+        
+        Args:
+            db_path: Path to SQLite database file
+            memory: Optional existing LongTermMemory to wrap instead
+            readers: Number of reader threads
+            max_group_size: Maximum number of writes per group commit
+        """
+        self.logger = logging.getLogger(__name__)
+        self.memory = memory or LongTermMemory(db_path)
+        self.max_group_size = max_group_size
+        
+        self._readers = ThreadPoolExecutor(
+            max_workers=readers,
+            thread_name_prefix="memory-reader"
+        )
+        self._writes: "queue.Queue[Optional[WriteOperation]]" = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop,
+            name="memory-writer",
+            daemon=True
+        )
+        self._writer.start()
+        
+        self._stats = {'writes': 0, 'group_commits': 0}
+    
+    async def add(
+        self,
+        content: Any,
+        metadata: Optional[Dict[str, Any]] = None,
+        tags: Optional[List[str]] = None
+    ) -> str:
+        """
+        Add a memory entry; see LongTermMemory.add.
+        
+        Returns:
+            Entry ID
+        """
+        return await self._write(self.memory._add_entry, content, metadata, tags)
+    
+    async def add_many(
+        self,
+        entries: Iterable[Union[MemoryEntry, Dict[str, Any]]],
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> List[str]:
+        """
+        Add or update many memory entries; see LongTermMemory.add_many.
+        
+        Returns:
+            List of entry IDs
+        """
+        return await self._write(self.memory._add_entries, list(entries), batch_size)
+    
+    async def update(
+        self,
+        entry_id: str,
+        content: Optional[Any] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        tags: Optional[List[str]] = None
+    ) -> None:
+        """Update a memory entry; see LongTermMemory.update."""
+        await self._write(self.memory._update_entry, entry_id, content, metadata, tags)
+    
+    async def delete(self, entry_id: str) -> None:
+        """Delete a memory entry; see LongTermMemory.delete."""
+        await self._write(self.memory._delete_entry, entry_id)
+    
+    async def get(self, entry_id: str, include_archive: bool = False) -> Optional[MemoryEntry]:
+        """
+        Get a memory entry; see LongTermMemory.get.
+        
+        Returns:
+            Memory entry if found, None otherwise
+        """
+        return await self._read(self.memory.get, entry_id, include_archive)
+    
+    async def search(
+        self,
+        query: str,
+        tags: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        include_archive: bool = False
+    ) -> List[MemoryEntry]:
+        """
+        Search memory entries; see LongTermMemory.search.
+        
+        Returns:
+            List of matching memory entries, best match first
+        """
+        return await self._read(self.memory.search, query, tags, limit, include_archive)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the memory and the write queue.
+        
+        Returns:
+            Dictionary containing memory statistics
+        """
+        stats = await self._read(self.memory.get_stats)
+        stats.update(self._stats)
+        stats['queued_writes'] = self._writes.qsize()
+        return stats
+    
+    async def _read(self, method: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a read on the reader pool.
+        
+        Args:
+            method: LongTermMemory read method
+            *args: Method arguments
+            
+        Returns:
+            Method result
+        """
+        state: Dict[str, Any] = {}
+        
+        def run() -> Any:
+            state['conn'] = self.memory._get_connection()
+            return method(*args)
+        
+        future = self._readers.submit(run)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Abort the query if it already started on a reader thread
+            conn = state.get('conn')
+            if conn is not None and future.running():
+                conn.interrupt()
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to read memory: {e}")
+            raise
+    
+    async def _write(self, method: Callable[..., Any], *args: Any) -> Any:
+        """
+        Queue a write and wait for its group commit.
+        
+        Args:
+            method: LongTermMemory method writing through a cursor
+            *args: Method arguments after the cursor
+            
+        Returns:
+            Method result
+        """
+        operation = WriteOperation(method=method, args=args)
+        self._writes.put(operation)
+        try:
+            return await asyncio.wrap_future(operation.future)
+        except Exception as e:
+            self.logger.error(f"Failed to write memory entry: {e}")
+            raise
+    
+    def _write_loop(self) -> None:
+        """Apply queued writes in group commits until closed."""
+        while True:
+            operation = self._writes.get()
+            if operation is None:
+                return
+            
+            # Coalesce everything queued behind the first write
+            group = [operation]
+            closing = False
+            while len(group) < self.max_group_size:
+                try:
+                    operation = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if operation is None:
+                    closing = True
+                    break
+                group.append(operation)
+            
+            self._commit_group(group)
+            if closing:
+                return
+    
+    def _commit_group(self, group: List[WriteOperation]) -> None:
+        """
+        Apply a group of writes in one transaction.
+        
+        Futures are resolved only after the commit, so an awaited write is
+        durable when it returns.
+        
+        Args:
+            group: Queued writes
+        """
+        # Skip writes cancelled while queued
+        group = [op for op in group if op.future.set_running_or_notify_cancel()]
+        if not group:
+            return
+        
+        conn = self.memory._get_connection()
+        results = []
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for op in group:
+                cursor.execute("SAVEPOINT write_operation")
+                try:
+                    results.append((op, op.method(cursor, *op.args), None))
+                    cursor.execute("RELEASE write_operation")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write_operation")
+                    cursor.execute("RELEASE write_operation")
+                    results.append((op, None, e))
+            conn.commit()
+        
+        except Exception as e:
+            self.logger.error(f"Failed to commit memory writes: {e}")
+            if conn.in_transaction:
+                conn.rollback()
+            for op in group:
+                op.future.set_exception(e)
+            return
+        
+        self._stats['writes'] += len(group)
+        self._stats['group_commits'] += 1
+        for op, result, error in results:
+            if error is not None:
+                op.future.set_exception(error)
+            else:
+                op.future.set_result(result)
+    
+    async def close(self) -> None:
+        """Finish queued writes, then stop the threads and close connections."""
+        try:
+            self._writes.put(None)
+            await asyncio.get_running_loop().run_in_executor(None, self._writer.join)
+            self._readers.shutdown(wait=True)
+            self.memory.close()
+        
+        except Exception as e:
+            self.logger.error(f"Failed to close async memory: {e}")
+            raise
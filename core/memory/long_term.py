@@ -3,13 +3,92 @@ Long-term memory for persistent storage.
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Iterable, Iterator, Callable
 import json
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 from dataclasses import dataclass
 import sqlite3
 import hashlib
+import threading
+import re
+from itertools import islice
+
+from .serializers import Serializer, get_serializer
+
+# Pragmas applied to every pooled connection. WAL lets readers proceed
+# while a write is in progress; NORMAL sync is durable across application
+# crashes in WAL mode
+CONNECTION_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,  # 16 MB page cache per connection
+    'mmap_size': 268435456,  # 256 MB of the file read through mmap
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000
+}
+
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+
+# Schemas of the hot tier and of the archive database attached to every
+# connection. Both tiers have the same tables
+HOT_SCHEMA = 'main'
+ARCHIVE_SCHEMA = 'archive'
+
+# Memories not updated for this long are moved to the archive by compact
+DEFAULT_RETENTION = timedelta(days=30)
+
+# Full-text index over memories, kept in sync by triggers. The index reads
+# column values from the memories table instead of storing a copy
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.memories_fts USING fts5(
+        content,
+        metadata,
+        content='memories',
+        content_rowid='rowid',
+        prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS {schema}.memories_fts_insert AFTER INSERT ON memories BEGIN
+        INSERT INTO memories_fts (rowid, content, metadata)
+        VALUES (new.rowid, new.content, new.metadata);
+    END;
+    CREATE TRIGGER IF NOT EXISTS {schema}.memories_fts_delete AFTER DELETE ON memories BEGIN
+        INSERT INTO memories_fts (memories_fts, rowid, content, metadata)
+        VALUES ('delete', old.rowid, old.content, old.metadata);
+    END;
+    CREATE TRIGGER IF NOT EXISTS {schema}.memories_fts_update AFTER UPDATE ON memories BEGIN
+        INSERT INTO memories_fts (memories_fts, rowid, content, metadata)
+        VALUES ('delete', old.rowid, old.content, old.metadata);
+        INSERT INTO memories_fts (rowid, content, metadata)
+        VALUES (new.rowid, new.content, new.metadata);
+    END;
+"""
+
+# BM25 weights of the content and metadata columns
+BM25_WEIGHTS = (1.0, 0.5)
+
+# Separator of the tags concatenated into one column of a memory row
+TAG_SEPARATOR = '\x1f'
+
+# Entries written per executemany call by add_many
+DEFAULT_BATCH_SIZE = 1000
+
+# Upsert keeping the creation time of an existing entry. An update, unlike
+# INSERT OR REPLACE, fires the full-text index trigger
+UPSERT_MEMORY_SQL = """
+    INSERT INTO memories (id, content, metadata, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        content = excluded.content,
+        metadata = excluded.metadata,
+        updated_at = excluded.updated_at
+"""
+
+# Column selecting the tags of memory `m` in a tier, read from the tags
+# primary key
+TAGS_COLUMN = """
+    (SELECT group_concat(t.tag, char(31)) FROM {schema}.tags t WHERE t.memory_id = m.id)
+"""
 
 @dataclass
 class MemoryEntry:
@@ -20,57 +99,250 @@ class MemoryEntry:
     created_at: datetime
     updated_at: datetime
     tags: List[str]
+    score: Optional[float] = None
+    snippet: Optional[str] = None
 
 class LongTermMemory:
-    """Manages long-term memory for persistent storage."""
+    """
+    Manages long-term memory for persistent storage.
     
-    def __init__(self, db_path: str = "data/memory.db"):
+    Memories are stored in two tiers: a hot database that reads and
+    searches use by default, and an archive database that compact moves
+    old memories to. Pass include_archive=True to get or search to read
+    both tiers.
+    """
+    
+    def __init__(
+        self,
+        db_path: str = "data/memory.db",
+        archive_path: Optional[str] = None,
+        serializer: Optional[Union[str, Serializer]] = None
+    ):
         """
         Initialize long-term memory.
         
+        Content and metadata are stored as BLOBs of serialized JSON. Rows
+        stored as JSON text by earlier versions are still read.
+        
         Args:
             db_path: Path to SQLite database file
+            archive_path: Optional path to the archive database file,
+                defaults to "<db name>_archive.db" next to db_path
+            serializer: Optional serializer or serializer name ("json" or
+                "orjson"), defaults to orjson if installed
         """
         self.logger = logging.getLogger(__name__)
+        if isinstance(serializer, Serializer):
+            self.serializer = serializer
+        else:
+            try:
+                self.serializer = get_serializer(serializer)
+            except ImportError:
+                self.logger.error(f"Failed to import {serializer}. Please install it.")
+                raise
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        if archive_path:
+            self.archive_path = Path(archive_path)
+        else:
+            self.archive_path = self.db_path.with_name(
+                f"{self.db_path.stem}_archive{self.db_path.suffix}"
+            )
+        self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Background compaction started by schedule_compaction
+        self._compaction_stop = threading.Event()
+        self._compaction_thread: Optional[threading.Thread] = None
+        
+        # One persistent connection per thread, so that readers on other
+        # threads never wait for a connection held by a writer
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
         
         # Initialize database
         self._init_db()
     
+    def _get_connection(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's connection, opening it on first use.
+        
+        Use the connection as a context manager to run a transaction.
+        
+        Returns:
+            SQLite connection
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE
+            )
+            for pragma, value in CONNECTION_PRAGMAS.items():
+                conn.execute(f"PRAGMA {pragma}={value}")
+            conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (str(self.archive_path),))
+            
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        
+        return conn
+    
+    def close(self) -> None:
+        """Stop scheduled compaction and close the connections of all threads."""
+        try:
+            self._compaction_stop.set()
+            if self._compaction_thread is not None:
+                self._compaction_thread.join()
+                self._compaction_thread = None
+            
+            with self._connections_lock:
+                for conn in self._connections:
+                    conn.close()
+                self._connections = []
+            self._local = threading.local()
+            
+        except Exception as e:
+            self.logger.error(f"Failed to close database connections: {e}")
+            raise
+    
     def _init_db(self) -> None:
         """Initialize SQLite database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Create memories table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS memories (
-                        id TEXT PRIMARY KEY,
-                        content TEXT NOT NULL,
-                        metadata TEXT NOT NULL,
-                        created_at TEXT NOT NULL,
-                        updated_at TEXT NOT NULL
-                    )
-                """)
-                
-                # Create tags table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS tags (
-                        memory_id TEXT NOT NULL,
-                        tag TEXT NOT NULL,
-                        PRIMARY KEY (memory_id, tag),
-                        FOREIGN KEY (memory_id) REFERENCES memories (id)
-                    )
-                """)
+                # WAL is persistent in the database file, and can only be
+                # set outside a transaction
+                for schema in (HOT_SCHEMA, ARCHIVE_SCHEMA):
+                    cursor.execute(f"PRAGMA {schema}.journal_mode=WAL")
                 
+                for schema in (HOT_SCHEMA, ARCHIVE_SCHEMA):
+                    self._init_schema(cursor, schema)
                 conn.commit()
             
         except Exception as e:
             self.logger.error(f"Failed to initialize database: {e}")
             raise
     
+    def _init_schema(self, cursor: sqlite3.Cursor, schema: str) -> None:
+        """
+        Create the tables of a tier.
+        
+        Args:
+            cursor: Cursor of the initializing transaction
+            schema: HOT_SCHEMA or ARCHIVE_SCHEMA
+        """
+        # Create memories table
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {schema}.memories (
+                id TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        
+        # Create tags table
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {schema}.tags (
+                memory_id TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (memory_id, tag),
+                FOREIGN KEY (memory_id) REFERENCES memories (id)
+            )
+        """)
+        
+        # Index tag filters and time-ordered queries
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {schema}.idx_tags_tag
+            ON tags (tag, memory_id)
+        """)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {schema}.idx_memories_created_at
+            ON memories (created_at)
+        """)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {schema}.idx_memories_updated_at
+            ON memories (updated_at)
+        """)
+        
+        self._init_fts(cursor, schema)
+    
+    def _init_fts(self, cursor: sqlite3.Cursor, schema: str) -> None:
+        """
+        Create the full-text index, indexing existing memories on creation.
+        
+        Searches fall back to substring matching if SQLite was built
+        without FTS5.
+        
+        Args:
+            cursor: Cursor of the initializing transaction
+            schema: HOT_SCHEMA or ARCHIVE_SCHEMA
+        """
+        cursor.execute(f"""
+            SELECT 1 FROM {schema}.sqlite_master
+            WHERE type = 'table' AND name = 'memories_fts'
+        """)
+        exists = cursor.fetchone() is not None
+        
+        try:
+            cursor.executescript(FTS_SCHEMA.format(schema=schema))
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"Full-text search unavailable, using LIKE: {e}")
+            self.fts_enabled = False
+            return
+        
+        if not exists:
+            self._rebuild_fts(cursor, schema)
+    
+    @staticmethod
+    def _rebuild_fts(cursor: sqlite3.Cursor, schema: str) -> None:
+        """
+        Reindex all memories of a tier in the full-text index.
+        
+        Args:
+            cursor: Cursor of the transaction
+            schema: HOT_SCHEMA or ARCHIVE_SCHEMA
+        """
+        cursor.execute(f"INSERT INTO {schema}.memories_fts (memories_fts) VALUES ('rebuild')")
+    
+    @staticmethod
+    def _split_tags(tags: Optional[str]) -> List[str]:
+        """
+        Split tags selected with TAGS_COLUMN.
+        
+        Args:
+            tags: Concatenated tags, or None if the memory has none
+            
+        Returns:
+            List of tags
+        """
+        return tags.split(TAG_SEPARATOR) if tags else []
+    
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """
+        Convert a search query to an FTS5 match expression.
+        
+        Every word must match; a word ending in "*" matches as a prefix.
+        Words are quoted, so FTS5 operators in the query are not
+        interpreted.
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            FTS5 match expression, empty if the query has no words
+        """
+        terms = []
+        for word, star in re.findall(r'(\w+)(\*?)', query):
+            terms.append(f'"{word}"{star}')
+        return ' '.join(terms)
+    
     def add(
         self,
         content: Any,
@@ -89,93 +361,324 @@ class LongTermMemory:
             Entry ID
         """
         try:
-            # Generate entry ID
-            entry_id = self._generate_entry_id(content, metadata)
+            with self._get_connection() as conn:
+                return self._add_entry(conn.cursor(), content, metadata, tags)
             
-            # Prepare data
-            now = datetime.now().isoformat()
-            metadata = metadata or {}
-            tags = tags or []
+        except Exception as e:
+            self.logger.error(f"Failed to add memory entry: {e}")
+            raise
+    
+    def _add_entry(
+        self,
+        cursor: sqlite3.Cursor,
+        content: Any,
+        metadata: Optional[Dict[str, Any]] = None,
+        tags: Optional[List[str]] = None
+    ) -> str:
+        """
+        Insert a memory entry within the caller's transaction.
+        
+        Args:
+            cursor: Cursor of the transaction
+            content: Entry content
+            metadata: Optional entry metadata
+            tags: Optional list of tags
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+        Returns:
+            Entry ID
+        """
+        # Serialize once, for both the row and the ID
+        content_data = self.serializer.dumps(content)
+        metadata_data = self.serializer.dumps(metadata or {})
+        
+        # Generate entry ID
+        entry_id = self._generate_entry_id(content_data, metadata_data)
+        
+        # Prepare data
+        now = datetime.now().isoformat()
+        tags = tags or []
+        
+        # Insert memory
+        cursor.execute("""
+            INSERT INTO memories (id, content, metadata, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            entry_id,
+            content_data,
+            metadata_data,
+            now,
+            now
+        ))
+        
+        # Insert tags
+        for tag in tags:
+            cursor.execute("""
+                INSERT INTO tags (memory_id, tag)
+                VALUES (?, ?)
+            """, (entry_id, tag))
+        
+        return entry_id
+    
+    def add_many(
+        self,
+        entries: Iterable[Union[MemoryEntry, Dict[str, Any]]],
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> List[str]:
+        """
+        Add or update many memory entries in a single transaction.
+        
+        Entries are written with executemany in batches of batch_size, so
+        an iterable is consumed as a stream. An entry whose ID already
+        exists is updated in place, keeping its creation time, and its
+        tags are replaced.
+        
+        Args:
+            entries: MemoryEntry objects, or dicts with "content" and
+                optional "id", "metadata", "tags", "created_at" and
+                "updated_at" keys
+            batch_size: Entries per executemany call
+            
+        Returns:
+            List of entry IDs
+        """
+        try:
+            with self._get_connection() as conn:
+                return self._add_entries(conn.cursor(), entries, batch_size)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to add memory entries: {e}")
+            raise
+    
+    def _add_entries(
+        self,
+        cursor: sqlite3.Cursor,
+        entries: Iterable[Union[MemoryEntry, Dict[str, Any]]],
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> List[str]:
+        """
+        Upsert memory entries within the caller's transaction.
+        
+        Args:
+            cursor: Cursor of the transaction
+            entries: Entries as accepted by add_many
+            batch_size: Entries per executemany call
+            
+        Returns:
+            List of entry IDs
+        """
+        entry_ids = []
+        entries = iter(entries)
+        
+        while True:
+            batch = list(islice(entries, batch_size))
+            if not batch:
+                break
+            
+            memory_rows = []
+            tag_rows = []
+            for entry in batch:
+                if isinstance(entry, MemoryEntry):
+                    entry = entry.__dict__
                 
-                # Insert memory
-                cursor.execute("""
-                    INSERT INTO memories (id, content, metadata, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
+                content_data = self.serializer.dumps(entry['content'])
+                metadata_data = self.serializer.dumps(entry.get('metadata') or {})
+                entry_id = entry.get('id') or self._generate_entry_id(content_data, metadata_data)
+                created_at = entry.get('created_at') or datetime.now()
+                updated_at = entry.get('updated_at') or created_at
+                
+                memory_rows.append((
                     entry_id,
-                    json.dumps(content),
-                    json.dumps(metadata),
-                    now,
-                    now
+                    content_data,
+                    metadata_data,
+                    self._isoformat(created_at),
+                    self._isoformat(updated_at)
                 ))
-                
-                # Insert tags
-                for tag in tags:
-                    cursor.execute("""
-                        INSERT INTO tags (memory_id, tag)
-                        VALUES (?, ?)
-                    """, (entry_id, tag))
-                
-                conn.commit()
+                tag_rows.extend((entry_id, tag) for tag in entry.get('tags') or [])
+                entry_ids.append(entry_id)
             
-            return entry_id
+            cursor.executemany(UPSERT_MEMORY_SQL, memory_rows)
+            
+            # Replace tags
+            cursor.executemany("""
+                DELETE FROM tags
+                WHERE memory_id = ?
+            """, [(row[0],) for row in memory_rows])
+            cursor.executemany("""
+                INSERT OR IGNORE INTO tags (memory_id, tag)
+                VALUES (?, ?)
+            """, tag_rows)
+        
+        return entry_ids
+    
+    @staticmethod
+    def _isoformat(value: Union[datetime, str]) -> str:
+        """Format a timestamp given as a datetime or ISO string."""
+        return value.isoformat() if isinstance(value, datetime) else str(value)
+    
+    def import_conversations(
+        self,
+        paths: Iterable[Union[str, Path]],
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> int:
+        """
+        Import saved conversation files, such as medical_conversation_*.json.
+        
+        Each turn becomes an entry tagged with its extracted terms, and the
+        conversation insights become one more entry. Files are read one at
+        a time and streamed into add_many. Entry IDs derive from the file
+        name, so importing a file again updates its entries instead of
+        duplicating them.
+        
+        Args:
+            paths: Conversation JSON files
+            batch_size: Entries per executemany call
+            
+        Returns:
+            Number of entries imported
+        """
+        try:
+            entries = (
+                entry
+                for path in paths
+                for entry in self._conversation_entries(Path(path))
+            )
+            return len(self.add_many(entries, batch_size=batch_size))
             
         except Exception as e:
-            self.logger.error(f"Failed to add memory entry: {e}")
+            self.logger.error(f"Failed to import conversations: {e}")
             raise
     
-    def get(self, entry_id: str) -> Optional[MemoryEntry]:
+    def _conversation_entries(self, path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Convert a conversation file into memory entries.
+        
+        Args:
+            path: Conversation JSON file with "conversation", "insights"
+                and "timestamp" keys
+            
+        Yields:
+            Entry dicts for add_many
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            conversation = json.load(f)
+        
+        source = {
+            'source': 'conversation_import',
+            'file': path.name,
+            'conversation_timestamp': conversation.get('timestamp')
+        }
+        
+        for i, turn in enumerate(conversation.get('conversation', [])):
+            terms = turn.get('extracted_terms') or {}
+            yield {
+                'id': f"{path.stem}_turn_{i:04d}",
+                'content': turn.get('text', ''),
+                'metadata': {**source, 'turn': i, 'extracted_terms': terms},
+                'tags': ['conversation'] + sorted({t for values in terms.values() for t in values}),
+                'created_at': turn.get('timestamp') or conversation.get('timestamp')
+            }
+        
+        insights = conversation.get('insights')
+        if insights:
+            yield {
+                'id': f"{path.stem}_insights",
+                'content': insights,
+                'metadata': {**source, 'type': 'insights'},
+                'tags': ['conversation', 'insights'],
+                'created_at': conversation.get('timestamp')
+            }
+    
+    def get(self, entry_id: str, include_archive: bool = False) -> Optional[MemoryEntry]:
         """
         Get a memory entry.
         
         Args:
             entry_id: Entry ID
+            include_archive: Whether to also look in the archive
             
         Returns:
             Memory entry if found, None otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Get memory
-                cursor.execute("""
-                    SELECT content, metadata, created_at, updated_at
-                    FROM memories
-                    WHERE id = ?
-                """, (entry_id,))
-                
-                row = cursor.fetchone()
-                if not row:
-                    return None
-                
-                content, metadata, created_at, updated_at = row
-                
-                # Get tags
-                cursor.execute("""
-                    SELECT tag
-                    FROM tags
-                    WHERE memory_id = ?
-                """, (entry_id,))
-                
-                tags = [row[0] for row in cursor.fetchall()]
+                for schema in self._tiers(include_archive):
+                    # Get memory with its tags
+                    cursor.execute(f"""
+                        SELECT m.id, m.content, m.metadata, m.created_at, m.updated_at,
+                               {TAGS_COLUMN.format(schema=schema)}
+                        FROM {schema}.memories m
+                        WHERE m.id = ?
+                    """, (entry_id,))
+                    
+                    row = cursor.fetchone()
+                    if row:
+                        return self._row_to_entry(row)
                 
-                return MemoryEntry(
-                    id=entry_id,
-                    content=json.loads(content),
-                    metadata=json.loads(metadata),
-                    created_at=datetime.fromisoformat(created_at),
-                    updated_at=datetime.fromisoformat(updated_at),
-                    tags=tags
-                )
+                return None
             
         except Exception as e:
             self.logger.error(f"Failed to get memory entry: {e}")
             raise
     
+    @staticmethod
+    def _tiers(include_archive: bool) -> List[str]:
+        """
+        Get the schemas a read covers.
+        
+        Args:
+            include_archive: Whether the read includes the archive
+            
+        Returns:
+            List of schemas, hot tier first
+        """
+        return [HOT_SCHEMA, ARCHIVE_SCHEMA] if include_archive else [HOT_SCHEMA]
+    
+    def _row_to_entry(
+        self,
+        row: tuple,
+        score: Optional[float] = None,
+        snippet: Optional[str] = None
+    ) -> MemoryEntry:
+        """
+        Convert a selected memory row to a memory entry.
+        
+        Args:
+            row: ID, content, metadata, created_at, updated_at and
+                TAGS_COLUMN values
+            score: Optional search score
+            snippet: Optional search snippet
+            
+        Returns:
+            Memory entry
+        """
+        entry_id, content, metadata, created_at, updated_at, tags = row
+        return MemoryEntry(
+            id=entry_id,
+            content=self._deserialize(content),
+            metadata=self._deserialize(metadata),
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+            tags=self._split_tags(tags),
+            score=score,
+            snippet=snippet
+        )
+    
+    def _deserialize(self, data: Union[bytes, str]) -> Any:
+        """
+        Decode a stored content or metadata value.
+        
+        Args:
+            data: Serialized BLOB, or JSON text stored by earlier versions
+            
+        Returns:
+            Decoded value
+        """
+        if isinstance(data, str):
+            return json.loads(data)
+        return self.serializer.loads(data)
+    
     def update(
         self,
         entry_id: str,
@@ -186,6 +689,8 @@ class LongTermMemory:
         """
         Update a memory entry.
         
+        An archived entry is moved back to the hot tier.
+        
         Args:
             entry_id: Entry ID
             content: Optional new content
@@ -193,168 +698,211 @@ class LongTermMemory:
             tags: Optional new tags
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Get current entry
-                cursor.execute("""
-                    SELECT content, metadata
-                    FROM memories
-                    WHERE id = ?
-                """, (entry_id,))
-                
-                row = cursor.fetchone()
-                if not row:
-                    raise ValueError(f"Memory entry not found: {entry_id}")
-                
-                current_content, current_metadata = row
-                current_content = json.loads(current_content)
-                current_metadata = json.loads(current_metadata)
-                
-                # Update content and metadata
-                if content is not None:
-                    current_content = content
-                if metadata is not None:
-                    current_metadata.update(metadata)
-                
-                # Update memory
-                cursor.execute("""
-                    UPDATE memories
-                    SET content = ?, metadata = ?, updated_at = ?
-                    WHERE id = ?
-                """, (
-                    json.dumps(current_content),
-                    json.dumps(current_metadata),
-                    datetime.now().isoformat(),
-                    entry_id
-                ))
-                
-                # Update tags if provided
-                if tags is not None:
-                    # Remove old tags
-                    cursor.execute("""
-                        DELETE FROM tags
-                        WHERE memory_id = ?
-                    """, (entry_id,))
-                    
-                    # Add new tags
-                    for tag in tags:
-                        cursor.execute("""
-                            INSERT INTO tags (memory_id, tag)
-                            VALUES (?, ?)
-                        """, (entry_id, tag))
-                
-                conn.commit()
+            with self._get_connection() as conn:
+                self._update_entry(conn.cursor(), entry_id, content, metadata, tags)
             
         except Exception as e:
             self.logger.error(f"Failed to update memory entry: {e}")
             raise
     
+    def _update_entry(
+        self,
+        cursor: sqlite3.Cursor,
+        entry_id: str,
+        content: Optional[Any] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        tags: Optional[List[str]] = None
+    ) -> None:
+        """
+        Update a memory entry within the caller's transaction.
+        
+        Args:
+            cursor: Cursor of the transaction
+            entry_id: Entry ID
+            content: Optional new content
+            metadata: Optional new metadata
+            tags: Optional new tags
+        """
+        # Get current entry, moving it back from the archive if it is there
+        select_sql = """
+            SELECT content, metadata
+            FROM memories
+            WHERE id = ?
+        """
+        row = cursor.execute(select_sql, (entry_id,)).fetchone()
+        if not row and self._move_entries(cursor, [entry_id], ARCHIVE_SCHEMA, HOT_SCHEMA):
+            row = cursor.execute(select_sql, (entry_id,)).fetchone()
+        if not row:
+            raise ValueError(f"Memory entry not found: {entry_id}")
+        
+        # Update content and metadata; unchanged values are written back
+        # as stored, without decoding them
+        content_data, metadata_data = row
+        if content is not None:
+            content_data = self.serializer.dumps(content)
+        if metadata is not None:
+            current_metadata = self._deserialize(metadata_data)
+            current_metadata.update(metadata)
+            metadata_data = self.serializer.dumps(current_metadata)
+        
+        # Update memory
+        cursor.execute("""
+            UPDATE memories
+            SET content = ?, metadata = ?, updated_at = ?
+            WHERE id = ?
+        """, (
+            content_data,
+            metadata_data,
+            datetime.now().isoformat(),
+            entry_id
+        ))
+        
+        # Update tags if provided
+        if tags is not None:
+            # Remove old tags
+            cursor.execute("""
+                DELETE FROM tags
+                WHERE memory_id = ?
+            """, (entry_id,))
+            
+            # Add new tags
+            for tag in tags:
+                cursor.execute("""
+                    INSERT INTO tags (memory_id, tag)
+                    VALUES (?, ?)
+                """, (entry_id, tag))
+    
     def delete(self, entry_id: str) -> None:
         """
-        Delete a memory entry.
+        Delete a memory entry from both tiers.
         
         Args:
             entry_id: Entry ID
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Delete tags first
-                cursor.execute("""
-                    DELETE FROM tags
-                    WHERE memory_id = ?
-                """, (entry_id,))
-                
-                # Delete memory
-                cursor.execute("""
-                    DELETE FROM memories
-                    WHERE id = ?
-                """, (entry_id,))
-                
-                conn.commit()
+            with self._get_connection() as conn:
+                self._delete_entry(conn.cursor(), entry_id)
             
         except Exception as e:
             self.logger.error(f"Failed to delete memory entry: {e}")
             raise
     
+    def _delete_entry(self, cursor: sqlite3.Cursor, entry_id: str) -> None:
+        """
+        Delete a memory entry from both tiers within the caller's transaction.
+        
+        Args:
+            cursor: Cursor of the transaction
+            entry_id: Entry ID
+        """
+        for schema in (HOT_SCHEMA, ARCHIVE_SCHEMA):
+            # Delete tags first
+            cursor.execute(f"""
+                DELETE FROM {schema}.tags
+                WHERE memory_id = ?
+            """, (entry_id,))
+            
+            # Delete memory
+            cursor.execute(f"""
+                DELETE FROM {schema}.memories
+                WHERE id = ?
+            """, (entry_id,))
+    
     def search(
         self,
         query: str,
         tags: Optional[List[str]] = None,
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        include_archive: bool = False
     ) -> List[MemoryEntry]:
         """
         Search memory entries.
         
+        Entries are matched through the full-text index and returned in
+        BM25 rank order, with a highlighted snippet of the matching text.
+        Every word of the query must match; a word ending in "*" matches
+        as a prefix, e.g. "medic*". Queries without words are matched as
+        substrings and returned newest first.
+        
         Args:
             query: Search query
             tags: Optional list of tags to filter by
             limit: Optional maximum number of results
+            include_archive: Whether to also search the archive
             
         Returns:
-            List of matching memory entries
+            List of matching memory entries, best match first
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            match = self._fts_query(query) if self.fts_enabled else ''
+            
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Build query
-                sql = """
-                    SELECT DISTINCT m.id, m.content, m.metadata, m.created_at, m.updated_at
-                    FROM memories m
-                """
-                
+                selects = []
                 params = []
-                
-                # Add tag filter if provided
-                if tags:
-                    sql += """
-                        INNER JOIN tags t ON m.id = t.memory_id
-                        WHERE t.tag IN ({})
-                    """.format(','.join(['?'] * len(tags)))
-                    params.extend(tags)
+                for schema in self._tiers(include_archive):
+                    if match:
+                        # Ranked full-text search
+                        sql = f"""
+                            SELECT m.id, m.content, m.metadata, m.created_at, m.updated_at,
+                                   {TAGS_COLUMN.format(schema=schema)},
+                                   bm25(memories_fts, ?, ?) AS rank,
+                                   snippet(memories_fts, -1, '[', ']', '...', 16)
+                            FROM {schema}.memories_fts
+                            INNER JOIN {schema}.memories m ON m.rowid = memories_fts.rowid
+                            WHERE memories_fts MATCH ?
+                        """
+                        params.extend(BM25_WEIGHTS)
+                        params.append(match)
+                    else:
+                        # Substring search, for queries without words or
+                        # without FTS5
+                        sql = f"""
+                            SELECT m.id, m.content, m.metadata, m.created_at, m.updated_at,
+                                   {TAGS_COLUMN.format(schema=schema)},
+                                   NULL AS rank, NULL
+                            FROM {schema}.memories m
+                            WHERE (CAST(m.content AS TEXT) LIKE ?
+                                   OR CAST(m.metadata AS TEXT) LIKE ?)
+                        """
+                        params.extend([f'%{query}%', f'%{query}%'])
+                    
+                    # Add tag filter if provided
+                    if tags:
+                        sql += """
+                            AND m.id IN (
+                                SELECT memory_id FROM {}.tags WHERE tag IN ({})
+                            )
+                        """.format(schema, ','.join(['?'] * len(tags)))
+                        params.extend(tags)
                     
-                    # Add content search
-                    sql += " AND (m.content LIKE ? OR m.metadata LIKE ?)"
-                    params.extend([f'%{query}%', f'%{query}%'])
+                    selects.append(sql)
+                
+                sql = " UNION ALL ".join(selects)
+                if match:
+                    sql += " ORDER BY rank"
                 else:
-                    # Just content search
-                    sql += " WHERE m.content LIKE ? OR m.metadata LIKE ?"
-                    params.extend([f'%{query}%', f'%{query}%'])
+                    sql += " ORDER BY updated_at DESC"
                 
                 # Add limit if provided
                 if limit:
-                    sql += f" LIMIT {limit}"
+                    sql += " LIMIT ?"
+                    params.append(limit)
                 
                 # Execute query
                 cursor.execute(sql, params)
                 
-                # Process results
-                entries = []
-                for row in cursor.fetchall():
-                    entry_id, content, metadata, created_at, updated_at = row
-                    
-                    # Get tags
-                    cursor.execute("""
-                        SELECT tag
-                        FROM tags
-                        WHERE memory_id = ?
-                    """, (entry_id,))
-                    
-                    tags = [row[0] for row in cursor.fetchall()]
-                    
-                    entries.append(MemoryEntry(
-                        id=entry_id,
-                        content=json.loads(content),
-                        metadata=json.loads(metadata),
-                        created_at=datetime.fromisoformat(created_at),
-                        updated_at=datetime.fromisoformat(updated_at),
-                        tags=tags
-                    ))
-                
-                return entries
+                # Process results; BM25 ranks better matches lower, so
+                # report higher is better
+                return [
+                    self._row_to_entry(
+                        row[:6],
+                        score=-row[6] if row[6] is not None else None,
+                        snippet=row[7]
+                    )
+                    for row in cursor.fetchall()
+                ]
             
         except Exception as e:
             self.logger.error(f"Failed to search memory entries: {e}")
@@ -368,7 +916,7 @@ class LongTermMemory:
             Dictionary containing memory statistics
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Get total entries
@@ -383,40 +931,370 @@ class LongTermMemory:
                 cursor.execute("SELECT COUNT(DISTINCT tag) FROM tags")
                 unique_tags = cursor.fetchone()[0]
                 
+                # Get archive entries
+                cursor.execute(f"SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.memories")
+                archived_entries = cursor.fetchone()[0]
+                
                 return {
                     'total_entries': total_entries,
                     'total_tags': total_tags,
                     'unique_tags': unique_tags,
-                    'db_path': str(self.db_path)
+                    'archived_entries': archived_entries,
+                    'hot_bytes': self._tier_bytes(cursor, HOT_SCHEMA),
+                    'archive_bytes': self._tier_bytes(cursor, ARCHIVE_SCHEMA),
+                    'serializer': self.serializer.name,
+                    'db_path': str(self.db_path),
+                    'archive_path': str(self.archive_path)
                 }
             
         except Exception as e:
             self.logger.error(f"Failed to get memory stats: {e}")
             raise
     
+    @staticmethod
+    def _tier_bytes(cursor: sqlite3.Cursor, schema: str) -> int:
+        """
+        Get the bytes in use by a tier, excluding free pages.
+        
+        Args:
+            cursor: Database cursor
+            schema: HOT_SCHEMA or ARCHIVE_SCHEMA
+            
+        Returns:
+            Size in bytes
+        """
+        page_count = cursor.execute(f"PRAGMA {schema}.page_count").fetchone()[0]
+        freelist_count = cursor.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]
+        page_size = cursor.execute(f"PRAGMA {schema}.page_size").fetchone()[0]
+        return (page_count - freelist_count) * page_size
+    
+    def archive(
+        self,
+        older_than: Union[timedelta, datetime] = DEFAULT_RETENTION,
+        summarize: Optional[Callable[[List[MemoryEntry]], Any]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> int:
+        """
+        Move memories not updated recently from the hot tier to the archive.
+        
+        Entries are moved oldest first, one transaction per batch. If
+        summarize is given, it is called with each batch of entries before
+        they are moved, and a result other than None is added to the hot
+        tier as the content of an entry tagged "archive_summary".
+        
+        Args:
+            older_than: Age, or cutoff time, of the last update of entries
+                to archive
+            summarize: Optional function summarizing archived entries
+            batch_size: Entries moved per transaction
+            
+        Returns:
+            Number of entries archived
+        """
+        try:
+            if isinstance(older_than, timedelta):
+                older_than = datetime.now() - older_than
+            return self._archive_before(older_than.isoformat(), summarize, batch_size)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to archive memory entries: {e}")
+            raise
+    
+    def _archive_before(
+        self,
+        cutoff: str,
+        summarize: Optional[Callable[[List[MemoryEntry]], Any]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> int:
+        """
+        Move entries last updated before a cutoff to the archive.
+        
+        Args:
+            cutoff: ISO timestamp
+            summarize: Optional function summarizing archived entries
+            batch_size: Entries moved per transaction
+            
+        Returns:
+            Number of entries archived
+        """
+        # Never reach summaries added by this call
+        cutoff = min(cutoff, datetime.now().isoformat())
+        
+        archived = 0
+        while True:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT m.id, m.content, m.metadata, m.created_at, m.updated_at,
+                           {TAGS_COLUMN.format(schema=HOT_SCHEMA)}
+                    FROM memories m
+                    WHERE m.updated_at < ?
+                    ORDER BY m.updated_at
+                    LIMIT ?
+                """, (cutoff, batch_size))
+                
+                rows = cursor.fetchall()
+                if not rows:
+                    return archived
+                
+                if summarize is not None:
+                    entries = [self._row_to_entry(row) for row in rows]
+                    summary = summarize(entries)
+                    if summary is not None:
+                        self._add_entry(cursor, summary, {
+                            'type': 'archive_summary',
+                            'archived_entries': len(entries),
+                            'first_created_at': min(e.created_at for e in entries).isoformat(),
+                            'last_updated_at': entries[-1].updated_at.isoformat()
+                        }, ['archive_summary'])
+                
+                archived += self._move_entries(
+                    cursor, [row[0] for row in rows], HOT_SCHEMA, ARCHIVE_SCHEMA
+                )
+    
+    @staticmethod
+    def _move_entries(
+        cursor: sqlite3.Cursor,
+        entry_ids: List[str],
+        source: str,
+        target: str
+    ) -> int:
+        """
+        Move entries and their tags between tiers within the caller's
+        transaction.
+        
+        An entry already in the target tier is overwritten. The tiers are
+        separate files, so in WAL mode a crash can leave a moved entry in
+        both; the next move or delete of the entry resolves it.
+        
+        Args:
+            cursor: Cursor of the transaction
+            entry_ids: Entry IDs; IDs not in the source tier are ignored
+            source: Schema to move from
+            target: Schema to move to
+            
+        Returns:
+            Number of entries moved
+        """
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS moving_ids (id TEXT PRIMARY KEY)")
+        cursor.execute("DELETE FROM temp.moving_ids")
+        cursor.executemany("""
+            INSERT OR IGNORE INTO temp.moving_ids (id)
+            VALUES (?)
+        """, [(entry_id,) for entry_id in entry_ids])
+        cursor.execute(f"""
+            DELETE FROM temp.moving_ids
+            WHERE id NOT IN (SELECT id FROM {source}.memories)
+        """)
+        
+        cursor.execute(f"""
+            INSERT INTO {target}.memories (id, content, metadata, created_at, updated_at)
+            SELECT id, content, metadata, created_at, updated_at
+            FROM {source}.memories
+            WHERE id IN (SELECT id FROM temp.moving_ids)
+            ON CONFLICT (id) DO UPDATE SET
+                content = excluded.content,
+                metadata = excluded.metadata,
+                updated_at = excluded.updated_at
+        """)
+        moved = cursor.rowcount
+        
+        # Replace tags
+        cursor.execute(f"""
+            DELETE FROM {target}.tags
+            WHERE memory_id IN (SELECT id FROM temp.moving_ids)
+        """)
+        cursor.execute(f"""
+            INSERT INTO {target}.tags (memory_id, tag)
+            SELECT memory_id, tag
+            FROM {source}.tags
+            WHERE memory_id IN (SELECT id FROM temp.moving_ids)
+        """)
+        
+        # Delete from the source tier
+        cursor.execute(f"""
+            DELETE FROM {source}.tags
+            WHERE memory_id IN (SELECT id FROM temp.moving_ids)
+        """)
+        cursor.execute(f"""
+            DELETE FROM {source}.memories
+            WHERE id IN (SELECT id FROM temp.moving_ids)
+        """)
+        
+        return moved
+    
+    def compact(
+        self,
+        retention: Optional[timedelta] = DEFAULT_RETENTION,
+        max_bytes: Optional[int] = None,
+        summarize: Optional[Callable[[List[MemoryEntry]], Any]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Archive old memories, enforce a size budget and reclaim space.
+        
+        Entries not updated within retention are archived first. If the
+        hot tier still exceeds max_bytes, the oldest entries are archived
+        until the rest is estimated to fit. Tiers with free pages are then
+        vacuumed, which shrinks their files, and analyzed for the query
+        planner. Meant to run periodically, see schedule_compaction.
+        
+        Args:
+            retention: Optional age after which entries are archived
+            max_bytes: Optional size budget of the hot tier
+            summarize: Optional function summarizing archived entries,
+                see archive
+            batch_size: Entries moved per transaction
+            
+        Returns:
+            Dictionary with the number of entries archived and the sizes
+            of both tiers
+        """
+        try:
+            archived = 0
+            if retention is not None:
+                cutoff = (datetime.now() - retention).isoformat()
+                archived += self._archive_before(cutoff, summarize, batch_size)
+            self._vacuum(HOT_SCHEMA)
+            
+            # Measure the budget on the vacuumed tier
+            if max_bytes is not None:
+                cutoff = self._budget_cutoff(max_bytes)
+                if cutoff is not None:
+                    archived += self._archive_before(cutoff, summarize, batch_size)
+                    self._vacuum(HOT_SCHEMA)
+            
+            self._vacuum(ARCHIVE_SCHEMA)
+            
+            cursor = self._get_connection().cursor()
+            return {
+                'archived': archived,
+                'hot_bytes': self._tier_bytes(cursor, HOT_SCHEMA),
+                'archive_bytes': self._tier_bytes(cursor, ARCHIVE_SCHEMA)
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Failed to compact memory: {e}")
+            raise
+    
+    def _budget_cutoff(self, max_bytes: int) -> Optional[str]:
+        """
+        Find the cutoff time that brings the hot tier within a size budget.
+        
+        The bytes of a tier are assumed proportional to the length of its
+        content and metadata.
+        
+        Args:
+            max_bytes: Size budget of the hot tier
+            
+        Returns:
+            ISO timestamp to archive entries before, or None if the hot
+            tier is within budget
+        """
+        cursor = self._get_connection().cursor()
+        tier_bytes = self._tier_bytes(cursor, HOT_SCHEMA)
+        if tier_bytes <= max_bytes:
+            return None
+        
+        cursor.execute("SELECT SUM(length(content) + length(metadata)) FROM memories")
+        data_bytes = cursor.fetchone()[0] or 0
+        
+        # Keep the newest entries whose data fits the scaled budget
+        cursor.execute("""
+            SELECT MIN(updated_at) FROM (
+                SELECT updated_at,
+                       SUM(length(content) + length(metadata))
+                           OVER (ORDER BY updated_at DESC) AS newer_bytes
+                FROM memories
+            )
+            WHERE newer_bytes <= ?
+        """, (data_bytes * max_bytes / tier_bytes,))
+        
+        oldest_kept = cursor.fetchone()[0]
+        return oldest_kept or datetime.now().isoformat()
+    
+    def _vacuum(self, schema: str) -> None:
+        """
+        Vacuum and analyze a tier if it has free pages.
+        
+        VACUUM may renumber the rowids the full-text index refers to, so
+        the index is emptied before and rebuilt after it, even if VACUUM
+        fails; searches of the tier running in between miss matches.
+        
+        Args:
+            schema: HOT_SCHEMA or ARCHIVE_SCHEMA
+        """
+        conn = self._get_connection()
+        if not conn.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]:
+            return
+        
+        if self.fts_enabled:
+            with conn:
+                conn.execute(f"INSERT INTO {schema}.memories_fts (memories_fts) VALUES ('delete-all')")
+        try:
+            conn.execute(f"VACUUM {schema}")
+        finally:
+            if self.fts_enabled:
+                with conn:
+                    self._rebuild_fts(conn.cursor(), schema)
+        conn.execute(f"ANALYZE {schema}")
+        
+        # Truncate the write-ahead log VACUUM went through
+        conn.execute(f"PRAGMA {schema}.wal_checkpoint(TRUNCATE)")
+    
+    def schedule_compaction(
+        self,
+        interval: float,
+        retention: Optional[timedelta] = DEFAULT_RETENTION,
+        max_bytes: Optional[int] = None,
+        summarize: Optional[Callable[[List[MemoryEntry]], Any]] = None
+    ) -> None:
+        """
+        Run compact periodically on a background thread until close.
+        
+        Args:
+            interval: Seconds between compactions
+            retention: Optional age after which entries are archived
+            max_bytes: Optional size budget of the hot tier
+            summarize: Optional function summarizing archived entries
+        """
+        if self._compaction_thread is not None:
+            raise RuntimeError("Compaction is already scheduled")
+        
+        def run() -> None:
+            while not self._compaction_stop.wait(interval):
+                try:
+                    self.compact(retention, max_bytes, summarize)
+                except Exception:
+                    # Logged by compact; retry at the next interval
+                    pass
+        
+        self._compaction_stop.clear()
+        self._compaction_thread = threading.Thread(
+            target=run,
+            name="memory-compaction",
+            daemon=True
+        )
+        self._compaction_thread.start()
+    
     def _generate_entry_id(
         self,
-        content: Any,
-        metadata: Optional[Dict[str, Any]] = None
+        content: bytes,
+        metadata: bytes = b''
     ) -> str:
         """
         Generate a unique entry ID.
         
         Args:
-            content: Entry content
-            metadata: Optional entry metadata
+            content: Serialized entry content
+            metadata: Optional serialized entry metadata
             
         Returns:
             Unique entry ID
         """
         try:
-            # Create hash input
-            hash_input = json.dumps(content)
-            if metadata:
-                hash_input += json.dumps(metadata)
-            
             # Generate hash
-            hash_value = hashlib.md5(hash_input.encode()).hexdigest()
+            hash_value = hashlib.md5(content + metadata).hexdigest()
             
             # Add timestamp
             timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
@@ -2,38 +2,172 @@
 Memory Manager for handling conversation history and long-term memory.
 """
 
+import asyncio
+import itertools
 import logging
-from typing import Dict, Any, List
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Deque
 from datetime import datetime
 
+from .long_term import LongTermMemory
+
+# Token budget of the conversation history, and the tiktoken encoding
+# used to count tokens
+DEFAULT_HISTORY_MAX_TOKENS = 8000
+DEFAULT_HISTORY_ENCODING = "cl100k_base"
+
 class MemoryManager:
-    """Manages conversation history and long-term memory."""
+    """
+    Manages conversation history and long-term memory.
+    
+    The conversation history is a ring buffer bounded by a token budget.
+    Each turn's token count is computed once when it is added; the oldest
+    turns are evicted when the total exceeds the budget, and optionally
+    spilled to long-term memory.
+    """
     
-    def __init__(self, config: Dict[str, Any]):
-        """Initialize the memory manager."""
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        long_term_memory: Optional[LongTermMemory] = None
+    ):
+        """
+        Initialize the memory manager.
+        
+        Args:
+            config: Memory configuration; reads "history_max_tokens",
+                "history_encoding", "spill_to_long_term" and
+                "long_term.storage_path"
+            long_term_memory: Optional long-term memory receiving evicted
+                turns; created from the configuration if spill_to_long_term
+                is set
+        """
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self.conversation_history = []
+        self.max_history_tokens = config.get("history_max_tokens", DEFAULT_HISTORY_MAX_TOKENS)
+        self.conversation_history: Deque[Dict[str, Any]] = deque()
+        self.history_tokens = 0
+        self._turn_seq = itertools.count()
+        
+        self._encoding = self._load_encoding(config.get("history_encoding", DEFAULT_HISTORY_ENCODING))
         
+        self._owns_long_term_memory = long_term_memory is None and config.get("spill_to_long_term", False)
+        if self._owns_long_term_memory:
+            storage_path = config.get("long_term", {}).get("storage_path", "data")
+            long_term_memory = LongTermMemory(str(Path(storage_path) / "memory.db"))
+        self.long_term_memory = long_term_memory
+    
+    def _load_encoding(self, name: str) -> Any:
+        """Load a tiktoken encoding, or None to estimate token counts."""
+        try:
+            import tiktoken
+            return tiktoken.get_encoding(name)
+        except ImportError:
+            self.logger.warning("tiktoken is not installed; estimating token counts")
+            return None
+        except Exception as e:
+            # The encoding is downloaded on first use, which fails offline
+            self.logger.warning(f"Failed to load tiktoken encoding {name}: {e}; estimating token counts")
+            return None
+    
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens of a text, estimating 4 characters per token without tiktoken."""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+    
     async def initialize(self):
         """Initialize the memory system."""
         self.logger.info("Initializing memory manager...")
-        
+    
     async def add_interaction(self, text: str, role: str = "user"):
-        """Add a new interaction to the conversation history."""
-        self.conversation_history.append({
+        """Add a new interaction to the conversation history, evicting the oldest over budget."""
+        now = datetime.now()
+        
+        # Identical turns added at once still get distinct IDs, so they
+        # are not merged when spilled to long-term memory
+        turn = {
+            "id": f"turn_{now.strftime('%Y%m%d%H%M%S%f')}_{next(self._turn_seq)}",
             "text": text,
             "role": role,
-            "timestamp": datetime.now().isoformat()
-        })
+            "timestamp": now.isoformat(),
+            "tokens": self.count_tokens(text)
+        }
+        self.conversation_history.append(turn)
+        self.history_tokens += turn["tokens"]
+        
+        # Always keep the newest turn, even if it alone exceeds the budget
+        evicted = []
+        while self.history_tokens > self.max_history_tokens and len(self.conversation_history) > 1:
+            oldest = self.conversation_history.popleft()
+            self.history_tokens -= oldest["tokens"]
+            evicted.append(oldest)
         
+        if evicted and self.long_term_memory is not None:
+            await self._spill(evicted)
+    
+    async def _spill(self, turns: List[Dict[str, Any]]):
+        """Write evicted turns to long-term memory off the event loop."""
+        entries = [
+            {
+                "id": turn["id"],
+                "content": turn["text"],
+                "metadata": {
+                    "source": "conversation_history",
+                    "role": turn["role"],
+                    "tokens": turn["tokens"]
+                },
+                "tags": ["conversation", turn["role"]],
+                "created_at": turn["timestamp"]
+            }
+            for turn in turns
+        ]
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.long_term_memory.add_many, entries
+            )
+        except Exception as e:
+            # Losing old turns must not fail the current interaction
+            self.logger.error(f"Failed to spill conversation history: {e}")
+    
+    def get_recent_history(self, max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recent turns fitting in a token budget, oldest first.
+        
+        Uses the token counts stored with each turn, so no text is
+        tokenized again.
+        
+        Args:
+            max_tokens: Optional token budget, defaults to the whole history
+            
+        Returns:
+            List of turns
+        """
+        if max_tokens is None:
+            return list(self.conversation_history)
+        
+        turns = []
+        total = 0
+        for turn in reversed(self.conversation_history):
+            total += turn["tokens"]
+            if total > max_tokens:
+                break
+            turns.append(turn)
+        turns.reverse()
+        return turns
+    
     def get_summary(self) -> Dict[str, Any]:
         """Get a summary of the current memory state."""
         return {
             "conversation_length": len(self.conversation_history),
+            "conversation_tokens": self.history_tokens,
+            "max_conversation_tokens": self.max_history_tokens,
             "last_interaction": self.conversation_history[-1] if self.conversation_history else None
         }
     
     async def shutdown(self):
         """Clean up resources."""
-        self.logger.info("Shutting down memory manager...") 
\ No newline at end of file
+        self.logger.info("Shutting down memory manager...")
+        if self._owns_long_term_memory:
+            self.long_term_memory.close()
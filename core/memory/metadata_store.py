@@ -0,0 +1,513 @@
+"""
+SQLite metadata store for the vector store.
+"""
+
+import json
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Set, Tuple
+
+import numpy as np
+
+# SQL comparison for each range or equality operator in `where` filters
+SQL_OPERATORS = {
+    '$eq': '=',
+    '$gt': '>',
+    '$gte': '>=',
+    '$lt': '<',
+    '$lte': '<='
+}
+
+# JSON value types comparable with numeric and with string arguments
+NUMERIC_TYPES = "('integer', 'real', 'true', 'false')"
+TEXT_TYPES = "('text')"
+
+# Maximum number of IDs bound to a single IN (...) clause
+MAX_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    vector_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS indexed_fields (
+    field TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS field_values (
+    field TEXT NOT NULL,
+    value,
+    vector_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_field_values_value ON field_values(field, value);
+CREATE INDEX IF NOT EXISTS idx_field_values_id ON field_values(vector_id);
+"""
+
+def _json_path(field: str) -> str:
+    """Build the JSON path of a top-level metadata field."""
+    return '$."' + field.replace('"', '\\"') + '"'
+
+def _chunks(ids: List[int]) -> Iterator[List[int]]:
+    """Split IDs into batches small enough to bind to one statement."""
+    for start in range(0, len(ids), MAX_BATCH):
+        yield ids[start:start + MAX_BATCH]
+
+class MetadataStore(MutableMapping):
+    """
+    Vector metadata stored as JSON rows in SQLite, keyed by vector ID.
+    
+    Records are read from disk on demand rather than loaded up front.
+    Indexed ("hot") fields also get one row per value in the field_values
+    table, with a B-tree index on (field, value), so that equality and
+    range filters on them are index lookups. Filters on other fields scan
+    the JSON of each record inside SQLite.
+    
+    Writes are not committed until commit() is called. Reads on the same
+    store see uncommitted writes.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        indexed_fields: Optional[List[str]] = None,
+        read_only: bool = False,
+        id_limit: Optional[int] = None
+    ):
+        """
+        Open a metadata store.
+        
+        Args:
+            path: SQLite database file, or None for an in-memory store
+            indexed_fields: Fields to keep in the field_values index
+            read_only: Open an existing database without write access
+            id_limit: For read-only stores, only show records with vector
+                IDs below this limit
+        """
+        self.path = path
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        
+        if path is None:
+            self._conn = sqlite3.connect(':memory:', check_same_thread=False)
+        elif read_only:
+            self._conn = sqlite3.connect(
+                Path(path).resolve().as_uri() + '?mode=ro',
+                uri=True,
+                check_same_thread=False
+            )
+            
+            # Shadow the table with a temporary view of the visible records
+            if id_limit is not None:
+                self._conn.execute(
+                    "CREATE TEMP VIEW metadata AS SELECT * FROM main.metadata "
+                    f"WHERE vector_id < {int(id_limit)}"
+                )
+        else:
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._configure()
+        
+        if not read_only:
+            self._conn.executescript(SCHEMA)
+            self._set_indexed_fields(list(indexed_fields or []))
+        
+        self._indexed = {
+            row[0] for row in self._conn.execute("SELECT field FROM indexed_fields")
+        }
+        self._count = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+    
+    def _configure(self) -> None:
+        """Set pragmas for a database file."""
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+    
+    def _set_indexed_fields(self, fields: List[str]) -> None:
+        """
+        Index newly requested fields from the stored records and drop the
+        index rows of fields no longer requested.
+        
+        Args:
+            fields: Fields to index
+        """
+        current = {
+            row[0] for row in self._conn.execute("SELECT field FROM indexed_fields")
+        }
+        for field in current - set(fields):
+            self._conn.execute("DELETE FROM field_values WHERE field = ?", (field,))
+            self._conn.execute("DELETE FROM indexed_fields WHERE field = ?", (field,))
+        for field in set(fields) - current:
+            self._conn.execute("INSERT INTO indexed_fields (field) VALUES (?)", (field,))
+            self._conn.execute(
+                """
+                INSERT INTO field_values (field, value, vector_id)
+                SELECT ?, j.value, m.vector_id
+                FROM metadata m, json_each(m.data, ?) j
+                WHERE j.type NOT IN ('array', 'object', 'null')
+                """,
+                (field, _json_path(field))
+            )
+        self._conn.commit()
+    
+    def attach(self, path: Path) -> None:
+        """
+        Copy an in-memory store to a database file and continue on the file.
+        
+        Any existing database at the path is replaced.
+        
+        Args:
+            path: SQLite database file
+        """
+        with self._lock:
+            self._conn.commit()
+            disk = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.backup(disk)
+            self._conn.close()
+            self._conn = disk
+            self.path = path
+            self._configure()
+    
+    def commit(self) -> None:
+        """Commit pending writes."""
+        with self._lock:
+            if not self.read_only:
+                self._conn.commit()
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    def __getitem__(self, vector_id: int) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM metadata WHERE vector_id = ?",
+                (int(vector_id),)
+            ).fetchone()
+        if row is None:
+            raise KeyError(vector_id)
+        return json.loads(row[0])
+    
+    def __setitem__(self, vector_id: int, meta: Dict[str, Any]) -> None:
+        self.put_many([(vector_id, meta)])
+    
+    def __delitem__(self, vector_id: int) -> None:
+        if not self.delete_many([vector_id]):
+            raise KeyError(vector_id)
+    
+    def __contains__(self, vector_id: object) -> bool:
+        if not isinstance(vector_id, (int, np.integer)):
+            return False
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM metadata WHERE vector_id = ?",
+                (int(vector_id),)
+            ).fetchone() is not None
+    
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids().tolist())
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def items(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Decode every record in vector ID order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT vector_id, data FROM metadata ORDER BY vector_id"
+            ).fetchall()
+        return ((vector_id, json.loads(data)) for vector_id, data in rows)
+    
+    def ids(self) -> np.ndarray:
+        """
+        Get all vector IDs.
+        
+        Returns:
+            Sorted int64 array of vector IDs
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT vector_id FROM metadata ORDER BY vector_id"
+            ).fetchall()
+        return np.array([row[0] for row in rows], dtype='int64')
+    
+    def max_id(self) -> int:
+        """
+        Get the largest stored vector ID.
+        
+        Returns:
+            Largest vector ID, or -1 if the store is empty
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(vector_id) FROM metadata").fetchone()
+        return -1 if row[0] is None else row[0]
+    
+    def existing(self, vector_ids: Iterable[int]) -> Set[int]:
+        """
+        Find which of the given vector IDs are stored.
+        
+        Args:
+            vector_ids: Vector IDs
+        
+        Returns:
+            Set of stored vector IDs
+        """
+        found = set()
+        with self._lock:
+            for chunk in _chunks([int(i) for i in vector_ids]):
+                found.update(
+                    row[0] for row in self._conn.execute(
+                        f"SELECT vector_id FROM metadata "
+                        f"WHERE vector_id IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    )
+                )
+        return found
+    
+    def get_many(
+        self,
+        vector_ids: Iterable[int],
+        fields: Optional[List[str]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Get the metadata of several vectors.
+        
+        Args:
+            vector_ids: Vector IDs
+            fields: Only extract these fields instead of decoding whole
+                records
+        
+        Returns:
+            Metadata keyed by vector ID, for the IDs that are stored
+        """
+        columns = 'data'
+        if fields is not None:
+            columns = ', '.join(
+                "json_extract(data, ?), json_type(data, ?)" for _ in fields
+            ) or "NULL"
+        paths = [p for field in fields or [] for p in (_json_path(field),) * 2]
+        
+        result = {}
+        with self._lock:
+            for chunk in _chunks([int(i) for i in vector_ids if i >= 0]):
+                rows = self._conn.execute(
+                    f"SELECT vector_id, {columns} FROM metadata "
+                    f"WHERE vector_id IN ({','.join('?' * len(chunk))})",
+                    paths + chunk
+                ).fetchall()
+                for row in rows:
+                    if fields is None:
+                        result[row[0]] = json.loads(row[1])
+                    else:
+                        result[row[0]] = {
+                            field: self._decode(row[1 + 2 * i], row[2 + 2 * i])
+                            for i, field in enumerate(fields)
+                            if row[2 + 2 * i] is not None
+                        }
+        return result
+    
+    @staticmethod
+    def _decode(value: Any, json_type: str) -> Any:
+        """Convert a json_extract result back to the Python value."""
+        if json_type in ('array', 'object'):
+            return json.loads(value)
+        if json_type in ('true', 'false'):
+            return bool(value)
+        return value
+    
+    def put_many(self, items: Iterable[Tuple[int, Dict[str, Any]]]) -> None:
+        """
+        Insert or replace the metadata of several vectors.
+        
+        Values JSON cannot encode are stored as strings.
+        
+        Args:
+            items: (vector ID, metadata) pairs
+        """
+        rows = [
+            (int(vector_id), json.dumps(meta, default=str))
+            for vector_id, meta in items
+        ]
+        ids = [row[0] for row in rows]
+        
+        with self._lock:
+            self._count += len(set(ids)) - len(self.existing(ids))
+            self._unindex(ids)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO metadata (vector_id, data) VALUES (?, ?)",
+                rows
+            )
+            self._index(ids)
+    
+    def delete_many(self, vector_ids: Iterable[int]) -> List[int]:
+        """
+        Delete the metadata of several vectors.
+        
+        Args:
+            vector_ids: Vector IDs
+        
+        Returns:
+            IDs that were stored and deleted
+        """
+        with self._lock:
+            deleted = sorted(self.existing(vector_ids))
+            self._unindex(deleted)
+            for chunk in _chunks(deleted):
+                self._conn.execute(
+                    f"DELETE FROM metadata WHERE vector_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+            self._count -= len(deleted)
+        return deleted
+    
+    def _index(self, vector_ids: List[int]) -> None:
+        """Add the indexed field values of stored records."""
+        if not self._indexed:
+            return
+        for chunk in _chunks(vector_ids):
+            self._conn.execute(
+                f"""
+                INSERT INTO field_values (field, value, vector_id)
+                SELECT f.field, j.value, m.vector_id
+                FROM metadata m, indexed_fields f,
+                     json_each(m.data, '$."' || replace(f.field, '"', '\\"') || '"') j
+                WHERE m.vector_id IN ({','.join('?' * len(chunk))})
+                AND j.type NOT IN ('array', 'object', 'null')
+                """,
+                chunk
+            )
+    
+    def _unindex(self, vector_ids: List[int]) -> None:
+        """Remove the indexed field values of records."""
+        if not self._indexed:
+            return
+        for chunk in _chunks(vector_ids):
+            self._conn.execute(
+                f"DELETE FROM field_values WHERE vector_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+    
+    def match(self, where: Dict[str, Any]) -> Set[int]:
+        """
+        Find the IDs of records whose metadata matches a filter.
+        
+        See VectorStore.match_ids for the filter syntax.
+        
+        Args:
+            where: Metadata filter
+        
+        Returns:
+            Set of matching vector IDs
+        """
+        sql, params = self._where_sql(where)
+        with self._lock:
+            return {
+                row[0] for row in self._conn.execute(
+                    f"SELECT vector_id FROM metadata m WHERE {sql}",
+                    params
+                )
+            }
+    
+    def _where_sql(self, where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """
+        Compile a filter to an SQL condition on the metadata row `m`.
+        
+        Args:
+            where: Metadata filter
+        
+        Returns:
+            SQL condition and its parameters
+        """
+        clauses = []
+        params: List[Any] = []
+        for key, condition in where.items():
+            if key in ('$and', '$or'):
+                parts = [self._where_sql(sub_filter) for sub_filter in condition]
+                joiner = ' AND ' if key == '$and' else ' OR '
+                empty = '1' if key == '$and' else '0'
+                clauses.append('(' + (joiner.join(sql for sql, _ in parts) or empty) + ')')
+                for _, sub_params in parts:
+                    params.extend(sub_params)
+            else:
+                sql, field_params = self._field_sql(key, condition)
+                clauses.append(sql)
+                params.extend(field_params)
+        
+        return ' AND '.join(clauses) or '1', params
+    
+    def _field_sql(self, field: str, condition: Any) -> Tuple[str, List[Any]]:
+        """
+        Compile the operators on one field to an SQL condition.
+        
+        Args:
+            field: Metadata field
+            condition: Value, or dict of operators to values
+        
+        Returns:
+            SQL condition and its parameters
+        """
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        
+        clauses = []
+        params: List[Any] = []
+        for op, arg in condition.items():
+            if op == '$ne':
+                sql, op_params = self._value_sql(field, '$eq', arg)
+                sql = f"NOT {sql}"
+            elif op == '$nin':
+                sql, op_params = self._value_sql(field, '$in', arg)
+                sql = f"NOT {sql}"
+            elif op in SQL_OPERATORS or op == '$in':
+                sql, op_params = self._value_sql(field, op, arg)
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            clauses.append(sql)
+            params.extend(op_params)
+        
+        return '(' + (' AND '.join(clauses) or '0') + ')', params
+    
+    def _value_sql(self, field: str, op: str, arg: Any) -> Tuple[str, List[Any]]:
+        """
+        Compile one operator to an SQL condition that holds if any value of
+        the field satisfies it. A list-valued field matches if any of its
+        elements does; numbers only compare with numbers and strings with
+        strings.
+        
+        Args:
+            field: Metadata field
+            op: Operator name
+            arg: Operator argument
+        
+        Returns:
+            SQL condition and its parameters
+        """
+        if field in self._indexed:
+            # Driven by the (field, value) index rather than a row scan
+            source = "m.vector_id IN (SELECT v.vector_id FROM field_values v WHERE v.field = ?"
+            value, value_type = "v.value", "typeof(v.value)"
+            params: List[Any] = [field]
+        else:
+            source = "EXISTS (SELECT 1 FROM json_each(m.data, ?) j WHERE 1"
+            value, value_type = "j.value", "j.type"
+            params = [_json_path(field)]
+        
+        args = arg if op == '$in' else [arg]
+        numbers = [a for a in args if isinstance(a, (int, float))]
+        strings = [a for a in args if isinstance(a, str)]
+        
+        predicates = []
+        sql_op = 'IN' if op == '$in' else SQL_OPERATORS[op]
+        for values, types in ((numbers, NUMERIC_TYPES), (strings, TEXT_TYPES)):
+            if not values:
+                continue
+            if op == '$in':
+                predicates.append(
+                    f"({value_type} IN {types} AND {value} IN ({','.join('?' * len(values))}))"
+                )
+            else:
+                predicates.append(f"({value_type} IN {types} AND {value} {sql_op} ?)")
+            params.extend(values)
+        
+        if not predicates:
+            return "0", []
+        return f"{source} AND ({' OR '.join(predicates)}))", params
@@ -0,0 +1,65 @@
+"""
+Serializers for memory content and metadata.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+@dataclass(frozen=True)
+class Serializer:
+    """
+    Encodes values to UTF-8 JSON bytes and back.
+    
+    The output must stay UTF-8 JSON: the full-text index and substring
+    searches read stored values as text, and rows written by any JSON
+    serializer can be read by the others.
+    """
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+def _json_serializer() -> Serializer:
+    """Create the standard library serializer."""
+    return Serializer(
+        name='json',
+        dumps=lambda value: json.dumps(value, ensure_ascii=False).encode('utf-8'),
+        loads=json.loads
+    )
+
+def _orjson_serializer() -> Serializer:
+    """Create the orjson serializer."""
+    import orjson
+    
+    return Serializer(
+        name='orjson',
+        # Like json, convert non-string dict keys instead of failing
+        dumps=lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS),
+        loads=orjson.loads
+    )
+
+SERIALIZERS = {
+    'json': _json_serializer,
+    'orjson': _orjson_serializer
+}
+
+def get_serializer(name: Optional[str] = None) -> Serializer:
+    """
+    Get a serializer by name.
+    
+    Args:
+        name: "json" or "orjson"; None selects orjson if it is installed,
+            json otherwise
+        
+    Returns:
+        Serializer
+    """
+    if name is None:
+        try:
+            return _orjson_serializer()
+        except ImportError:
+            return _json_serializer()
+    
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unsupported serializer: {name}")
+    return SERIALIZERS[name]()
@@ -0,0 +1,497 @@
+"""
+Sharded vector store for memory system.
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
+import json
+import time
+import zlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from .vector_store import VectorStore, BatchSearchResult
+
+# Global vector IDs carry the shard number above the shard-local ID
+SHARD_ID_SHIFT = 40
+LOCAL_ID_MASK = (1 << SHARD_ID_SHIFT) - 1
+
+class ShardedVectorStore:
+    """
+    Partitions vectors across several VectorStore shards.
+    
+    Searches fan out to every shard in parallel on a thread pool, since
+    FAISS and SQLite release the GIL while they work, and the per-shard
+    top-k results are merged. Vector IDs are global: the shard number is
+    kept in the high bits, so an ID always leads back to its shard.
+    """
+    
+    def __init__(
+        self,
+        num_shards: int = 4,
+        partition: str = "hash",
+        shard_key: Optional[str] = None,
+        time_window: int = 86400,
+        store_path: str = "data/sharded_vector_store",
+        max_workers: Optional[int] = None,
+        **store_kwargs: Any
+    ):
+        """
+        Initialize sharded vector store.
+        
+        Args:
+            num_shards: Number of shards for hash partitioning
+            partition: "hash" to spread vectors over num_shards shards, by
+                the hash of their shard_key metadata field or round-robin
+                without one; "time" to add vectors to one shard per
+                time_window, starting a new shard for each window
+            shard_key: Metadata field hashed to choose a shard
+            time_window: Length in seconds of a time partition
+            store_path: Path to store the shards
+            max_workers: Threads used for fan-out; defaults to one per shard
+            **store_kwargs: Arguments for each VectorStore shard, such as
+                dimension and index_type
+        """
+        if partition not in ("hash", "time"):
+            raise ValueError(f"Unsupported partition: {partition}")
+        
+        self.logger = logging.getLogger(__name__)
+        self.num_shards = num_shards
+        self.partition = partition
+        self.shard_key = shard_key
+        self.time_window = time_window
+        self.store_path = Path(store_path)
+        self.store_path.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.store_kwargs = store_kwargs
+        
+        # Thread pool for fan-out, sized to the number of shards
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._round_robin = 0
+        
+        # Time window of each shard, for time partitioning
+        self.windows: List[int] = []
+        
+        self.shards: List[VectorStore] = []
+        if partition == "hash":
+            for _ in range(num_shards):
+                self._add_shard()
+    
+    def _add_shard(self) -> VectorStore:
+        """Create the next shard."""
+        shard = VectorStore(
+            store_path=str(self.store_path / f"shard-{len(self.shards):04d}"),
+            **self.store_kwargs
+        )
+        self.shards.append(shard)
+        self.close()
+        return shard
+    
+    def _pool(self) -> ThreadPoolExecutor:
+        """Get the fan-out thread pool, sized for the current shards."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers or max(1, len(self.shards)),
+                thread_name_prefix="vector-shard"
+            )
+        return self._executor
+    
+    @staticmethod
+    def _global_ids(shard: int, local_ids: np.ndarray) -> np.ndarray:
+        """Convert shard-local IDs to global IDs, keeping -1 for empty slots."""
+        return np.where(local_ids >= 0, (shard << SHARD_ID_SHIFT) | local_ids, -1)
+    
+    @staticmethod
+    def _split_id(vector_id: int) -> Tuple[int, int]:
+        """Split a global ID into shard number and shard-local ID."""
+        return vector_id >> SHARD_ID_SHIFT, vector_id & LOCAL_ID_MASK
+    
+    def _group_ids(self, vector_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """Group global IDs by shard as shard-local IDs."""
+        groups: Dict[int, List[int]] = {}
+        for vector_id in vector_ids:
+            if vector_id < 0:
+                continue
+            shard, local_id = self._split_id(int(vector_id))
+            if shard < len(self.shards):
+                groups.setdefault(shard, []).append(local_id)
+        return groups
+    
+    def _choose_shards(self, metadata: List[Dict[str, Any]], count: int) -> np.ndarray:
+        """
+        Choose the shard of each new vector.
+        
+        Args:
+            metadata: Metadata of the vectors, possibly empty
+            count: Number of vectors
+        
+        Returns:
+            Shard number of each vector
+        """
+        if self.partition == "time":
+            window = int(time.time() // self.time_window)
+            if not self.windows or self.windows[-1] != window:
+                self._add_shard()
+                self.windows.append(window)
+            return np.full(count, len(self.shards) - 1)
+        
+        if self.shard_key is not None and metadata:
+            return np.array([
+                zlib.crc32(str(meta.get(self.shard_key)).encode()) % self.num_shards
+                for meta in metadata
+            ])
+        
+        shards = (self._round_robin + np.arange(count)) % self.num_shards
+        self._round_robin = (self._round_robin + count) % self.num_shards
+        return shards
+    
+    def add_vectors(
+        self,
+        vectors: List[List[float]],
+        metadata: Optional[List[Dict[str, Any]]] = None
+    ) -> List[int]:
+        """
+        Add vectors to their shards.
+        
+        Args:
+            vectors: List of vectors to add
+            metadata: Optional list of metadata for vectors
+        
+        Returns:
+            List of global vector IDs
+        """
+        try:
+            vectors = np.array(vectors).astype('float32')
+            shard_of = self._choose_shards(metadata or [], len(vectors))
+            
+            ids = np.empty(len(vectors), dtype='int64')
+            for shard in np.unique(shard_of).tolist():
+                rows = np.flatnonzero(shard_of == shard)
+                local_ids = self.shards[shard].add_vectors(
+                    vectors[rows],
+                    [metadata[i] for i in rows] if metadata else None
+                )
+                ids[rows] = self._global_ids(shard, np.array(local_ids, dtype='int64'))
+            
+            return ids.tolist()
+        
+        except Exception as e:
+            self.logger.error(f"Failed to add vectors to shards: {e}")
+            raise
+    
+    def search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        filter_func: Optional[callable] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search every shard for similar vectors.
+        
+        Args:
+            query_vector: Query vector
+            k: Number of results to return
+            filter_func: Optional function to filter results after search
+            nprobe: Optional IVF lists to visit for this query
+            ef_search: Optional HNSW search depth for this query
+            where: Optional metadata filter applied inside each shard's
+                search; see VectorStore.match_ids for the syntax
+            fields: Optional metadata fields to return instead of the whole
+                metadata of each result
+        
+        Returns:
+            List of results with global vector IDs, distances and metadata
+        """
+        try:
+            result = self.search_batch(
+                np.array([query_vector]),
+                k=k,
+                nprobe=nprobe,
+                ef_search=ef_search,
+                where=where,
+                include_metadata=False
+            )
+            metadata = self._get_metadata(result.vector_ids[0].tolist(), fields)
+            
+            results = []
+            for distance, vector_id in zip(result.distances[0], result.vector_ids[0]):
+                meta = metadata.get(int(vector_id))
+                if meta and (filter_func is None or filter_func(meta)):
+                    results.append({
+                        'vector_id': int(vector_id),
+                        'distance': float(distance),
+                        'metadata': meta
+                    })
+            
+            return results
+        
+        except Exception as e:
+            self.logger.error(f"Failed to search shards: {e}")
+            raise
+    
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        fields: Optional[List[str]] = None
+    ) -> BatchSearchResult:
+        """
+        Search every shard in parallel and merge the top-k of each query.
+        
+        Metadata is only resolved for the merged results.
+        
+        Args:
+            queries: Query vectors of shape (num_queries, dimension)
+            k: Number of results per query
+            nprobe: Optional IVF lists to visit
+            ef_search: Optional HNSW search depth
+            where: Optional metadata filter applied to every query
+            include_metadata: Whether to resolve metadata for each hit
+            fields: Optional metadata fields to resolve instead of the whole
+                metadata of each hit
+        
+        Returns:
+            Global vector IDs and distances of shape (num_queries, k), with
+            -1 IDs in empty slots, and the metadata of the hits of each query
+        """
+        try:
+            queries = np.ascontiguousarray(queries, dtype=np.float32)
+            if queries.ndim == 1:
+                queries = queries.reshape(1, -1)
+            
+            futures = [
+                self._pool().submit(
+                    shard.search_batch,
+                    queries,
+                    k=k,
+                    nprobe=nprobe,
+                    ef_search=ef_search,
+                    where=where,
+                    include_metadata=False
+                )
+                for shard in self.shards
+            ]
+            partials = [future.result() for future in futures]
+            if not partials:
+                return BatchSearchResult(
+                    vector_ids=np.full((len(queries), k), -1, dtype='int64'),
+                    distances=np.full((len(queries), k), np.inf, dtype='float32'),
+                    metadata=[[] for _ in queries] if include_metadata else []
+                )
+            
+            distances = np.hstack([p.distances for p in partials])
+            ids = np.hstack([
+                self._global_ids(shard, p.vector_ids) for shard, p in enumerate(partials)
+            ])
+            
+            # Empty slots sort last; inner product ranks larger scores first
+            keys = np.where(ids >= 0, distances, np.inf)
+            if self.shards[0].metric == "IP":
+                keys = np.where(ids >= 0, -distances, np.inf)
+            order = np.argsort(keys, axis=1, kind='stable')[:, :k]
+            ids = np.take_along_axis(ids, order, axis=1)
+            distances = np.take_along_axis(distances, order, axis=1)
+            
+            metadata = []
+            if include_metadata:
+                found = self._get_metadata(np.unique(ids[ids >= 0]).tolist(), fields)
+                metadata = [
+                    [found[idx] for idx in row.tolist() if idx in found]
+                    for row in ids
+                ]
+            
+            return BatchSearchResult(
+                vector_ids=ids,
+                distances=distances,
+                metadata=metadata
+            )
+        
+        except Exception as e:
+            self.logger.error(f"Failed to search shard batch: {e}")
+            raise
+    
+    def _get_metadata(
+        self,
+        vector_ids: List[int],
+        fields: Optional[List[str]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Get metadata by global ID, with 'vector_id' set to the global ID.
+        
+        Args:
+            vector_ids: Global vector IDs
+            fields: Optional metadata fields to return
+        
+        Returns:
+            Metadata keyed by global vector ID
+        """
+        found = {}
+        for shard, local_ids in self._group_ids(vector_ids).items():
+            for local_id, meta in self.shards[shard].metadata.get_many(local_ids, fields).items():
+                vector_id = (shard << SHARD_ID_SHIFT) | local_id
+                if 'vector_id' in meta:
+                    meta['vector_id'] = vector_id
+                found[vector_id] = meta
+        return found
+    
+    def match_ids(self, where: Dict[str, Any]) -> Set[int]:
+        """
+        Find the global IDs of vectors whose metadata matches a filter.
+        
+        Args:
+            where: Metadata filter; see VectorStore.match_ids
+        
+        Returns:
+            Set of matching global vector IDs
+        """
+        futures = [
+            self._pool().submit(shard.match_ids, where) for shard in self.shards
+        ]
+        return {
+            (shard << SHARD_ID_SHIFT) | local_id
+            for shard, future in enumerate(futures)
+            for local_id in future.result()
+        }
+    
+    def get_vector(self, vector_id: int) -> Optional[List[float]]:
+        """
+        Get a vector by global ID.
+        
+        Args:
+            vector_id: Global vector ID
+        
+        Returns:
+            Vector if found, None otherwise
+        """
+        shard, local_id = self._split_id(vector_id)
+        if not 0 <= shard < len(self.shards):
+            return None
+        return self.shards[shard].get_vector(local_id)
+    
+    def update_metadata(
+        self,
+        vector_id: int,
+        metadata: Dict[str, Any]
+    ) -> None:
+        """
+        Update metadata for a vector.
+        
+        Args:
+            vector_id: Global vector ID
+            metadata: New metadata
+        """
+        shard, local_id = self._split_id(vector_id)
+        if 0 <= shard < len(self.shards):
+            self.shards[shard].update_metadata(local_id, metadata)
+    
+    def delete_vector(self, vector_id: int) -> None:
+        """
+        Delete a vector from its shard.
+        
+        Args:
+            vector_id: Global vector ID
+        """
+        self.delete_vectors([vector_id])
+    
+    def delete_vectors(self, vector_ids: Iterable[int]) -> int:
+        """
+        Delete vectors from their shards.
+        
+        Args:
+            vector_ids: Global vector IDs
+        
+        Returns:
+            Number of vectors deleted
+        """
+        return sum(
+            self.shards[shard].delete_vectors(local_ids)
+            for shard, local_ids in self._group_ids(vector_ids).items()
+        )
+    
+    def save(self) -> None:
+        """Save every shard and the shard layout."""
+        try:
+            for future in [self._pool().submit(shard.save) for shard in self.shards]:
+                future.result()
+            
+            with open(self.store_path / "shards.json", 'w') as f:
+                json.dump({
+                    'partition': self.partition,
+                    'num_shards': len(self.shards),
+                    'shard_key': self.shard_key,
+                    'time_window': self.time_window,
+                    'windows': self.windows
+                }, f, indent=2)
+        
+        except Exception as e:
+            self.logger.error(f"Failed to save sharded vector store: {e}")
+            raise
+    
+    def load(self, memory_map: bool = False) -> None:
+        """
+        Load every shard from disk.
+        
+        Args:
+            memory_map: Load the shards read-only with memory-mapped indexes;
+                see VectorStore.load
+        """
+        try:
+            layout_path = self.store_path / "shards.json"
+            if layout_path.exists():
+                with open(layout_path, 'r') as f:
+                    layout = json.load(f)
+                self.partition = layout['partition']
+                self.shard_key = layout['shard_key']
+                self.time_window = layout['time_window']
+                self.windows = layout['windows']
+                if self.partition == "hash":
+                    self.num_shards = layout['num_shards']
+                
+                self.shards = []
+                for _ in range(layout['num_shards']):
+                    self._add_shard()
+            
+            for future in [
+                self._pool().submit(shard.load, memory_map) for shard in self.shards
+            ]:
+                future.result()
+        
+        except Exception as e:
+            self.logger.error(f"Failed to load sharded vector store: {e}")
+            raise
+    
+    def close(self) -> None:
+        """Shut down the fan-out thread pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the sharded vector store.
+        
+        Returns:
+            Dictionary of totals and per-shard statistics
+        """
+        try:
+            shard_stats = [shard.get_stats() for shard in self.shards]
+            return {
+                'num_vectors': sum(s['num_vectors'] for s in shard_stats),
+                'num_shards': len(self.shards),
+                'partition': self.partition,
+                'shards': shard_stats,
+                'store_path': str(self.store_path)
+            }
+        
+        except Exception as e:
+            self.logger.error(f"Failed to get sharded vector store stats: {e}")
+            raise
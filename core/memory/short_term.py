@@ -3,11 +3,21 @@ Short-term memory for conversation context.
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Tuple, Set, Iterable
 import json
 from pathlib import Path
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from collections import OrderedDict
+import heapq
+import bisect
+import re
+
+# Words indexed for search
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Length of the character n-grams indexing words for infix lookups
+NGRAM_SIZE = 3
 
 @dataclass
 class MemoryItem:
@@ -19,7 +29,18 @@ class MemoryItem:
     expires_at: Optional[datetime] = None
 
 class ShortTermMemory:
-    """Manages short-term memory for conversation context."""
+    """
+    Manages short-term memory for conversation context.
+    
+    Items are kept in insertion order in a dict keyed by ID, so lookups,
+    removals and evicting the oldest item take constant time. Expiry
+    times are kept in a min-heap, so expiring items costs time only for
+    the items that expired. An inverted index of the words of each item
+    is updated as items come and go, so searches only check the items
+    whose words can contain the query. Words are found by bisection of
+    the sorted words, or of the sorted reversed words for suffixes, and
+    through an index of their trigrams for infixes.
+    """
     
     def __init__(
         self,
@@ -37,8 +58,23 @@ class ShortTermMemory:
         self.max_items = max_items
         self.default_ttl = default_ttl
         
-        # Initialize memory store
-        self.items: List[MemoryItem] = []
+        # Initialize memory store, oldest item first
+        self.items: "OrderedDict[str, MemoryItem]" = OrderedDict()
+        
+        # Expiry times and IDs of items with a TTL. Entries of items removed
+        # before they expire are discarded when they reach the top
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        
+        # Inverted index: item IDs and insertion sequence numbers per word,
+        # the words of each item, all words in sorted order for prefix
+        # lookups, all words reversed in sorted order for suffix lookups,
+        # and the words containing each trigram for infix lookups
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._item_tokens: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []
+        self._reversed_vocabulary: List[str] = []
+        self._ngrams: Dict[str, Set[str]] = {}
+        self._sequence = 0
     
     def add(
         self,
@@ -78,11 +114,15 @@ class ShortTermMemory:
             )
             
             # Add to memory
-            self.items.append(item)
+            self.items[item_id] = item
+            self._index_item(item)
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, item_id))
+                self._compact_expiry_heap()
             
             # Enforce maximum items
-            if len(self.items) > self.max_items:
-                self.items.pop(0)
+            while len(self.items) > self.max_items:
+                self._discard(next(iter(self.items)))
             
             return item_id
             
@@ -102,14 +142,15 @@ class ShortTermMemory:
         """
         try:
             # Find item
-            for item in self.items:
-                if item.id == item_id:
-                    # Check if expired
-                    if item.expires_at and item.expires_at < datetime.now():
-                        self.items.remove(item)
-                        return None
-                    return item
-            return None
+            item = self.items.get(item_id)
+            if item is None:
+                return None
+            
+            # Check if expired
+            if item.expires_at and item.expires_at < datetime.now():
+                self._discard(item_id)
+                return None
+            return item
             
         except Exception as e:
             self.logger.error(f"Failed to get item from memory: {e}")
@@ -123,7 +164,7 @@ class ShortTermMemory:
             item_id: Item ID
         """
         try:
-            self.items = [item for item in self.items if item.id != item_id]
+            self._discard(item_id)
             
         except Exception as e:
             self.logger.error(f"Failed to remove item from memory: {e}")
@@ -133,6 +174,12 @@ class ShortTermMemory:
         """Clear all items from memory."""
         try:
             self.items.clear()
+            self._expiry_heap.clear()
+            self._postings.clear()
+            self._item_tokens.clear()
+            self._vocabulary.clear()
+            self._reversed_vocabulary.clear()
+            self._ngrams.clear()
             
         except Exception as e:
             self.logger.error(f"Failed to clear memory: {e}")
@@ -142,15 +189,162 @@ class ShortTermMemory:
         """Remove expired items from memory."""
         try:
             now = datetime.now()
-            self.items = [
-                item for item in self.items
-                if not item.expires_at or item.expires_at > now
-            ]
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, item_id = heapq.heappop(self._expiry_heap)
+                item = self.items.get(item_id)
+                if item is not None and item.expires_at <= now:
+                    self._discard(item_id)
             
         except Exception as e:
             self.logger.error(f"Failed to cleanup memory: {e}")
             raise
     
+    def _discard(self, item_id: str) -> None:
+        """
+        Remove an item and its index entries, if present.
+        
+        Args:
+            item_id: Item ID
+        """
+        if self.items.pop(item_id, None) is None:
+            return
+        
+        for token in self._item_tokens.pop(item_id):
+            postings = self._postings[token]
+            del postings[item_id]
+            if not postings:
+                del self._postings[token]
+                self._remove_word(token)
+    
+    def _index_item(self, item: MemoryItem) -> None:
+        """
+        Add the words of an item's content and string metadata to the index.
+        
+        Args:
+            item: Memory item
+        """
+        texts = [item.content] if isinstance(item.content, str) else []
+        texts.extend(value for value in item.metadata.values() if isinstance(value, str))
+        tokens = {token for text in texts for token in TOKEN_PATTERN.findall(text.lower())}
+        
+        self._sequence += 1
+        self._item_tokens[item.id] = tokens
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._add_word(token)
+            postings[item.id] = self._sequence
+    
+    @staticmethod
+    def _word_ngrams(word: str) -> Set[str]:
+        """Get the trigrams of a word."""
+        return {word[i:i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1)}
+    
+    def _add_word(self, word: str) -> None:
+        """
+        Add a new word to the sorted vocabularies and the trigram index.
+        
+        Args:
+            word: Lower-case word
+        """
+        bisect.insort(self._vocabulary, word)
+        bisect.insort(self._reversed_vocabulary, word[::-1])
+        for ngram in self._word_ngrams(word):
+            self._ngrams.setdefault(ngram, set()).add(word)
+    
+    def _remove_word(self, word: str) -> None:
+        """
+        Remove a word no item contains from the vocabularies and the
+        trigram index.
+        
+        Args:
+            word: Lower-case word
+        """
+        del self._vocabulary[bisect.bisect_left(self._vocabulary, word)]
+        reversed_word = word[::-1]
+        del self._reversed_vocabulary[bisect.bisect_left(self._reversed_vocabulary, reversed_word)]
+        for ngram in self._word_ngrams(word):
+            words = self._ngrams[ngram]
+            words.discard(word)
+            if not words:
+                del self._ngrams[ngram]
+    
+    @staticmethod
+    def _prefixed(vocabulary: List[str], prefix: str) -> List[str]:
+        """
+        Find the words of a sorted vocabulary starting with a prefix.
+        
+        Args:
+            vocabulary: Sorted words
+            prefix: Prefix
+            
+        Returns:
+            Matching words in sorted order
+        """
+        words = []
+        i = bisect.bisect_left(vocabulary, prefix)
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            words.append(vocabulary[i])
+            i += 1
+        return words
+    
+    def _lookup(self, word: str, open_start: bool, open_end: bool) -> Dict[str, int]:
+        """
+        Get the items containing a word of a query, as part of their words.
+        
+        A query word at the start of the query may be the end of a longer
+        word, and one at the end of the query the start of a longer word;
+        words in between are whole words.
+        
+        Args:
+            word: Lower-case word
+            open_start: Whether the word may be preceded by word characters
+            open_end: Whether the word may be followed by word characters
+            
+        Returns:
+            Dictionary of item IDs to insertion sequence numbers
+        """
+        if not open_start and not open_end:
+            return self._postings.get(word, {})
+        
+        if not open_start:
+            words = self._prefixed(self._vocabulary, word)
+        elif not open_end:
+            words = [token[::-1] for token in self._prefixed(self._reversed_vocabulary, word[::-1])]
+        elif len(word) >= NGRAM_SIZE:
+            # Infixes: words containing every trigram of the query word,
+            # checked against it
+            candidates = sorted(
+                (self._ngrams.get(ngram, set()) for ngram in self._word_ngrams(word)),
+                key=len
+            )
+            words = [token for token in candidates[0] if word in token]
+        else:
+            # An infix shorter than a trigram is matched by a scan of the
+            # vocabulary, which is much smaller than the items' text
+            words = [token for token in self._vocabulary if word in token]
+        
+        matches: Dict[str, int] = {}
+        for token in words:
+            matches.update(self._postings[token])
+        return matches
+    
+    def _compact_expiry_heap(self) -> None:
+        """
+        Drop heap entries of removed items once they outnumber the items.
+        
+        Rebuilding takes time linear in the number of items, and happens
+        at most once per that many additions.
+        """
+        if len(self._expiry_heap) > 2 * len(self.items) + 16:
+            self._expiry_heap = [
+                (item.expires_at, item.id)
+                for item in self.items.values()
+                if item.expires_at is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+    
     def get_all(self) -> List[MemoryItem]:
         """
         Get all non-expired items from memory.
@@ -162,7 +356,7 @@ class ShortTermMemory:
             # Cleanup expired items
             self.cleanup()
             
-            return self.items.copy()
+            return list(self.items.values())
             
         except Exception as e:
             self.logger.error(f"Failed to get all items from memory: {e}")
@@ -176,6 +370,11 @@ class ShortTermMemory:
         """
         Search memory items.
         
+        Items whose content or string metadata contains the query, ignoring
+        case, are returned oldest first. Candidates are found through the
+        inverted index of the words of the query, then checked against
+        their text.
+        
         Args:
             query: Search query
             max_results: Optional maximum number of results
@@ -187,19 +386,33 @@ class ShortTermMemory:
             # Cleanup expired items
             self.cleanup()
             
-            # Simple text search
-            results = []
-            for item in self.items:
-                # Search in content
-                if isinstance(item.content, str) and query.lower() in item.content.lower():
-                    results.append(item)
-                    continue
+            query = query.lower()
+            words = list(TOKEN_PATTERN.finditer(query))
+            if not words:
+                results = self._scan(query, self.items.values())
+            else:
+                # Intersect the posting lists, smallest first
+                postings = sorted(
+                    (
+                        self._lookup(
+                            word.group(),
+                            word.start() == 0,
+                            word.end() == len(query)
+                        )
+                        for word in words
+                    ),
+                    key=len
+                )
+                matches = postings[0]
+                for other in postings[1:]:
+                    matches = {
+                        item_id: sequence
+                        for item_id, sequence in matches.items()
+                        if item_id in other
+                    }
                 
-                # Search in metadata
-                for value in item.metadata.values():
-                    if isinstance(value, str) and query.lower() in value.lower():
-                        results.append(item)
-                        break
+                candidates = (self.items[item_id] for item_id in sorted(matches, key=matches.get))
+                results = self._scan(query, candidates)
             
             # Limit results
             if max_results is not None:
@@ -211,6 +424,32 @@ class ShortTermMemory:
             self.logger.error(f"Failed to search memory: {e}")
             raise
     
+    def _scan(self, query: str, items: Iterable[MemoryItem]) -> List[MemoryItem]:
+        """
+        Match items containing a query as a substring.
+        
+        Args:
+            query: Lower-case search query
+            items: Items to check
+            
+        Returns:
+            List of matching memory items
+        """
+        results = []
+        for item in items:
+            # Search in content
+            if isinstance(item.content, str) and query in item.content.lower():
+                results.append(item)
+                continue
+            
+            # Search in metadata
+            for value in item.metadata.values():
+                if isinstance(value, str) and query in value.lower():
+                    results.append(item)
+                    break
+        
+        return results
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the memory.
@@ -225,7 +464,8 @@ class ShortTermMemory:
             return {
                 'total_items': len(self.items),
                 'max_items': self.max_items,
-                'default_ttl': self.default_ttl
+                'default_ttl': self.default_ttl,
+                'indexed_words': len(self._postings)
             }
             
         except Exception as e:
@@ -3,13 +3,58 @@ Vector store for memory system.
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
 import json
 from pathlib import Path
 import numpy as np
 from datetime import datetime
+from dataclasses import dataclass
 import faiss
 import pickle
+import re
+import threading
+import os
+import shutil
+
+from .metadata_store import MetadataStore
+
+# Index factory types: compressed flat storage ("SQfp16", "SQ8", "PQ16"),
+# IVF ("IVF1024,Flat", "IVF1024,PQ16", "IVF1024,SQ8") and HNSW ("HNSW32")
+FACTORY_INDEX_PATTERN = re.compile(
+    r'^(SQfp16|SQ8|PQ\d+|IVF\d+,(Flat|PQ\d+|SQfp16|SQ8)|HNSW\d+)$'
+)
+
+# Number of inverted lists used by the "IVF-PQ" shorthand
+DEFAULT_NLIST = 256
+
+# Filtered searches matching at most this many vectors are scored exactly
+EXACT_FILTER_LIMIT = 1024
+
+# Growth of the candidates fetched by indexes that filter after searching
+POST_FILTER_FACTOR = 4
+
+# Training points per k-means centroid below which FAISS warns, used for
+# the IVF coarse quantizer and PQ codebooks
+TRAINING_POINTS_PER_CENTROID = 39
+
+# Training points for scalar quantizers, which learn per-dimension ranges
+SCALAR_QUANTIZER_TRAINING_POINTS = 1000
+
+# Files of stores saved before checkpoints and the metadata database
+LEGACY_FILES = (
+    "index.faiss",
+    "metadata.pkl",
+    "metadata.jsonl",
+    "metadata_ids.npy",
+    "metadata_offsets.npy"
+)
+
+@dataclass
+class BatchSearchResult:
+    """Columnar results of a batched search, one row per query."""
+    vector_ids: np.ndarray
+    distances: np.ndarray
+    metadata: List[List[Dict[str, Any]]]
 
 class VectorStore:
     """Manages vector storage for memory system."""
@@ -18,42 +63,390 @@ class VectorStore:
         self,
         dimension: int = 768,
         index_type: str = "L2",
-        store_path: str = "data/vector_store"
+        store_path: str = "data/vector_store",
+        metric: Optional[str] = None,
+        nprobe: int = 8,
+        ef_search: int = 64,
+        auto_ivf_threshold: Optional[int] = None,
+        compaction_threshold: float = 0.2,
+        indexed_fields: Optional[List[str]] = None,
+        rerank: bool = False,
+        rerank_factor: int = 4,
+        max_segments: int = 8
     ):
         """
         Initialize vector store.
         
         Args:
             dimension: Dimension of vectors
-            index_type: Type of FAISS index
+            index_type: Type of FAISS index. "L2" and "IP" are exact flat
+                indexes; "SQfp16", "SQ8", "PQ{m}" and "PQ" store compressed
+                codes in a flat index; "IVF{nlist},Flat", "IVF{nlist},PQ{m}",
+                "IVF{nlist},SQ8", "IVF{nlist},SQfp16", "IVF-PQ" and "HNSW{M}"
+                are approximate indexes
             store_path: Path to store index and metadata
+            metric: Distance metric for approximate indexes ("L2" or "IP");
+                defaults to "IP" for the "IP" index type and "L2" otherwise
+            nprobe: Default number of inverted lists visited by IVF searches
+            ef_search: Default search depth of HNSW searches
+            auto_ivf_threshold: If set, a flat index is retrained as an IVF
+                index once it holds this many vectors
+            compaction_threshold: Fraction of tombstoned vectors at which
+                indexes that cannot remove vectors (HNSW) are compacted in
+                the background
+            indexed_fields: Metadata fields kept in an index for fast
+                `where` filters on search
+            rerank: Keep full float32 vectors in a side file and re-rank the
+                top candidates of each search exactly, for compressed indexes
+            rerank_factor: Candidates fetched per result when re-ranking
+            max_segments: Number of saved change segments at which they are
+                merged into a new checkpoint in the background
         """
         self.logger = logging.getLogger(__name__)
         self.dimension = dimension
         self.index_type = index_type
+        self.metric = metric or ("IP" if index_type == "IP" else "L2")
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.auto_ivf_threshold = auto_ivf_threshold
+        self.compaction_threshold = compaction_threshold
+        self.rerank = rerank
+        self.rerank_factor = rerank_factor
+        self.max_segments = max_segments
         self.store_path = Path(store_path)
         self.store_path.mkdir(parents=True, exist_ok=True)
         
         # Initialize FAISS index
         self._init_index()
         
-        # Initialize metadata storage
-        self.metadata: List[Dict[str, Any]] = []
+        # Initialize metadata storage, keyed by vector ID. A new store is
+        # kept in memory until its first save
+        self.indexed_fields = list(indexed_fields or [])
+        self.metadata = MetadataStore(indexed_fields=self.indexed_fields)
+        
+        # Set when the store is memory-mapped from disk
+        self.read_only = False
+        
+        # Vector IDs are stable 64-bit keys that are never reused
+        self._next_id = 0
+        
+        # Deleted vectors still held by indexes that cannot remove them
+        self.tombstones: Set[int] = set()
+        self._tombstone_batch: Optional[faiss.IDSelectorBatch] = None
+        self._tombstone_selector: Optional[faiss.IDSelector] = None
+        
+        # Guards index mutation against the background compaction thread
+        self._lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._pending_ids: Optional[List[int]] = None
+        
+        # Memory map of the float32 side file used for re-ranking
+        self._exact_vectors: Optional[np.ndarray] = None
+        
+        # Vectors added to an untrained index, searched exactly until there
+        # are enough of them to train on
+        self._clear_untrained()
+        
+        # Changes since the last save, written as the next log segment
+        self._unsaved_adds: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._unsaved_updates: Set[int] = set()
+        self._unsaved_deletes: Set[int] = set()
+        self._segment_seq = 0
+        self._checkpoint_seq = 0
+        self._checkpoint_thread: Optional[threading.Thread] = None
+        self._checkpoint_lock = threading.Lock()
+        
+        # Index type and training state described by store.json
+        self._saved_layout: Optional[Tuple[str, bool]] = None
     
     def _init_index(self) -> None:
         """Initialize FAISS index."""
         try:
-            if self.index_type == "L2":
-                self.index = faiss.IndexFlatL2(self.dimension)
-            elif self.index_type == "IP":
-                self.index = faiss.IndexFlatIP(self.dimension)
-            else:
-                raise ValueError(f"Unsupported index type: {self.index_type}")
+            self.index = self._create_index(self.index_type)
             
         except Exception as e:
             self.logger.error(f"Failed to initialize index: {e}")
             raise
     
+    def _create_index(self, index_type: str) -> faiss.Index:
+        """
+        Create an empty FAISS index keyed by stable vector IDs.
+        
+        IVF indexes store IDs in their inverted lists; all other index
+        types are wrapped in an IndexIDMap2.
+        
+        Args:
+            index_type: Type of FAISS index
+            
+        Returns:
+            New FAISS index
+        """
+        if index_type == "L2":
+            return faiss.IndexIDMap2(faiss.IndexFlatL2(self.dimension))
+        if index_type == "IP":
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        
+        if index_type == "IVF-PQ":
+            index_type = f"IVF{DEFAULT_NLIST},PQ{self._default_pq_subquantizers()}"
+        elif index_type == "PQ":
+            index_type = f"PQ{self._default_pq_subquantizers()}"
+        if not FACTORY_INDEX_PATTERN.match(index_type):
+            raise ValueError(f"Unsupported index type: {index_type}")
+        
+        metric = faiss.METRIC_INNER_PRODUCT if self.metric == "IP" else faiss.METRIC_L2
+        index = faiss.index_factory(self.dimension, index_type, metric)
+        self._apply_search_defaults(index)
+        
+        # A hashtable direct map supports both reconstruction by ID and
+        # remove_ids, unlike the array map
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            return index
+        
+        return faiss.IndexIDMap2(index)
+    
+    @staticmethod
+    def _base_index(index: faiss.Index) -> faiss.Index:
+        """
+        Unwrap an IndexIDMap2 to the index that stores the vectors.
+        
+        Args:
+            index: FAISS index
+            
+        Returns:
+            Underlying FAISS index
+        """
+        if isinstance(index, faiss.IndexIDMap2):
+            return faiss.downcast_index(index.index)
+        return index
+    
+    def _supports_remove(self) -> bool:
+        """Whether the current index can remove vectors in place."""
+        return not isinstance(self._base_index(self.index), faiss.IndexHNSW)
+    
+    def _supports_selector(self, index: faiss.Index) -> bool:
+        """Whether an index can restrict its search with an ID selector."""
+        # IndexPQ rejects any search parameters
+        return not isinstance(self._base_index(index), faiss.IndexPQ)
+    
+    def _apply_search_defaults(self, index: faiss.Index) -> None:
+        """
+        Apply the default nprobe/efSearch, which FAISS does not persist.
+        
+        Args:
+            index: FAISS index to configure
+        """
+        index = self._base_index(index)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = self.ef_search
+    
+    def _adopt_index(self, index: faiss.Index) -> faiss.Index:
+        """
+        Convert an index loaded from disk to the ID-mapped layout.
+        
+        Stores saved before stable IDs were introduced used positional IDs
+        and an array direct map.
+        
+        Args:
+            index: Loaded FAISS index
+            
+        Returns:
+            ID-mapped FAISS index
+        """
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            if ivf.direct_map.type != faiss.DirectMap.Hashtable:
+                ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            return index
+        if isinstance(index, faiss.IndexIDMap2):
+            return index
+        
+        vectors = index.reconstruct_n(0, index.ntotal)
+        mapped = self._create_index(self.index_type)
+        mapped.add_with_ids(vectors, np.arange(index.ntotal, dtype='int64'))
+        return mapped
+    
+    def _default_pq_subquantizers(self) -> int:
+        """
+        Pick a PQ sub-quantizer count that divides the vector dimension.
+        
+        Returns:
+            Number of sub-quantizers, aiming for 4 dimensions per code byte
+        """
+        target = max(1, self.dimension // 4)
+        return max(m for m in range(1, target + 1) if self.dimension % m == 0)
+    
+    def _search_params(
+        self,
+        index: faiss.Index,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        selector: Optional[faiss.IDSelector] = None
+    ) -> Optional[faiss.SearchParameters]:
+        """
+        Build per-query search parameters.
+        
+        Args:
+            index: FAISS index being searched
+            nprobe: Optional number of inverted lists to visit
+            ef_search: Optional HNSW search depth
+            selector: Optional selector restricting which IDs can match
+            
+        Returns:
+            Search parameters, or None to use the index defaults
+        """
+        base = self._base_index(index)
+        if faiss.try_extract_index_ivf(base) is not None:
+            params = faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe)
+        elif isinstance(base, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(efSearch=ef_search or self.ef_search)
+        elif selector is not None:
+            params = faiss.SearchParameters()
+        else:
+            return None
+        
+        if selector is not None:
+            params.sel = selector
+        return params
+    
+    def _refresh_tombstone_selector(self) -> None:
+        """Rebuild the selector that hides tombstoned vectors from search."""
+        if not self.tombstones:
+            self._tombstone_selector = None
+            return
+        
+        # Keep a reference to the wrapped batch so it outlives the search
+        self._tombstone_batch = faiss.IDSelectorBatch(
+            np.fromiter(self.tombstones, dtype='int64', count=len(self.tombstones))
+        )
+        self._tombstone_selector = faiss.IDSelectorNot(self._tombstone_batch)
+    
+    def train(self, vectors: List[List[float]]) -> None:
+        """
+        Train an approximate index on representative vectors.
+        
+        Vectors added before training are moved into the trained index.
+        Without this call, an approximate index is trained on the vectors
+        added to it once there are training_size() of them. Flat indexes
+        need no training and ignore this call.
+        
+        Args:
+            vectors: Training vectors
+        """
+        try:
+            with self._lock:
+                if self.index.is_trained:
+                    return
+                
+                self.index.train(np.array(vectors).astype('float32'))
+                self._flush_untrained()
+            
+        except Exception as e:
+            self.logger.error(f"Failed to train index: {e}")
+            raise
+    
+    def training_size(self) -> int:
+        """
+        Get the number of vectors the index is trained on automatically.
+        
+        Returns:
+            TRAINING_POINTS_PER_CENTROID points per centroid of the IVF
+            coarse quantizer or PQ codebooks, and at least
+            SCALAR_QUANTIZER_TRAINING_POINTS for scalar quantizers
+        """
+        base = self._base_index(self.index)
+        ivf = faiss.try_extract_index_ivf(base)
+        quantizer = faiss.downcast_index(ivf) if ivf is not None else base
+        
+        size = ivf.nlist * TRAINING_POINTS_PER_CENTROID if ivf is not None else 1
+        pq = getattr(quantizer, 'pq', None)
+        if pq is not None:
+            size = max(size, pq.ksub * TRAINING_POINTS_PER_CENTROID)
+        if getattr(quantizer, 'sq', None) is not None:
+            size = max(size, SCALAR_QUANTIZER_TRAINING_POINTS)
+        return size
+    
+    def _clear_untrained(self) -> None:
+        """Empty the buffer of vectors added to an untrained index."""
+        self._untrained_ids = np.empty(0, dtype='int64')
+        self._untrained_vectors = np.empty((0, self.dimension), dtype='float32')
+        self._untrained_count = 0
+    
+    def _buffer_untrained(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Append vectors to the untrained buffer, doubling its capacity as
+        needed so that one-vector additions take amortized constant time.
+        
+        Args:
+            ids: Vector IDs, greater than the IDs already buffered
+            vectors: Float32 vectors of shape (len(ids), dimension)
+        """
+        count = self._untrained_count + len(ids)
+        if count > len(self._untrained_ids):
+            capacity = max(count, 2 * len(self._untrained_ids), 64)
+            untrained_ids = np.empty(capacity, dtype='int64')
+            untrained_ids[:self._untrained_count] = self._untrained_ids[:self._untrained_count]
+            untrained_vectors = np.empty((capacity, self.dimension), dtype='float32')
+            untrained_vectors[:self._untrained_count] = self._untrained_vectors[:self._untrained_count]
+            self._untrained_ids, self._untrained_vectors = untrained_ids, untrained_vectors
+        
+        self._untrained_ids[self._untrained_count:count] = ids
+        self._untrained_vectors[self._untrained_count:count] = vectors
+        self._untrained_count = count
+    
+    def _flush_untrained(self) -> None:
+        """Add the buffered vectors to the index once it is trained."""
+        if self._untrained_count:
+            self.index.add_with_ids(
+                self._untrained_vectors[:self._untrained_count],
+                self._untrained_ids[:self._untrained_count]
+            )
+        self._clear_untrained()
+    
+    def _untrained_positions(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Find vectors in the untrained buffer, which is sorted by ID.
+        
+        Args:
+            ids: Buffered vector IDs
+            
+        Returns:
+            Buffer rows of the IDs
+        """
+        buffered = self._untrained_ids[:self._untrained_count]
+        positions = np.searchsorted(buffered, ids)
+        found = positions < len(buffered)
+        found[found] = buffered[positions[found]] == ids[found]
+        if not found.all():
+            raise KeyError(f"Vector IDs not found: {ids[~found].tolist()}")
+        return positions
+    
+    def _switch_to_ivf(self) -> None:
+        """Retrain a flat index as an IVF index over its current vectors."""
+        try:
+            ids = self.metadata.ids()
+            vectors = self.index.reconstruct_batch(ids)
+            nlist = max(1, min(int(4 * np.sqrt(len(vectors))), len(vectors) // TRAINING_POINTS_PER_CENTROID))
+            index_type = f"IVF{nlist},Flat"
+            
+            index = self._create_index(index_type)
+            index.train(vectors)
+            index.add_with_ids(vectors, ids)
+            
+            self.index = index
+            self.index_type = index_type
+            self.logger.info(
+                f"Switched vector store to {index_type} at {len(vectors)} vectors"
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Failed to switch to IVF index: {e}")
+            raise
+    
     def add_vectors(
         self,
         vectors: List[List[float]],
@@ -70,28 +463,38 @@ class VectorStore:
             List of vector IDs
         """
         try:
+            self._check_writable()
+            
             # Convert vectors to numpy array
             vectors = np.array(vectors).astype('float32')
             
-            # Add to index
-            start_id = self.index.ntotal
-            self.index.add(vectors)
-            
-            # Generate IDs
-            vector_ids = list(range(start_id, start_id + len(vectors)))
-            
-            # Add metadata
-            if metadata:
-                for i, meta in enumerate(metadata):
-                    meta['vector_id'] = vector_ids[i]
-                    meta['added_at'] = datetime.now().isoformat()
-                    self.metadata.append(meta)
-            else:
-                for vector_id in vector_ids:
-                    self.metadata.append({
-                        'vector_id': vector_id,
-                        'added_at': datetime.now().isoformat()
-                    })
+            with self._lock:
+                # Generate IDs
+                ids = np.arange(self._next_id, self._next_id + len(vectors), dtype='int64')
+                vector_ids = ids.tolist()
+                
+                # Add to index
+                if self.rerank:
+                    self._write_exact_vectors(self._next_id, vectors)
+                self._insert_vectors(ids, vectors)
+                self._unsaved_adds.append((ids, vectors))
+                
+                # Add metadata
+                if metadata:
+                    for i, meta in enumerate(metadata):
+                        meta['vector_id'] = vector_ids[i]
+                        meta['added_at'] = datetime.now().isoformat()
+                else:
+                    metadata = [
+                        {
+                            'vector_id': vector_id,
+                            'added_at': datetime.now().isoformat()
+                        }
+                        for vector_id in vector_ids
+                    ]
+                self.metadata.put_many(zip(vector_ids, metadata))
+                
+                self._maybe_switch_to_ivf()
             
             return vector_ids
             
@@ -99,11 +502,48 @@ class VectorStore:
             self.logger.error(f"Failed to add vectors: {e}")
             raise
     
+    def _insert_vectors(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Add vectors to the index under the given IDs.
+        
+        Args:
+            ids: Vector IDs
+            vectors: Float32 vectors of shape (len(ids), dimension)
+        """
+        # Untrained approximate indexes buffer vectors until there are
+        # enough to train on, rather than learning from a single batch
+        if self.index.is_trained:
+            self.index.add_with_ids(vectors, ids)
+        else:
+            self._buffer_untrained(ids, vectors)
+            if self._untrained_count >= self.training_size():
+                self.index.train(self._untrained_vectors[:self._untrained_count])
+                self.logger.info(
+                    f"Trained {self.index_type} index on {self._untrained_count} vectors"
+                )
+                self._flush_untrained()
+        self._next_id = max(self._next_id, int(ids.max()) + 1)
+        if self._pending_ids is not None:
+            self._pending_ids.extend(ids.tolist())
+    
+    def _maybe_switch_to_ivf(self) -> None:
+        """Switch a flat index to IVF once it reaches auto_ivf_threshold."""
+        if (
+            self.auto_ivf_threshold is not None
+            and self.index_type in ("L2", "IP")
+            and len(self.metadata) >= self.auto_ivf_threshold
+        ):
+            self._switch_to_ivf()
+    
     def search(
         self,
         query_vector: List[float],
         k: int = 5,
-        filter_func: Optional[callable] = None
+        filter_func: Optional[callable] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None,
+        fields: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for similar vectors.
@@ -111,7 +551,14 @@ class VectorStore:
         Args:
             query_vector: Query vector
             k: Number of results to return
-            filter_func: Optional function to filter results
+            filter_func: Optional function to filter results after search
+            nprobe: Optional IVF lists to visit for this query
+            ef_search: Optional HNSW search depth for this query
+            where: Optional metadata filter applied inside the search, e.g.
+                {"user_id": "u1", "created": {"$gte": "2024-01-01"}}; see
+                match_ids for the syntax
+            fields: Optional metadata fields to return instead of the whole
+                metadata of each result
             
         Returns:
             List of results with distances and metadata
@@ -120,24 +567,20 @@ class VectorStore:
             # Convert query to numpy array
             query = np.array([query_vector]).astype('float32')
             
-            # Search index
-            distances, indices = self.index.search(query, k)
+            distances, indices = self._search_arrays(query, k, nprobe, ef_search, where)
+            
+            # Get metadata of all hits in one query; FAISS returns -1 for
+            # empty slots
+            metadata = self.metadata.get_many(indices[0].tolist(), fields)
             
             # Get results
             results = []
             for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-                if idx == -1:  # FAISS returns -1 for empty slots
-                    continue
-                
-                # Get metadata
-                meta = next(
-                    (m for m in self.metadata if m['vector_id'] == idx),
-                    None
-                )
+                meta = metadata.get(int(idx))
                 
                 if meta and (filter_func is None or filter_func(meta)):
                     results.append({
-                        'vector_id': idx,
+                        'vector_id': int(idx),
                         'distance': float(distance),
                         'metadata': meta
                     })
@@ -148,6 +591,390 @@ class VectorStore:
             self.logger.error(f"Failed to search vectors: {e}")
             raise
     
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True,
+        fields: Optional[List[str]] = None
+    ) -> BatchSearchResult:
+        """
+        Search for several query vectors with a single index call.
+        
+        A C-contiguous float32 array is passed to FAISS without copying.
+        
+        Args:
+            queries: Query vectors of shape (num_queries, dimension)
+            k: Number of results per query
+            nprobe: Optional IVF lists to visit
+            ef_search: Optional HNSW search depth
+            where: Optional metadata filter applied to every query
+            include_metadata: Whether to resolve metadata for each hit
+            fields: Optional metadata fields to resolve instead of the whole
+                metadata of each hit
+            
+        Returns:
+            Vector IDs and distances of shape (num_queries, k), with -1 IDs
+            in empty slots, and the metadata of the hits of each query
+        """
+        try:
+            queries = np.ascontiguousarray(queries, dtype=np.float32)
+            if queries.ndim == 1:
+                queries = queries.reshape(1, -1)
+            
+            distances, indices = self._search_arrays(queries, k, nprobe, ef_search, where)
+            
+            metadata = []
+            if include_metadata:
+                found = self.metadata.get_many(np.unique(indices).tolist(), fields)
+                metadata = [
+                    [found[idx] for idx in row.tolist() if idx in found]
+                    for row in indices
+                ]
+            
+            return BatchSearchResult(
+                vector_ids=indices,
+                distances=distances,
+                metadata=metadata
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Failed to search vector batch: {e}")
+            raise
+    
+    def _search_arrays(
+        self,
+        queries: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run a search and return the raw FAISS result arrays.
+        
+        Args:
+            queries: Float32 queries of shape (num_queries, dimension)
+            k: Number of results per query
+            nprobe: Optional IVF lists to visit
+            ef_search: Optional HNSW search depth
+            where: Optional metadata filter
+            
+        Returns:
+            Distances and vector IDs, each of shape (num_queries, k)
+        """
+        index = self.index
+        if not index.is_trained:
+            # Vectors are buffered until the index is trained; score them
+            # exactly
+            ids = (
+                self.match_ids(where) if where is not None
+                else self._untrained_ids[:self._untrained_count]
+            )
+            return self._search_subset(index, queries, ids, k)
+        
+        ids = None
+        if where is not None:
+            # Restrict the search to matching vectors, which excludes
+            # tombstoned vectors as they have no metadata
+            ids = self.match_ids(where)
+            if len(ids) <= EXACT_FILTER_LIMIT:
+                return self._search_subset(index, queries, ids, k)
+            selector = self._id_selector(ids)
+        else:
+            # Skip tombstoned vectors
+            selector = self._tombstone_selector
+        
+        # Over-fetch candidates from compressed codes for exact re-ranking
+        fetch_k = k * self.rerank_factor if self.rerank else k
+        if selector is not None and not self._supports_selector(index):
+            distances, indices = self._search_post_filtered(
+                index,
+                queries,
+                fetch_k,
+                ids,
+                self._search_params(index, nprobe, ef_search)
+            )
+        else:
+            distances, indices = index.search(
+                queries,
+                fetch_k,
+                params=self._search_params(index, nprobe, ef_search, selector)
+            )
+        
+        if self.rerank:
+            return self._rerank(queries, indices, k)
+        return distances, indices
+    
+    def _search_post_filtered(
+        self,
+        index: faiss.Index,
+        queries: np.ndarray,
+        k: int,
+        allowed: Optional[Set[int]],
+        params: Optional[faiss.SearchParameters]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search an index that cannot take an ID selector, filtering its
+        results instead.
+        
+        The search is repeated with POST_FILTER_FACTOR times as many
+        candidates until every query has k allowed results or the whole
+        index was searched.
+        
+        Args:
+            index: FAISS index to search
+            queries: Float32 queries of shape (num_queries, dimension)
+            k: Number of results per query
+            allowed: IDs that may match, or None to exclude tombstoned IDs
+            params: Optional search parameters without a selector
+            
+        Returns:
+            Distances and vector IDs, each of shape (num_queries, k), best
+            first and padded with -1 IDs like a FAISS search
+        """
+        exclude = allowed is None
+        if exclude:
+            allowed = self.tombstones
+        filter_ids = np.fromiter(allowed, dtype='int64', count=len(allowed))
+        
+        fetch = k
+        while True:
+            fetch = max(k, min(fetch * POST_FILTER_FACTOR, index.ntotal))
+            distances, indices = index.search(queries, fetch, params=params)
+            keep = (indices >= 0) & (np.isin(indices, filter_ids) != exclude)
+            if fetch >= index.ntotal or (keep.sum(axis=1) >= k).all():
+                break
+        
+        # Move the kept results of each query to the front, in order
+        order = np.argsort(~keep, axis=1, kind='stable')[:, :k]
+        keep = np.take_along_axis(keep, order, axis=1)
+        padding = -np.inf if self.metric == "IP" else np.inf
+        distances = np.where(keep, np.take_along_axis(distances, order, axis=1), padding)
+        indices = np.where(keep, np.take_along_axis(indices, order, axis=1), -1)
+        return distances.astype('float32'), indices
+    
+    def match_ids(self, where: Dict[str, Any]) -> Set[int]:
+        """
+        Find the IDs of vectors whose metadata matches a filter.
+        
+        Filters map fields to a value or to an operator dict using "$eq",
+        "$ne", "$gt", "$gte", "$lt", "$lte", "$in" or "$nin". Several
+        fields must all match; "$and" and "$or" combine lists of filters.
+        A list-valued field matches if any of its elements does. The filter
+        is evaluated by the metadata store, from its index for indexed
+        fields and by a scan of the metadata for other fields.
+        
+        Args:
+            where: Metadata filter
+            
+        Returns:
+            Set of matching vector IDs
+        """
+        try:
+            return self.metadata.match(where)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to match metadata filter: {e}")
+            raise
+    
+    def _id_selector(self, ids: Set[int]) -> faiss.IDSelector:
+        """
+        Build a FAISS selector restricting a search to the given IDs.
+        
+        Dense ID sets use a bitmap over the ID range; sparse sets use a
+        hashed IDSelectorBatch.
+        
+        Args:
+            ids: Vector IDs to allow
+            
+        Returns:
+            FAISS ID selector
+        """
+        id_array = np.fromiter(ids, dtype='int64', count=len(ids))
+        if len(ids) * 64 < self._next_id:
+            return faiss.IDSelectorBatch(id_array)
+        
+        bits = np.zeros(self._next_id, dtype=bool)
+        bits[id_array] = True
+        bitmap = np.packbits(bits, bitorder='little')
+        selector = faiss.IDSelectorBitmap(bitmap)
+        
+        # Keep the bitmap alive for as long as the selector
+        selector.bitmap_array = bitmap
+        return selector
+    
+    def _search_subset(
+        self,
+        index: faiss.Index,
+        queries: np.ndarray,
+        ids: Iterable[int],
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a small set of vectors exactly against queries.
+        
+        Args:
+            index: FAISS index holding the vectors
+            queries: Queries of shape (num_queries, dimension)
+            ids: Vector IDs to score
+            k: Number of results per query
+            
+        Returns:
+            Distances and IDs, each of shape (num_queries, k), best first
+            and padded with -1 IDs like a FAISS search
+        """
+        id_array = np.fromiter(ids, dtype='int64')
+        keys = self._exact_keys(queries, self._get_vectors(index, id_array))
+        
+        top = np.argsort(keys, axis=1)[:, :k]
+        distances = np.full((len(queries), k), np.inf, dtype='float32')
+        indices = np.full((len(queries), k), -1, dtype='int64')
+        distances[:, :top.shape[1]] = np.take_along_axis(keys, top, axis=1)
+        indices[:, :top.shape[1]] = id_array[top]
+        
+        if self.metric == "IP":
+            distances = -distances
+        return distances, indices
+    
+    def _rerank(
+        self,
+        queries: np.ndarray,
+        candidates: np.ndarray,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-rank search candidates by exact distance to their query.
+        
+        Args:
+            queries: Queries of shape (num_queries, dimension)
+            candidates: Candidate IDs per query, padded with -1
+            k: Number of results per query
+            
+        Returns:
+            Distances and IDs, each of shape (num_queries, k), best first
+        """
+        distances = np.full((len(queries), k), np.inf, dtype='float32')
+        indices = np.full((len(queries), k), -1, dtype='int64')
+        
+        for row, (query, ids) in enumerate(zip(queries, candidates)):
+            ids = ids[ids >= 0]
+            keys = self._exact_keys(query[None, :], self._get_vectors(self.index, ids))[0]
+            top = np.argsort(keys)[:k]
+            distances[row, :len(top)] = keys[top]
+            indices[row, :len(top)] = ids[top]
+        
+        if self.metric == "IP":
+            distances = -distances
+        return distances, indices
+    
+    def _exact_keys(self, queries: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """
+        Compute exact distances as sort keys where lower is better.
+        
+        Args:
+            queries: Queries of shape (num_queries, dimension)
+            vectors: Vectors of shape (num_vectors, dimension)
+            
+        Returns:
+            Squared L2 distances, or negated inner products, of shape
+            (num_queries, num_vectors)
+        """
+        if len(vectors) == 0:
+            return np.empty((len(queries), 0), dtype='float32')
+        if self.metric == "IP":
+            return -(queries @ vectors.T)
+        return (
+            (queries ** 2).sum(axis=1)[:, None]
+            - 2 * queries @ vectors.T
+            + (vectors ** 2).sum(axis=1)[None, :]
+        ).clip(min=0)
+    
+    def _get_vectors(self, index: faiss.Index, ids: np.ndarray) -> np.ndarray:
+        """
+        Fetch vectors by ID, at full precision when a side file is kept.
+        
+        Args:
+            index: FAISS index holding the vectors
+            ids: Vector IDs
+            
+        Returns:
+            Float32 vectors of shape (len(ids), dimension)
+        """
+        if self.rerank and len(ids):
+            exact = self._load_exact_vectors()
+            if exact is not None and ids.max() < len(exact):
+                return np.asarray(exact[ids])
+        return self._reconstruct(index, ids)
+    
+    def _reconstruct(self, index: faiss.Index, ids: np.ndarray) -> np.ndarray:
+        """
+        Fetch vectors by ID from the index, or from the untrained buffer.
+        
+        Args:
+            index: FAISS index holding the vectors
+            ids: Vector IDs
+            
+        Returns:
+            Float32 vectors of shape (len(ids), dimension)
+        """
+        if not index.is_trained:
+            return self._untrained_vectors[self._untrained_positions(ids)]
+        return index.reconstruct_batch(ids)
+    
+    def _load_exact_vectors(self) -> Optional[np.ndarray]:
+        """
+        Map the float32 side file of full-precision vectors.
+        
+        Returns:
+            Array with one row per vector ID, or None if there is no file
+        """
+        if self._exact_vectors is None:
+            path = self.store_path / "vectors.f32"
+            if not path.exists() or path.stat().st_size == 0:
+                return None
+            self._exact_vectors = np.memmap(path, dtype='float32', mode='r').reshape(
+                -1, self.dimension
+            )
+        return self._exact_vectors
+    
+    def _write_exact_vectors(self, start_id: int, vectors: np.ndarray) -> None:
+        """
+        Write full-precision vectors to the side file, at row = vector ID.
+        
+        Rows past start_id, left by vectors that were never saved, are
+        overwritten. A missing range, when re-ranking was enabled on an
+        existing store, is backfilled from the index.
+        
+        Args:
+            start_id: Vector ID of the first row
+            vectors: Vectors of shape (n, dimension)
+        """
+        path = self.store_path / "vectors.f32"
+        row_bytes = self.dimension * 4
+        
+        with open(path, 'r+b' if path.exists() else 'w+b') as f:
+            rows = f.seek(0, 2) // row_bytes
+            if rows < start_id:
+                backfill = np.zeros((start_id - rows, self.dimension), dtype='float32')
+                live = np.array(
+                    sorted(self.metadata.existing(range(rows, start_id))),
+                    dtype='int64'
+                )
+                if len(live):
+                    backfill[live - rows] = self._reconstruct(self.index, live)
+                f.seek(rows * row_bytes)
+                f.write(backfill.tobytes())
+            
+            f.seek(start_id * row_bytes)
+            f.write(vectors.tobytes())
+            f.truncate()
+        
+        self._exact_vectors = None
+    
     def get_vector(self, vector_id: int) -> Optional[List[float]]:
         """
         Get a vector by ID.
@@ -159,13 +986,14 @@ class VectorStore:
             Vector if found, None otherwise
         """
         try:
-            if vector_id >= self.index.ntotal:
+            if vector_id not in self.metadata:
                 return None
             
-            # Get vector from index
-            vector = faiss.vector_to_array(
-                self.index.reconstruct(vector_id)
-            ).tolist()
+            # Get vector from the side file or index
+            vector = self._get_vectors(
+                self.index,
+                np.array([vector_id], dtype='int64')
+            )[0].tolist()
             
             return vector
             
@@ -186,12 +1014,15 @@ class VectorStore:
             metadata: New metadata
         """
         try:
-            # Find and update metadata
-            for meta in self.metadata:
-                if meta['vector_id'] == vector_id:
+            self._check_writable()
+            
+            with self._lock:
+                meta = self.metadata.get(vector_id)
+                if meta is not None:
                     meta.update(metadata)
                     meta['updated_at'] = datetime.now().isoformat()
-                    break
+                    self.metadata[vector_id] = meta
+                    self._unsaved_updates.add(vector_id)
             
         except Exception as e:
             self.logger.error(f"Failed to update metadata: {e}")
@@ -204,72 +1035,561 @@ class VectorStore:
         Args:
             vector_id: Vector ID
         """
+        self.delete_vectors([vector_id])
+    
+    def delete_vectors(self, vector_ids: Iterable[int]) -> int:
+        """
+        Delete vectors from the store.
+        
+        Vectors are removed from the index in place. Indexes that cannot
+        remove vectors (HNSW) tombstone them instead, and are compacted in
+        the background once tombstones exceed the compaction threshold.
+        
+        Args:
+            vector_ids: Vector IDs
+            
+        Returns:
+            Number of vectors deleted
+        """
         try:
-            # Remove from metadata
-            self.metadata = [
-                meta for meta in self.metadata
-                if meta['vector_id'] != vector_id
-            ]
+            self._check_writable()
+            
+            with self._lock:
+                deleted = self._remove_vectors(vector_ids)
+                self._unsaved_deletes.update(deleted)
             
-            # Note: FAISS doesn't support direct deletion
-            # We'll need to rebuild the index
-            self._rebuild_index()
+            return len(deleted)
             
         except Exception as e:
-            self.logger.error(f"Failed to delete vector: {e}")
+            self.logger.error(f"Failed to delete vectors: {e}")
             raise
     
-    def _rebuild_index(self) -> None:
-        """Rebuild the FAISS index from metadata."""
+    def _remove_vectors(self, vector_ids: Iterable[int]) -> List[int]:
+        """
+        Remove vectors from the metadata and index, or tombstone them.
+        
+        Args:
+            vector_ids: Vector IDs
+            
+        Returns:
+            IDs that were present and removed
+        """
+        # Remove from metadata
+        deleted = self.metadata.delete_many(vector_ids)
+        if deleted:
+            self._drop_from_index(deleted)
+        return deleted
+    
+    def _drop_from_index(self, deleted: List[int]) -> None:
+        """
+        Remove deleted vectors from the index, or tombstone them.
+        
+        Args:
+            deleted: IDs of vectors held by the index
+        """
+        if not self.index.is_trained:
+            buffered = self._untrained_ids[:self._untrained_count]
+            keep = ~np.isin(buffered, np.array(deleted, dtype='int64'))
+            untrained_ids = buffered[keep]
+            untrained_vectors = self._untrained_vectors[:self._untrained_count][keep]
+            self._clear_untrained()
+            self._buffer_untrained(untrained_ids, untrained_vectors)
+        elif self._supports_remove():
+            self.index.remove_ids(np.array(deleted, dtype='int64'))
+        else:
+            self.tombstones.update(deleted)
+            self._refresh_tombstone_selector()
+            
+            if len(self.tombstones) > self.compaction_threshold * self.index.ntotal:
+                self._start_compaction()
+    
+    def _check_writable(self) -> None:
+        """Raise if the store was memory-mapped read-only."""
+        if self.read_only:
+            raise RuntimeError("Vector store was loaded read-only with memory_map=True")
+    
+    def _start_compaction(self) -> None:
+        """Start a background compaction unless one is already running."""
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        
+        self._compaction_thread = threading.Thread(
+            target=self.compact,
+            name="vector-store-compaction",
+            daemon=True
+        )
+        self._compaction_thread.start()
+    
+    def compact(self) -> None:
+        """
+        Rebuild the index without its tombstoned vectors.
+        
+        The rebuild runs without holding the lock; vectors added meanwhile
+        are copied over before the new index is swapped in, and vectors
+        deleted meanwhile stay tombstoned.
+        """
         try:
-            # Create new index
-            self._init_index()
+            with self._lock:
+                if not self.tombstones:
+                    return
+                
+                ids = self.metadata.ids()
+                vectors = self.index.reconstruct_batch(ids)
+                compacted = set(self.tombstones)
+                self._pending_ids = []
+            
+            index = self._create_index(self.index_type)
+            index.add_with_ids(vectors, ids)
+            
+            with self._lock:
+                if self._pending_ids:
+                    pending = np.array(self._pending_ids, dtype='int64')
+                    index.add_with_ids(self.index.reconstruct_batch(pending), pending)
+                
+                self.index = index
+                self.tombstones -= compacted
+                self._refresh_tombstone_selector()
             
-            # Add vectors back
-            for meta in self.metadata:
-                vector_id = meta['vector_id']
-                vector = self.get_vector(vector_id)
-                if vector:
-                    self.index.add(np.array([vector]).astype('float32'))
+            self.logger.info(f"Compacted {len(compacted)} deleted vectors")
             
         except Exception as e:
-            self.logger.error(f"Failed to rebuild index: {e}")
+            self.logger.error(f"Failed to compact index: {e}")
             raise
+            
+        finally:
+            with self._lock:
+                self._pending_ids = None
     
     def save(self) -> None:
-        """Save the vector store to disk."""
+        """
+        Save changes since the last save to disk.
+        
+        Only the vectors added and the metadata changed since the last save
+        are written, as a new segment in the wal/ directory, so the cost
+        depends on the size of the change rather than of the store. Once
+        max_segments segments accumulate they are merged into a full
+        checkpoint in the background. Metadata is committed to the SQLite
+        metadata database after the segment is written.
+        
+        The first save of a store that was not loaded replaces any store
+        previously saved at store_path. A save after the index changed type
+        or was trained, which segments cannot replay, writes a checkpoint.
+        """
         try:
-            # Save index
-            index_path = self.store_path / "index.faiss"
-            faiss.write_index(self.index, str(index_path))
+            self._check_writable()
+            
+            with self._lock:
+                self._attach_metadata()
+                
+                # Without a checkpoint the segments hold the whole store
+                if not (self.store_path / "store.json").exists():
+                    self._write_settings({**self._settings(), 'tombstones': []})
+                    self._saved_layout = self._layout()
+                
+                self._write_segment()
+                layout_changed = self._layout() != self._saved_layout
             
-            # Save metadata
-            metadata_path = self.store_path / "metadata.pkl"
-            with open(metadata_path, 'wb') as f:
-                pickle.dump(self.metadata, f)
+            if layout_changed:
+                with self._checkpoint_lock:
+                    self._write_checkpoint()
+            elif self._segment_seq - self._checkpoint_seq >= self.max_segments:
+                self._start_checkpoint()
             
         except Exception as e:
             self.logger.error(f"Failed to save vector store: {e}")
             raise
     
-    def load(self) -> None:
-        """Load the vector store from disk."""
+    def _layout(self) -> Tuple[str, bool]:
+        """Get the index type and whether the index is trained."""
+        return self.index_type, bool(self.index.is_trained)
+    
+    def _attach_metadata(self) -> None:
+        """
+        Move in-memory metadata to the metadata database of store_path,
+        replacing any store previously saved there.
+        """
+        if self.metadata.path is not None:
+            return
+        
+        for path in self.store_path.glob("checkpoint-*"):
+            shutil.rmtree(path, ignore_errors=True)
+        shutil.rmtree(self.store_path / "wal", ignore_errors=True)
+        names = ("store.json", "metadata.db-wal", "metadata.db-shm") + LEGACY_FILES
+        
+        # Vectors added to a re-ranking store were already written to the
+        # side file, replacing its rows; otherwise it is the replaced store's
+        if not (self.rerank and self._next_id):
+            names += ("vectors.f32",)
+        self._exact_vectors = None
+        
+        for name in names:
+            path = self.store_path / name
+            if path.exists():
+                path.unlink()
+        
+        self.metadata.attach(self.store_path / "metadata.db")
+    
+    def _write_segment(self) -> None:
+        """Write the unsaved changes as the next log segment, if any."""
+        deleted = set(self._unsaved_deletes)
+        added_ids = []
+        added_vectors = []
+        for ids, vectors in self._unsaved_adds:
+            # Vectors added and deleted since the last save cancel out
+            live = self.metadata.existing(ids.tolist())
+            keep = np.fromiter((i in live for i in ids.tolist()), dtype=bool, count=len(ids))
+            deleted -= set(ids[~keep].tolist())
+            added_ids.append(ids[keep])
+            added_vectors.append(vectors[keep])
+        
+        add_ids = np.concatenate(added_ids) if added_ids else np.empty(0, dtype='int64')
+        changed = self.metadata.get_many(
+            sorted(set(add_ids.tolist()) | self._unsaved_updates)
+        )
+        if not (len(add_ids) or changed or deleted):
+            return
+        
+        segment = {
+            'add_ids': add_ids,
+            'add_vectors': (
+                np.concatenate(added_vectors) if added_vectors
+                else np.empty((0, self.dimension), dtype='float32')
+            ),
+            'delete_ids': np.array(sorted(deleted), dtype='int64'),
+            'meta_ids': np.array(list(changed), dtype='int64'),
+            'meta': np.frombuffer(
+                json.dumps(list(changed.values())).encode(),
+                dtype='uint8'
+            ),
+            'next_id': np.array(self._next_id, dtype='int64')
+        }
+        
+        # Write to a temporary file and rename, so that a crash never
+        # leaves a partial segment behind
+        wal_dir = self.store_path / "wal"
+        wal_dir.mkdir(exist_ok=True)
+        seq = self._segment_seq + 1
+        tmp_path = wal_dir / f"segment-{seq:010d}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **segment)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, wal_dir / f"segment-{seq:010d}.npz")
+        
+        # Metadata committed after its segment is recovered by replaying
+        # the segment if the commit is lost
+        self.metadata.commit()
+        
+        self._segment_seq = seq
+        self._unsaved_adds = []
+        self._unsaved_updates = set()
+        self._unsaved_deletes = set()
+    
+    def _segments(self) -> List[Tuple[int, Path]]:
+        """
+        List the saved log segments.
+        
+        Returns:
+            (sequence number, path) pairs in sequence order
+        """
+        wal_dir = self.store_path / "wal"
+        if not wal_dir.exists():
+            return []
+        return sorted(
+            (int(path.stem.split('-')[1]), path)
+            for path in wal_dir.glob("segment-*.npz")
+        )
+    
+    def _replay_segment(self, path: Path) -> None:
+        """
+        Apply a saved log segment to the in-memory store.
+        
+        Args:
+            path: Segment file
+        """
+        with np.load(path) as segment:
+            add_ids = segment['add_ids']
+            if len(add_ids):
+                self._insert_vectors(add_ids, segment['add_vectors'])
+            
+            metadata = json.loads(segment['meta'].tobytes())
+            self.metadata.put_many(zip(segment['meta_ids'].tolist(), metadata))
+            
+            # The deletes may already be committed to the metadata database
+            delete_ids = segment['delete_ids'].tolist()
+            if delete_ids:
+                self.metadata.delete_many(delete_ids)
+                self._drop_from_index(delete_ids)
+            self._next_id = max(self._next_id, int(segment['next_id']))
+        
+        self._maybe_switch_to_ivf()
+    
+    def _start_checkpoint(self) -> None:
+        """Start a background checkpoint unless one is already running."""
+        if self._checkpoint_thread is not None and self._checkpoint_thread.is_alive():
+            return
+        
+        self._checkpoint_thread = threading.Thread(
+            target=self.checkpoint,
+            name="vector-store-checkpoint",
+            daemon=True
+        )
+        self._checkpoint_thread.start()
+    
+    def checkpoint(self) -> None:
+        """
+        Write the whole store as a new checkpoint and drop merged segments.
+        
+        The snapshot is taken under the lock; files are written outside it
+        into a new checkpoint directory, which store.json then points to.
+        Readers using load(memory_map=True) see changes once they are
+        checkpointed.
+        """
         try:
+            self._check_writable()
+            
+            with self._checkpoint_lock:
+                self._write_checkpoint()
+            
+        except Exception as e:
+            self.logger.error(f"Failed to checkpoint vector store: {e}")
+            raise
+    
+    def _write_checkpoint(self) -> None:
+        """Write a checkpoint and remove the files it supersedes."""
+        with self._lock:
+            self._attach_metadata()
+            self._write_segment()
+            seq = self._segment_seq
+            index_bytes = faiss.serialize_index(self.index)
+            settings = self._settings()
+            layout = self._layout()
+            untrained_ids = self._untrained_ids[:self._untrained_count].copy()
+            untrained_vectors = self._untrained_vectors[:self._untrained_count].copy()
+        
+        checkpoint_dir = self.store_path / f"checkpoint-{seq:010d}"
+        checkpoint_dir.mkdir(exist_ok=True)
+        with open(checkpoint_dir / "index.faiss", 'wb') as f:
+            f.write(index_bytes.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        
+        # Vectors not yet in the untrained index are saved beside it
+        if len(untrained_ids):
+            with open(checkpoint_dir / "untrained.npz", 'wb') as f:
+                np.savez(f, ids=untrained_ids, vectors=untrained_vectors)
+                f.flush()
+                os.fsync(f.fileno())
+        
+        settings['checkpoint'] = checkpoint_dir.name
+        settings['checkpoint_seq'] = seq
+        self._write_settings(settings)
+        self._checkpoint_seq = seq
+        self._saved_layout = layout
+        
+        # Remove merged segments, older checkpoints and legacy files
+        for segment_seq, path in self._segments():
+            if segment_seq <= seq:
+                path.unlink()
+        for old_dir in self.store_path.glob("checkpoint-*"):
+            if old_dir != checkpoint_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        for name in LEGACY_FILES:
+            legacy_path = self.store_path / name
+            if legacy_path.exists():
+                legacy_path.unlink()
+    
+    def _settings(self) -> Dict[str, Any]:
+        """
+        Collect the index settings saved in store.json.
+        
+        These may differ from the constructor arguments after an automatic
+        switch to IVF.
+        
+        Returns:
+            Settings dictionary
+        """
+        return {
+            'dimension': self.dimension,
+            'index_type': self.index_type,
+            'metric': self.metric,
+            'next_id': self._next_id,
+            'tombstones': sorted(self.tombstones)
+        }
+    
+    def _write_settings(self, settings: Dict[str, Any]) -> None:
+        """
+        Atomically replace store.json.
+        
+        Args:
+            settings: Settings dictionary
+        """
+        tmp_path = self.store_path / "store.json.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(settings, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.store_path / "store.json")
+    
+    def _open_metadata(
+        self,
+        base_dir: Path,
+        read_only: bool,
+        id_limit: Optional[int] = None
+    ) -> MetadataStore:
+        """
+        Open the metadata database, importing metadata saved by earlier
+        versions into a new database.
+        
+        Args:
+            base_dir: Directory of the loaded checkpoint
+            read_only: Open the database without write access
+            id_limit: For read-only loads, only show the metadata of
+                vector IDs below this limit
+            
+        Returns:
+            Metadata store
+        """
+        db_path = self.store_path / "metadata.db"
+        if not db_path.exists():
+            metadata = MetadataStore(db_path, self.indexed_fields)
+            legacy_path = self.store_path / "metadata.pkl"
+            if (base_dir / "metadata.jsonl").exists():
+                ids = np.load(base_dir / "metadata_ids.npy")
+                with open(base_dir / "metadata.jsonl", 'rb') as f:
+                    metadata.put_many(zip(ids.tolist(), map(json.loads, f)))
+            elif legacy_path.exists():
+                with open(legacy_path, 'rb') as f:
+                    legacy = pickle.load(f)
+                
+                # Stores saved before the ID index existed pickled a list
+                if isinstance(legacy, list):
+                    legacy = {meta['vector_id']: meta for meta in legacy}
+                metadata.put_many(legacy.items())
+            metadata.commit()
+            if not read_only:
+                return metadata
+            metadata.close()
+        
+        return MetadataStore(db_path, self.indexed_fields, read_only=read_only, id_limit=id_limit)
+    
+    def load(self, memory_map: bool = False) -> None:
+        """
+        Load the vector store from disk.
+        
+        The latest checkpoint is loaded and the log segments saved after it
+        are replayed, which also recovers every save made before a crash.
+        
+        Args:
+            memory_map: Map the checkpoint's index and open the metadata
+                database read-only instead of reading the index into memory.
+                Startup then takes roughly constant time, and processes
+                loading the same store share one copy through the page
+                cache. Segments saved after the checkpoint are not applied,
+                nor is their metadata shown, and the store cannot be
+                modified afterwards.
+        """
+        try:
+            # Load index settings
+            settings = {}
+            settings_path = self.store_path / "store.json"
+            if settings_path.exists():
+                with open(settings_path, 'r') as f:
+                    settings = json.load(f)
+                self.index_type = settings['index_type']
+                self.metric = settings['metric']
+            
+            # Stores saved before checkpoints existed keep their files at
+            # the top level
+            base_dir = self.store_path / settings.get('checkpoint', '')
+            self._checkpoint_seq = settings.get('checkpoint_seq', 0)
+            
             # Load index
-            index_path = self.store_path / "index.faiss"
+            index_path = base_dir / "index.faiss"
             if index_path.exists():
-                self.index = faiss.read_index(str(index_path))
+                if memory_map:
+                    io_flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+                    self.index = faiss.read_index(
+                        str(index_path),
+                        io_flags | faiss.IO_FLAG_READ_ONLY
+                    )
+                else:
+                    self.index = self._adopt_index(faiss.read_index(str(index_path)))
+                self._apply_search_defaults(self.index)
+            else:
+                self._init_index()
+            
+            self._clear_untrained()
+            untrained_path = base_dir / "untrained.npz"
+            if untrained_path.exists():
+                with np.load(untrained_path) as untrained:
+                    self._buffer_untrained(untrained['ids'], untrained['vectors'])
+            
+            self.tombstones = set(settings.get('tombstones', []))
+            self._refresh_tombstone_selector()
+            self._saved_layout = self._layout() if settings else None
             
-            # Load metadata
-            metadata_path = self.store_path / "metadata.pkl"
-            if metadata_path.exists():
-                with open(metadata_path, 'rb') as f:
-                    self.metadata = pickle.load(f)
+            # Load metadata. The database also holds the metadata of
+            # segments saved after the checkpoint, so a read-only load only
+            # shows the IDs assigned before it, which are those in the index
+            id_limit = None
+            if memory_map:
+                id_limit = settings.get('next_id') if index_path.exists() else 0
+            self.metadata.close()
+            self.metadata = self._open_metadata(base_dir, memory_map, id_limit)
+            self.read_only = memory_map
+            
+            self._next_id = max(settings.get('next_id', 0), self.metadata.max_id() + 1)
+            
+            # Replay segments saved after the checkpoint
+            self._unsaved_adds = []
+            self._unsaved_updates = set()
+            self._unsaved_deletes = set()
+            self._segment_seq = self._checkpoint_seq
+            pending = [
+                (seq, path) for seq, path in self._segments()
+                if seq > self._checkpoint_seq
+            ]
+            if memory_map:
+                if pending:
+                    self.logger.warning(
+                        f"{len(pending)} saved segments are not visible to a "
+                        f"memory-mapped load until the next checkpoint"
+                    )
+            else:
+                for seq, path in pending:
+                    self._replay_segment(path)
+                    self._segment_seq = seq
+                self.metadata.commit()
             
         except Exception as e:
             self.logger.error(f"Failed to load vector store: {e}")
             raise
     
+    def _bytes_per_vector(self) -> float:
+        """
+        Estimate the memory used per stored vector.
+        
+        Counts the stored code, the 64-bit ID, HNSW level-0 links, and the
+        float32 side file when re-ranking. Lookup structures are excluded.
+        
+        Returns:
+            Approximate bytes per vector
+        """
+        base = self._base_index(self.index)
+        ivf = faiss.try_extract_index_ivf(base)
+        if ivf is not None:
+            size = ivf.code_size + 8
+        elif isinstance(base, faiss.IndexHNSW):
+            storage = faiss.downcast_index(base.storage)
+            size = storage.sa_code_size() + 4 * base.hnsw.nb_neighbors(0) + 8
+        else:
+            size = base.sa_code_size() + 8
+        
+        if self.rerank:
+            size += 4 * self.dimension
+        return float(size)
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the vector store.
@@ -279,9 +1599,17 @@ class VectorStore:
         """
         try:
             return {
-                'num_vectors': self.index.ntotal,
+                'num_vectors': len(self.metadata),
+                'num_tombstones': len(self.tombstones),
                 'dimension': self.dimension,
                 'index_type': self.index_type,
+                'metric': self.metric,
+                'is_trained': self.index.is_trained,
+                'untrained_vectors': self._untrained_count,
+                'read_only': self.read_only,
+                'bytes_per_vector': self._bytes_per_vector(),
+                'rerank': self.rerank,
+                'unsaved_segments': self._segment_seq - self._checkpoint_seq,
                 'store_path': str(self.store_path)
             }
             
@@ -8,10 +8,9 @@ from pathlib import Path
 import json
 import spacy
 from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
-from sentence_transformers import SentenceTransformer
 import torch
-import numpy as np
 from datetime import datetime
+from core.rag.embeddings import EmbeddingGenerator
 
 class NLPProcessor:
     """Handles natural language processing tasks."""
@@ -54,8 +53,13 @@ class NLPProcessor:
                 model="finiteautomata/bertweet-base-sentiment-analysis"
             )
             
-            # Load sentence transformer for context understanding
-            self.sentence_transformer = SentenceTransformer('all-MiniLM-L6-v2')
+            # Load sentence embeddings for context understanding; history
+            # messages are embedded once and then served from its cache,
+            # kept on disk only if embedding_cache_path is configured
+            self.embedding_generator = EmbeddingGenerator(
+                model_name='all-MiniLM-L6-v2',
+                cache_path=self.config.get("embedding_cache_path")
+            )
             
             # Load language detection model
             self.language_detector = pipeline(
@@ -84,18 +88,17 @@ class NLPProcessor:
     def get_context(self, text: str) -> Dict[str, Any]:
         """Get relevant context from conversation history."""
         try:
-            # Get current text embedding
-            current_embedding = self.sentence_transformer.encode(text)
-            
-            # Calculate similarity with history
-            similarities = []
-            for message in self.conversation_history:
-                history_embedding = self.sentence_transformer.encode(message["text"])
-                similarity = np.dot(current_embedding, history_embedding) / (
-                    np.linalg.norm(current_embedding) * np.linalg.norm(history_embedding)
-                )
-                similarities.append((message, similarity))
-                
+            # Embed the current text and the history in one batch
+            embeddings = self.embedding_generator.encode(
+                [text] + [message["text"] for message in self.conversation_history]
+            )
+            
+            # Calculate similarity with history; embeddings are unit length
+            scores = self.embedding_generator.compute_similarity(
+                embeddings[0], embeddings[1:], normalized=True
+            )
+            similarities = list(zip(self.conversation_history, scores))
+            
             # Sort by similarity
             similarities.sort(key=lambda x: x[1], reverse=True)
             
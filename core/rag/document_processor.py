@@ -3,7 +3,7 @@ Document processor for RAG system.
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Generator
 import json
 from pathlib import Path
 import re
@@ -0,0 +1,253 @@
+"""
+Content-addressed cache of text embeddings.
+"""
+
+import logging
+from typing import Dict, Any, Optional, Iterable
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+# Keys looked up per SELECT, below SQLite's limit on bound parameters
+LOOKUP_BATCH_SIZE = 500
+
+class EmbeddingCache:
+    """
+    Two-level cache of embeddings: an in-memory LRU in front of an
+    optional SQLite database.
+    
+    Entries are keyed by a hash of the model name and the normalized
+    text, so the same text embedded by the same model is looked up
+    whichever document, query or message it came from, and across
+    restarts when the database is used. The database is trimmed to its
+    least recently stored or loaded entries.
+    """
+    
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: int = 10000,
+        max_disk_entries: int = 100000
+    ):
+        """
+        Initialize embedding cache.
+        
+        Args:
+            db_path: Optional path to the SQLite file; None keeps the cache
+                in memory only
+            max_entries: Maximum number of embeddings held in memory
+            max_disk_entries: Maximum number of embeddings kept in SQLite
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        
+        self.db_path = Path(db_path) if db_path else None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_entries = 0
+        if self.db_path is not None:
+            self._init_db()
+    
+    def _init_db(self) -> None:
+        """Initialize SQLite database."""
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS embeddings (
+                        key BLOB PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        vector BLOB NOT NULL,
+                        used_at REAL NOT NULL DEFAULT 0
+                    ) WITHOUT ROWID
+                """)
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_embeddings_used_at ON embeddings(used_at)"
+                )
+            
+            self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._trim_disk()
+            
+        except Exception as e:
+            self.logger.error(f"Failed to initialize embedding cache: {e}")
+            raise
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalize text so that trivially different copies share an entry.
+        
+        Args:
+            text: Text to normalize
+            
+        Returns:
+            NFC-normalized text with whitespace collapsed and trimmed
+        """
+        return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+    
+    def key(self, model_name: str, text: str) -> bytes:
+        """
+        Get the cache key of a text embedded by a model.
+        
+        Args:
+            model_name: Embedding model name
+            text: Text
+            
+        Returns:
+            SHA-256 digest
+        """
+        return hashlib.sha256(f"{model_name}\0{self.normalize(text)}".encode('utf-8')).digest()
+    
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Look up embeddings, in memory first, then in SQLite in batches.
+        
+        Args:
+            keys: Cache keys
+            
+        Returns:
+            Dictionary of the keys found to their embeddings
+        """
+        try:
+            with self._lock:
+                found = {}
+                missing = []
+                for key in dict.fromkeys(keys):
+                    vector = self._memory.get(key)
+                    if vector is not None:
+                        self._memory.move_to_end(key)
+                        found[key] = vector
+                    else:
+                        missing.append(key)
+                self._stats['memory_hits'] += len(found)
+                
+                loaded = {}
+                if missing and self._conn is not None:
+                    for start in range(0, len(missing), LOOKUP_BATCH_SIZE):
+                        batch = missing[start:start + LOOKUP_BATCH_SIZE]
+                        rows = self._conn.execute("""
+                            SELECT key, vector FROM embeddings
+                            WHERE key IN ({})
+                        """.format(','.join(['?'] * len(batch))), batch)
+                        for key, vector in rows:
+                            loaded[key] = np.frombuffer(vector, dtype=np.float32)
+                    
+                    # Mark loaded entries as recently used, so trimming
+                    # keeps them
+                    if loaded:
+                        now = time.time()
+                        with self._conn:
+                            self._conn.executemany(
+                                "UPDATE embeddings SET used_at = ? WHERE key = ?",
+                                [(now, key) for key in loaded]
+                            )
+                    
+                    self._remember(loaded)
+                    found.update(loaded)
+                
+                self._stats['disk_hits'] += len(loaded)
+                self._stats['misses'] += len(missing) - len(loaded)
+                return found
+            
+        except Exception as e:
+            self.logger.error(f"Failed to look up cached embeddings: {e}")
+            raise
+    
+    def put_many(self, model_name: str, embeddings: Dict[bytes, np.ndarray]) -> None:
+        """
+        Store embeddings in memory and in SQLite.
+        
+        Args:
+            model_name: Embedding model name
+            embeddings: Dictionary of cache keys to embeddings
+        """
+        try:
+            embeddings = {
+                key: np.ascontiguousarray(vector, dtype=np.float32)
+                for key, vector in embeddings.items()
+            }
+            with self._lock:
+                self._remember(embeddings)
+                if self._conn is not None:
+                    now = time.time()
+                    with self._conn:
+                        self._conn.executemany("""
+                            INSERT OR REPLACE INTO embeddings (key, model, vector, used_at)
+                            VALUES (?, ?, ?, ?)
+                        """, [
+                            (key, model_name, vector.tobytes(), now)
+                            for key, vector in embeddings.items()
+                        ])
+                    
+                    # Only misses are stored, so nearly all rows are new
+                    self._disk_entries += len(embeddings)
+                    self._trim_disk()
+            
+        except Exception as e:
+            self.logger.error(f"Failed to store cached embeddings: {e}")
+            raise
+    
+    def _trim_disk(self) -> None:
+        """Delete the least recently used embeddings over max_disk_entries."""
+        excess = self._disk_entries - self.max_disk_entries
+        if excess <= 0:
+            return
+        
+        with self._conn:
+            deleted = self._conn.execute("""
+                DELETE FROM embeddings WHERE key IN (
+                    SELECT key FROM embeddings ORDER BY used_at LIMIT ?
+                )
+            """, (excess,)).rowcount
+        self._disk_entries = max(0, self._disk_entries - deleted)
+    
+    def _remember(self, embeddings: Dict[bytes, np.ndarray]) -> None:
+        """Add embeddings to the in-memory LRU, evicting the least recently used."""
+        if self.max_entries <= 0:
+            return
+        for key, vector in embeddings.items():
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the cache.
+        
+        Returns:
+            Dictionary containing hit counts and rates
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = sum(stats.values())
+            stats.update({
+                'lookups': lookups,
+                'hit_rate': (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0,
+                'memory_hit_rate': stats['memory_hits'] / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'disk_entries': self._disk_entries,
+                'max_disk_entries': self.max_disk_entries,
+                'db_path': str(self.db_path) if self.db_path else None
+            })
+            return stats
+    
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -3,22 +3,33 @@ Embeddings generation for RAG system.
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Callable, BinaryIO
 import json
+import os
 from pathlib import Path
 import numpy as np
 import torch
 from transformers import AutoTokenizer, AutoModel
 from sentence_transformers import SentenceTransformer
+from .embedding_cache import EmbeddingCache
 
 class EmbeddingGenerator:
-    """Generates embeddings for text chunks."""
+    """
+    Generates embeddings for text chunks.
+    
+    Embeddings are cached by model and normalized text, in memory and
+    optionally on disk, so only texts never embedded before reach the
+    model.
+    """
     
     def __init__(
         self,
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         device: str = "cuda" if torch.cuda.is_available() else "cpu",
-        batch_size: int = 32
+        batch_size: int = 32,
+        cache_path: Optional[str] = None,
+        cache_size: int = 10000,
+        cache_disk_size: int = 100000
     ):
         """
         Initialize embedding generator.
@@ -27,11 +38,20 @@ class EmbeddingGenerator:
             model_name: Name of the model to use
             device: Device to run the model on
             batch_size: Batch size for processing
+            cache_path: Optional path to the on-disk embedding cache; None
+                caches in memory only
+            cache_size: Maximum number of embeddings cached in memory
+            cache_disk_size: Maximum number of embeddings cached on disk
         """
         self.logger = logging.getLogger(__name__)
         self.model_name = model_name
         self.device = device
         self.batch_size = batch_size
+        self.cache = EmbeddingCache(
+            db_path=cache_path,
+            max_entries=cache_size,
+            max_disk_entries=cache_disk_size
+        )
         
         # Load model
         self.model = SentenceTransformer(model_name, device=device)
@@ -39,33 +59,86 @@ class EmbeddingGenerator:
         # Get embedding dimension
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
     
-    def generate_embeddings(
+    def encode(
         self,
         texts: Union[str, List[str]],
-        metadata: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
+        normalize: bool = True,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
         """
-        Generate embeddings for text(s).
+        Embed text(s) into a numpy array.
         
         Args:
             texts: Text or list of texts to embed
-            metadata: Optional metadata for the texts
+            normalize: Whether to scale embeddings to unit length, so that
+                cosine similarity is a dot product
+            show_progress_bar: Whether to show a progress bar while encoding
+                cache misses; off for online calls
             
         Returns:
-            Dictionary containing embeddings and metadata
+            C-contiguous float32 array of shape (len(texts), dimension)
         """
         try:
             # Convert single text to list
             if isinstance(texts, str):
                 texts = [texts]
             
-            # Generate embeddings
-            embeddings = self.model.encode(
-                texts,
-                batch_size=self.batch_size,
-                show_progress_bar=True,
-                convert_to_numpy=True
-            )
+            # Look up cached embeddings; only misses reach the model
+            keys = [self.cache.key(self.model_name, text) for text in texts]
+            cached = self.cache.get_many(keys)
+            misses = {
+                key: self.cache.normalize(text)
+                for key, text in zip(keys, texts)
+                if key not in cached
+            }
+            
+            if misses:
+                encoded = self.model.encode(
+                    list(misses.values()),
+                    batch_size=self.batch_size,
+                    show_progress_bar=show_progress_bar,
+                    convert_to_numpy=True
+                )
+                encoded = dict(zip(misses, encoded))
+                self.cache.put_many(self.model_name, encoded)
+                cached.update(encoded)
+            
+            # Assemble embeddings in input order, in a single allocation
+            embeddings = np.empty((len(texts), self.embedding_dim), dtype=np.float32)
+            for row, key in enumerate(keys):
+                embeddings[row] = cached[key]
+            
+            if normalize:
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                np.divide(embeddings, np.maximum(norms, 1e-12), out=embeddings)
+            
+            return embeddings
+            
+        except Exception as e:
+            self.logger.error(f"Failed to encode texts: {e}")
+            raise
+    
+    def generate_embeddings(
+        self,
+        texts: Union[str, List[str]],
+        metadata: Optional[Dict[str, Any]] = None,
+        show_progress_bar: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Generate embeddings for text(s) as JSON-serializable lists.
+        
+        Use encode to get a numpy array without the list conversion.
+        
+        Args:
+            texts: Text or list of texts to embed
+            metadata: Optional metadata for the texts
+            show_progress_bar: Whether to show a progress bar while encoding
+            
+        Returns:
+            Dictionary containing embeddings and metadata
+        """
+        try:
+            embeddings = self.encode(texts, normalize=False, show_progress_bar=show_progress_bar)
             
             # Create result dictionary
             result = {
@@ -81,32 +154,51 @@ class EmbeddingGenerator:
             self.logger.error(f"Failed to generate embeddings: {e}")
             raise
     
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the generator and its cache.
+        
+        Returns:
+            Dictionary containing model details and cache hit rates
+        """
+        return {
+            'model': self.model_name,
+            'dimension': self.embedding_dim,
+            'device': self.device,
+            'cache': self.cache.get_stats()
+        }
+    
     def compute_similarity(
         self,
-        query_embedding: List[float],
-        document_embeddings: List[List[float]]
-    ) -> List[float]:
+        query_embedding: Union[np.ndarray, List[float]],
+        document_embeddings: Union[np.ndarray, List[List[float]]],
+        normalized: bool = False
+    ) -> np.ndarray:
         """
-        Compute similarity between query and document embeddings.
+        Compute cosine similarity between query and document embeddings.
         
         Args:
             query_embedding: Query embedding
-            document_embeddings: List of document embeddings
+            document_embeddings: Document embeddings, one per row
+            normalized: Whether both are already unit length, as returned by
+                encode, so that the similarity is a single matrix product
             
         Returns:
-            List of similarity scores
+            Float32 array of similarity scores
         """
         try:
-            # Convert to numpy arrays
-            query = np.array(query_embedding)
-            documents = np.array(document_embeddings)
+            # Arrays from encode are used as they are, without copies
+            query = np.asarray(query_embedding, dtype=np.float32)
+            documents = np.asarray(document_embeddings, dtype=np.float32)
             
-            # Compute cosine similarity
-            similarities = np.dot(documents, query) / (
-                np.linalg.norm(documents, axis=1) * np.linalg.norm(query)
-            )
+            similarities = documents @ query
+            if not normalized:
+                similarities /= np.maximum(
+                    np.linalg.norm(documents, axis=1) * np.linalg.norm(query),
+                    1e-12
+                )
             
-            return similarities.tolist()
+            return similarities
             
         except Exception as e:
             self.logger.error(f"Failed to compute similarity: {e}")
@@ -114,29 +206,34 @@ class EmbeddingGenerator:
     
     def find_most_similar(
         self,
-        query_embedding: List[float],
-        document_embeddings: List[List[float]],
-        top_k: int = 5
-    ) -> List[int]:
+        query_embedding: Union[np.ndarray, List[float]],
+        document_embeddings: Union[np.ndarray, List[List[float]]],
+        top_k: int = 5,
+        normalized: bool = False
+    ) -> np.ndarray:
         """
         Find most similar documents to query.
         
         Args:
             query_embedding: Query embedding
-            document_embeddings: List of document embeddings
+            document_embeddings: Document embeddings, one per row
             top_k: Number of results to return
+            normalized: Whether both are already unit length
             
         Returns:
-            List of indices of most similar documents
+            Array of indices of the most similar documents, best match first
         """
         try:
             # Compute similarities
-            similarities = self.compute_similarity(query_embedding, document_embeddings)
+            similarities = self.compute_similarity(query_embedding, document_embeddings, normalized)
             
-            # Get top-k indices
-            top_indices = np.argsort(similarities)[-top_k:][::-1]
+            # Select the top k without sorting all similarities
+            k = min(top_k, len(similarities))
+            if k <= 0:
+                return np.empty(0, dtype=np.intp)
+            top_indices = np.argpartition(-similarities, k - 1)[:k]
             
-            return top_indices.tolist()
+            return top_indices[np.argsort(-similarities[top_indices])]
             
         except Exception as e:
             self.logger.error(f"Failed to find most similar documents: {e}")
@@ -150,38 +247,83 @@ class EmbeddingGenerator:
         """
         Save embeddings to file.
         
+        The fields other than the embeddings are written as JSON to
+        filepath; the embedding matrix is written next to it as a float32
+        .npy file with the same name, e.g. embeddings.npy for
+        embeddings.json, so that it can be memory-mapped when loaded.
+        
         Args:
-            embeddings: Embeddings to save
-            filepath: Path to save file
+            embeddings: Embeddings to save, as returned by generate_embeddings
+            filepath: Path to save file, not ending in .npy
         """
         try:
+            path = Path(filepath)
+            matrix_path = path.with_suffix('.npy')
+            if matrix_path == path:
+                raise ValueError(f"Embeddings file must not be a .npy file: {filepath}")
+            
             # Create directory if it doesn't exist
-            Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            
+            matrix = np.ascontiguousarray(embeddings['embeddings'], dtype=np.float32)
+            if matrix.ndim == 1:
+                matrix = matrix.reshape(-1, embeddings.get('dimension', len(matrix)))
+            fields = {key: value for key, value in embeddings.items() if key != 'embeddings'}
+            fields['embeddings_file'] = matrix_path.name
             
-            # Save embeddings
-            with open(filepath, 'w') as f:
-                json.dump(embeddings, f, indent=2)
+            # Write atomically, the matrix first, so that the JSON file never
+            # refers to a partial matrix
+            self._write_atomic(matrix_path, lambda f: np.save(f, matrix))
+            self._write_atomic(
+                path,
+                lambda f: f.write(json.dumps(fields, indent=2).encode('utf-8'))
+            )
             
         except Exception as e:
             self.logger.error(f"Failed to save embeddings: {e}")
             raise
     
-    def load_embeddings(self, filepath: str) -> Dict[str, Any]:
+    def load_embeddings(self, filepath: str, mmap: bool = True) -> Dict[str, Any]:
         """
         Load embeddings from file.
         
+        Reads files written by save_embeddings, and JSON files holding the
+        embeddings themselves written by earlier versions; saving the
+        result to the same path migrates them.
+        
         Args:
             filepath: Path to embeddings file
+            mmap: Whether to memory-map the embedding matrix instead of
+                reading it into memory
             
         Returns:
-            Loaded embeddings
+            Loaded embeddings, with the embeddings as a float32 array
         """
         try:
-            with open(filepath, 'r') as f:
+            path = Path(filepath)
+            with open(path, 'r') as f:
                 embeddings = json.load(f)
             
+            if 'embeddings' in embeddings:
+                # Legacy format: the embeddings as JSON lists
+                embeddings['embeddings'] = np.asarray(embeddings['embeddings'], dtype=np.float32)
+                return embeddings
+            
+            matrix_path = path.parent / embeddings.pop('embeddings_file', path.with_suffix('.npy').name)
+            embeddings['embeddings'] = np.load(matrix_path, mmap_mode='r' if mmap else None)
+            
             return embeddings
             
         except Exception as e:
             self.logger.error(f"Failed to load embeddings: {e}")
-            raise 
\ No newline at end of file
+            raise
+    
+    @staticmethod
+    def _write_atomic(path: Path, write: Callable[[BinaryIO], Any]) -> None:
+        """Write a file through a temporary file replacing it once synced."""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
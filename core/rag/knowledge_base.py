@@ -3,10 +3,14 @@ Knowledge base for RAG system.
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Set
 import json
+import os
+import hashlib
+from collections import Counter
 from pathlib import Path
 from datetime import datetime
+import numpy as np
 from .document_processor import DocumentProcessor
 from .embeddings import EmbeddingGenerator
 from .retriever import Retriever
@@ -36,6 +40,16 @@ class KnowledgeBase:
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
+        # Chunk embeddings of documents, one .npy segment per distinct
+        # list of chunks
+        self.embeddings_dir = self.base_dir / "embeddings"
+        self.embeddings_dir.mkdir(exist_ok=True)
+        
+        # Embedding segment key of each loaded document, and the number of
+        # documents using each segment
+        self._embedding_keys: Dict[str, str] = {}
+        self._embedding_refs: Counter = Counter()
+        
         # Initialize components
         self.document_processor = DocumentProcessor(
             chunk_size=chunk_size,
@@ -71,15 +85,13 @@ class KnowledgeBase:
             document = self.document_processor.process_document(content, metadata)
             
             # Generate embeddings for chunks
-            embedding_result = self.embedding_generator.generate_embeddings(
-                document.chunks,
-                metadata={'document_id': document.id}
-            )
+            embeddings = self._load_embeddings(document.id, document.chunks)
             
             # Add to retriever
             self.retriever.add_documents(
                 [{'content': chunk, 'metadata': document.metadata} for chunk in document.chunks],
-                embedding_result['embeddings']
+                embeddings,
+                document_id=document.id
             )
             
             # Save document
@@ -144,6 +156,9 @@ class KnowledgeBase:
         """
         Delete a document from the knowledge base.
         
+        Only the document's own chunks are removed from the retriever, and
+        its embedding segment if no other document shares it.
+        
         Args:
             document_id: Document ID
         """
@@ -153,9 +168,11 @@ class KnowledgeBase:
             if doc_path.exists():
                 doc_path.unlink()
             
-            # Clear retriever and reload
-            self.retriever.clear()
-            self._load_if_exists()
+            # Remove its chunks and embeddings
+            self.retriever.remove_document(document_id)
+            key = self._embedding_keys.pop(document_id, None)
+            if key is not None:
+                self._release_embeddings(key)
             
         except Exception as e:
             self.logger.error(f"Failed to delete document: {e}")
@@ -223,24 +240,115 @@ class KnowledgeBase:
             raise
     
     def _load_if_exists(self) -> None:
-        """Load existing knowledge base if it exists."""
+        """
+        Load existing knowledge base if it exists.
+        
+        Stored chunk embeddings are memory-mapped; only documents without
+        embeddings for the current model are embedded. Segments no
+        document uses any more are deleted.
+        """
         try:
             # Load all documents
             for doc_path in self.base_dir.glob("*.json"):
                 with open(doc_path, 'r') as f:
                     doc = json.load(f)
-                    
-                    # Add to retriever
-                    embedding_result = self.embedding_generator.generate_embeddings(
-                        doc['chunks'],
-                        metadata={'document_id': doc['id']}
-                    )
-                    
-                    self.retriever.add_documents(
-                        [{'content': chunk, 'metadata': doc['metadata']} for chunk in doc['chunks']],
-                        embedding_result['embeddings']
-                    )
+                
+                # Add to retriever
+                embeddings = self._load_embeddings(doc['id'], doc['chunks'])
+                
+                self.retriever.add_documents(
+                    [{'content': chunk, 'metadata': doc['metadata']} for chunk in doc['chunks']],
+                    embeddings,
+                    document_id=doc['id']
+                )
+            
+            self._remove_unused_embeddings(set(self._embedding_refs))
             
         except Exception as e:
             self.logger.error(f"Failed to load knowledge base: {e}")
-            raise 
\ No newline at end of file
+            raise
+    
+    def _embedding_key(self, chunks: List[str]) -> str:
+        """
+        Get the key of the embedding segment of a list of chunks.
+        
+        The key hashes the model name and dimension along with the chunks,
+        so changing the model selects new segments.
+        
+        Args:
+            chunks: Document chunks
+            
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{self.embedding_generator.model_name}:{self.embedding_generator.embedding_dim}".encode())
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return digest.hexdigest()
+    
+    def _load_embeddings(self, document_id: str, chunks: List[str]) -> np.ndarray:
+        """
+        Load the chunk embeddings of a document, generating them if missing.
+        
+        Embeddings are stored in a segment keyed by the chunks, so a
+        document is embedded once per model.
+        
+        Args:
+            document_id: Document ID
+            chunks: Document chunks
+            
+        Returns:
+            Float32 array of shape (len(chunks), dimension), memory-mapped
+            if loaded from disk
+        """
+        key = self._embedding_key(chunks)
+        
+        path = self.embeddings_dir / f"{key}.npy"
+        if path.exists():
+            embeddings = np.load(path, mmap_mode='r')
+        else:
+            embeddings = self.embedding_generator.encode(chunks)
+            
+            # Write atomically, so that a partial segment is never loaded
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, embeddings)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        
+        # A re-added document no longer uses its previous segment
+        self._embedding_refs[key] += 1
+        previous = self._embedding_keys.get(document_id)
+        self._embedding_keys[document_id] = key
+        if previous is not None:
+            self._release_embeddings(previous)
+        
+        return embeddings
+    
+    def _release_embeddings(self, key: str) -> None:
+        """
+        Drop a document's use of an embedding segment, deleting the segment
+        once no document uses it.
+        
+        Args:
+            key: Segment key
+        """
+        self._embedding_refs[key] -= 1
+        if self._embedding_refs[key] <= 0:
+            del self._embedding_refs[key]
+            (self.embeddings_dir / f"{key}.npy").unlink(missing_ok=True)
+    
+    def _remove_unused_embeddings(self, keys: Set[str]) -> None:
+        """
+        Delete embedding segments not in a set of keys.
+        
+        Args:
+            keys: Keys of the segments in use
+        """
+        for path in self.embeddings_dir.glob("*.npy"):
+            if path.stem not in keys:
+                path.unlink() 
\ No newline at end of file
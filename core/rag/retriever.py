@@ -167,4 +167,159 @@ class ContentRetriever:
             
         except Exception as e:
             self.logger.error(f"Failed to get retrieval stats: {e}")
-            raise 
\ No newline at end of file
+            raise 
+
+class Retriever:
+    """Retrieves knowledge base chunks by cosine similarity of their embeddings."""
+    
+    def __init__(
+        self,
+        embedding_generator: EmbeddingGenerator,
+        top_k: int = 5,
+        similarity_threshold: float = 0.7,
+        initial_capacity: int = 1024
+    ):
+        """Initialize retriever with configuration."""
+        self.logger = logging.getLogger(__name__)
+        self.embedding_generator = embedding_generator
+        self.top_k = top_k
+        self.similarity_threshold = similarity_threshold
+        self.initial_capacity = initial_capacity
+        self.clear()
+    
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        embeddings: Union[np.ndarray, List[List[float]]],
+        document_id: Optional[str] = None
+    ) -> List[int]:
+        """
+        Add chunks with their embeddings, returning their chunk IDs.
+        
+        Chunks added under a document ID replace the chunks previously added
+        under it, and can be removed together with remove_document. Chunk IDs
+        are rows of the embedding matrix; rows of removed chunks are reused.
+        """
+        try:
+            if document_id is not None:
+                self.remove_document(document_id)
+            
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            if not documents:
+                return []
+            embeddings = embeddings.reshape(len(documents), -1)
+            
+            # Normalize once, so that similarity is a dot product
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+            
+            chunk_ids = self._allocate(len(documents), embeddings.shape[1])
+            self._embeddings[chunk_ids] = embeddings
+            self._valid[chunk_ids] = True
+            for chunk_id, document in zip(chunk_ids, documents):
+                self._chunks[chunk_id] = {**document, 'document_id': document_id}
+            
+            if document_id is not None:
+                self._document_chunks[document_id] = chunk_ids
+            
+            return chunk_ids
+            
+        except Exception as e:
+            self.logger.error(f"Failed to add documents to retriever: {e}")
+            raise
+    
+    def remove_document(self, document_id: str) -> int:
+        """Remove the chunks of a document, in time proportional to its chunks."""
+        try:
+            chunk_ids = self._document_chunks.pop(document_id, None)
+            if not chunk_ids:
+                return 0
+            
+            for chunk_id in chunk_ids:
+                del self._chunks[chunk_id]
+            self._valid[chunk_ids] = False
+            self._free.extend(chunk_ids)
+            return len(chunk_ids)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to remove document from retriever: {e}")
+            raise
+    
+    def _allocate(self, count: int, dimension: int) -> List[int]:
+        """Reserve rows for new chunks, reusing free rows before growing the matrix."""
+        if self._embeddings is None:
+            capacity = max(self.initial_capacity, count)
+            self._embeddings = np.zeros((capacity, dimension), dtype=np.float32)
+            self._valid = np.zeros(capacity, dtype=bool)
+        elif dimension != self._embeddings.shape[1]:
+            raise ValueError(f"Embedding dimension {dimension} does not match {self._embeddings.shape[1]}")
+        
+        reused = min(count, len(self._free))
+        chunk_ids = [self._free.pop() for _ in range(reused)]
+        
+        new_size = self._size + count - reused
+        if new_size > len(self._embeddings):
+            # Double the capacity, so that appends are amortized constant time
+            capacity = max(new_size, 2 * len(self._embeddings))
+            embeddings = np.zeros((capacity, dimension), dtype=np.float32)
+            embeddings[:self._size] = self._embeddings[:self._size]
+            valid = np.zeros(capacity, dtype=bool)
+            valid[:self._size] = self._valid[:self._size]
+            self._embeddings, self._valid = embeddings, valid
+        
+        chunk_ids.extend(range(self._size, new_size))
+        self._size = new_size
+        return chunk_ids
+    
+    def retrieve(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        similarity_threshold: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Retrieve the chunks most similar to a query, best match first."""
+        try:
+            top_k = top_k or self.top_k
+            threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+            if not self._chunks:
+                return []
+            
+            query_embedding = self.embedding_generator.encode(query)[0]
+            
+            similarities = self._embeddings[:self._size] @ query_embedding
+            similarities[~self._valid[:self._size]] = -np.inf
+            
+            # Select the top k without sorting all similarities
+            k = min(top_k, len(self._chunks))
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+            
+            return [
+                {**self._chunks[chunk_id], 'chunk_id': int(chunk_id), 'score': float(similarities[chunk_id])}
+                for chunk_id in top
+                if similarities[chunk_id] >= threshold
+            ]
+            
+        except Exception as e:
+            self.logger.error(f"Failed to retrieve chunks: {e}")
+            raise
+    
+    def clear(self) -> None:
+        """Remove all chunks."""
+        self._embeddings: Optional[np.ndarray] = None
+        self._valid: Optional[np.ndarray] = None
+        self._size = 0
+        self._free: List[int] = []
+        self._chunks: Dict[int, Dict[str, Any]] = {}
+        self._document_chunks: Dict[str, List[int]] = {}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about the retriever."""
+        return {
+            'num_chunks': len(self._chunks),
+            'num_documents': len(self._document_chunks),
+            'capacity': 0 if self._embeddings is None else len(self._embeddings),
+            'free_rows': len(self._free),
+            'top_k': self.top_k,
+            'similarity_threshold': self.similarity_threshold
+        }
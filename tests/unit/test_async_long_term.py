@@ -0,0 +1,97 @@
+"""
+Unit tests for asynchronous long-term memory.
+"""
+
+import asyncio
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from core.memory.async_long_term import AsyncLongTermMemory
+
+class TestAsyncLongTermMemory(unittest.IsolatedAsyncioTestCase):
+    """Writes are group-committed by one thread; reads use a pool."""
+    
+    async def asyncSetUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.memory = AsyncLongTermMemory(str(Path(tmp.name) / "memory.db"), readers=2)
+    
+    async def asyncTearDown(self):
+        await self.memory.close()
+    
+    async def block_writer(self) -> threading.Event:
+        """Occupy the writer thread until the returned event is set."""
+        started = threading.Event()
+        release = threading.Event()
+        
+        def wait(cursor):
+            started.set()
+            release.wait()
+        
+        self.blocked = asyncio.ensure_future(self.memory._write(wait))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        return release
+    
+    async def test_queued_writes_share_one_commit(self):
+        release = await self.block_writer()
+        adds = [asyncio.ensure_future(self.memory.add(f"note {i}")) for i in range(10)]
+        await asyncio.sleep(0.05)
+        release.set()
+        
+        ids = await asyncio.gather(*adds)
+        await self.blocked
+        self.assertEqual(len(set(ids)), 10)
+        
+        stats = await self.memory.get_stats()
+        self.assertEqual(stats['writes'], 11)
+        self.assertEqual(stats['group_commits'], 2)
+        self.assertEqual(stats['total_entries'], 10)
+        self.assertEqual(len(await self.memory.search("note")), 10)
+    
+    async def test_failed_write_keeps_rest_of_group(self):
+        release = await self.block_writer()
+        first = asyncio.ensure_future(self.memory.add("kept before"))
+        missing = asyncio.ensure_future(self.memory.update("missing", content="x"))
+        second = asyncio.ensure_future(self.memory.add("kept after"))
+        await asyncio.sleep(0.05)
+        release.set()
+        
+        with self.assertRaises(ValueError):
+            await missing
+        first_id, second_id = await first, await second
+        self.assertEqual((await self.memory.get(first_id)).content, "kept before")
+        self.assertEqual((await self.memory.get(second_id)).content, "kept after")
+    
+    async def test_cancelled_queued_write_is_dropped(self):
+        release = await self.block_writer()
+        dropped = asyncio.ensure_future(self.memory.add("never written"))
+        kept = asyncio.ensure_future(self.memory.add("written"))
+        await asyncio.sleep(0.05)
+        dropped.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await dropped
+        await asyncio.sleep(0.05)
+        release.set()
+        
+        await kept
+        results = await self.memory.search("written")
+        self.assertEqual([entry.content for entry in results], ["written"])
+    
+    async def test_write_methods_match_sync_memory(self):
+        ids = await self.memory.add_many([
+            {'id': "a", 'content': "first entry", 'tags': ["x"]},
+            {'id': "b", 'content': "second entry"}
+        ])
+        self.assertEqual(ids, ["a", "b"])
+        
+        await self.memory.update("a", metadata={'k': 1}, tags=["y"])
+        await self.memory.delete("b")
+        entry = await self.memory.get("a")
+        self.assertEqual(entry.metadata, {'k': 1})
+        self.assertEqual(entry.tags, ["y"])
+        self.assertIsNone(await self.memory.get("b"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Unit tests for the embedding cache.
+"""
+
+import itertools
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+import numpy as np
+
+from core.rag.embedding_cache import EmbeddingCache
+from core.rag.embeddings import EmbeddingGenerator
+
+DIMENSION = 4
+
+class FakeModel:
+    """Stand-in sentence transformer recording the texts it encodes."""
+    
+    def __init__(self, model_name: str, device: str = "cpu"):
+        self.encoded: List[str] = []
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return DIMENSION
+    
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.array([[len(text), 1, 2, 3] for text in texts], dtype=np.float32)
+
+class EmbeddingCacheTestCase(unittest.TestCase):
+    """Base test case providing a temporary cache path."""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db_path = Path(tmp.name) / "embeddings.db"
+    
+    def open_cache(self, **kwargs) -> EmbeddingCache:
+        """Open the cache at the temporary path."""
+        kwargs.setdefault('db_path', str(self.db_path))
+        cache = EmbeddingCache(**kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+class TestEmbeddingCache(EmbeddingCacheTestCase):
+    """An in-memory LRU in front of SQLite."""
+    
+    def test_keys_ignore_trivial_differences(self):
+        cache = self.open_cache(db_path=None)
+        self.assertEqual(cache.key("m", " café  au lait\n"), cache.key("m", "café au lait"))
+        self.assertNotEqual(cache.key("m", "text"), cache.key("other", "text"))
+    
+    def test_lru_evicts_and_disk_refills(self):
+        cache = self.open_cache(max_entries=2)
+        keys = [cache.key("m", f"text {i}") for i in range(3)]
+        cache.put_many("m", {key: np.full(DIMENSION, i) for i, key in enumerate(keys)})
+        self.assertEqual(list(cache._memory), keys[1:])
+        
+        found = cache.get_many(keys + keys[:1])
+        np.testing.assert_array_equal(found[keys[0]], np.zeros(DIMENSION, dtype=np.float32))
+        stats = cache.get_stats()
+        self.assertEqual((stats['memory_hits'], stats['disk_hits'], stats['misses']), (2, 1, 0))
+        self.assertEqual(cache.get_many([cache.key("m", "unknown")]), {})
+        self.assertEqual(cache.get_stats()['misses'], 1)
+    
+    def test_entries_survive_reopening(self):
+        cache = self.open_cache()
+        key = cache.key("m", "persisted")
+        cache.put_many("m", {key: np.arange(DIMENSION)})
+        cache.close()
+        
+        reopened = self.open_cache()
+        np.testing.assert_array_equal(reopened.get_many([key])[key], np.arange(DIMENSION))
+        self.assertEqual(reopened.get_stats()['disk_hits'], 1)
+    
+    def test_disk_keeps_most_recently_used(self):
+        cache = self.open_cache(max_entries=0, max_disk_entries=2)
+        first, second, third = (cache.key("m", text) for text in ("first", "second", "third"))
+        with mock.patch('core.rag.embedding_cache.time.time', side_effect=itertools.count()):
+            cache.put_many("m", {first: np.zeros(DIMENSION)})
+            cache.put_many("m", {second: np.zeros(DIMENSION)})
+            cache.get_many([first])
+            cache.put_many("m", {third: np.zeros(DIMENSION)})
+        
+        self.assertEqual(sorted(cache.get_many([first, second, third])), sorted([first, third]))
+        self.assertEqual(cache.get_stats()['disk_entries'], 2)
+        cache.close()
+        self.assertEqual(self.open_cache(max_disk_entries=1).get_stats()['disk_entries'], 1)
+
+class TestCachedGenerator(EmbeddingCacheTestCase):
+    """Only texts missing from the cache reach the model."""
+    
+    def make_generator(self) -> EmbeddingGenerator:
+        """Create a generator with the stand-in model."""
+        with mock.patch('core.rag.embeddings.SentenceTransformer', FakeModel):
+            generator = EmbeddingGenerator(model_name="fake", device="cpu", cache_path=str(self.db_path))
+        self.addCleanup(generator.cache.close)
+        return generator
+    
+    def test_repeated_texts_are_encoded_once(self):
+        generator = self.make_generator()
+        first = generator.generate_embeddings(["a  b", "ccc"])
+        second = generator.generate_embeddings(["ccc", "a b", "dddd"])
+        
+        self.assertEqual(generator.model.encoded, ["a b", "ccc", "dddd"])
+        self.assertEqual(np.asarray(second['embeddings']).shape, (3, DIMENSION))
+        np.testing.assert_array_equal(np.asarray(second['embeddings'])[1], np.asarray(first['embeddings'])[0])
+        self.assertEqual(generator.get_stats()['cache']['memory_hits'], 2)
+        
+        restarted = self.make_generator()
+        restarted.generate_embeddings("ccc")
+        self.assertEqual(restarted.model.encoded, [])
+    
+    def test_disk_cache_is_opt_in(self):
+        with mock.patch('core.rag.embeddings.SentenceTransformer', FakeModel):
+            generator = EmbeddingGenerator(model_name="fake", device="cpu")
+        self.addCleanup(generator.cache.close)
+        
+        generator.generate_embeddings("text")
+        self.assertIsNone(generator.get_stats()['cache']['db_path'])
+        self.assertIsNone(generator.cache._conn)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for the embedding generator.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+import numpy as np
+
+from core.rag.embeddings import EmbeddingGenerator
+
+class FakeModel:
+    """Stand-in sentence transformer embedding texts by their letters."""
+    
+    def __init__(self, model_name: str, device: str = "cpu"):
+        pass
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return 2
+    
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        return np.array([[text.count("x"), text.count("y")] for text in texts], dtype=np.float32)
+
+class EmbeddingGeneratorTestCase(unittest.TestCase):
+    """Base test case with a stand-in model and no disk cache."""
+    
+    def setUp(self):
+        with mock.patch('core.rag.embeddings.SentenceTransformer', FakeModel):
+            self.generator = EmbeddingGenerator(model_name="fake", device="cpu", cache_path=None)
+        self.addCleanup(self.generator.cache.close)
+
+class TestEncode(EmbeddingGeneratorTestCase):
+    """Embeddings are returned as float32 arrays."""
+    
+    def test_encode_returns_unit_rows(self):
+        embeddings = self.generator.encode(["xxx", "yyyy", "xy"])
+        
+        self.assertEqual(embeddings.dtype, np.float32)
+        self.assertTrue(embeddings.flags['C_CONTIGUOUS'])
+        np.testing.assert_allclose(embeddings[:2], [[1, 0], [0, 1]])
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1, rtol=1e-6)
+        np.testing.assert_array_equal(self.generator.encode("xxx", normalize=False), [[3, 0]])
+    
+    def test_generate_embeddings_keeps_lists(self):
+        result = self.generator.generate_embeddings(["xxx"], metadata={'source': "test"})
+        
+        self.assertEqual(result['embeddings'], [[3.0, 0.0]])
+        self.assertEqual(result['metadata'], {'source': "test"})
+
+class TestSimilarity(EmbeddingGeneratorTestCase):
+    """Similarities are computed on arrays without list round trips."""
+    
+    def test_find_most_similar_ranks_top_k(self):
+        documents = np.array([[0, 1], [1, 0], [1, 1], [2, 0.1]], dtype=np.float32)
+        query = np.array([1, 0], dtype=np.float32)
+        
+        similarities = self.generator.compute_similarity(query, documents)
+        self.assertIsInstance(similarities, np.ndarray)
+        self.assertAlmostEqual(float(similarities[2]), 2 ** -0.5, places=6)
+        self.assertEqual(self.generator.find_most_similar(query, documents, top_k=3).tolist(), [1, 3, 2])
+        self.assertEqual(self.generator.find_most_similar(query, documents, top_k=10).tolist(), [1, 3, 2, 0])
+        self.assertEqual(len(self.generator.find_most_similar(query, documents, top_k=0)), 0)
+    
+    def test_normalized_skips_norms(self):
+        documents = self.generator.encode(["x", "xy"])
+        query = self.generator.encode("x")[0]
+        
+        np.testing.assert_allclose(
+            self.generator.compute_similarity(query, documents, normalized=True),
+            self.generator.compute_similarity(query, documents),
+            rtol=1e-6
+        )
+        # Unnormalized inputs are not rescaled
+        self.assertEqual(self.generator.compute_similarity([2, 0], [[3, 0]], normalized=True).tolist(), [6])
+
+class TestPersistence(EmbeddingGeneratorTestCase):
+    """Embedding matrices are saved as memory-mappable .npy files."""
+    
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "embeddings" / "saved.json"
+    
+    def test_save_and_load_round_trip(self):
+        result = self.generator.generate_embeddings(["x", "xyy"], metadata={'source': "test"})
+        self.generator.save_embeddings(result, str(self.path))
+        
+        self.assertEqual(sorted(path.name for path in self.path.parent.iterdir()), ["saved.json", "saved.npy"])
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)['embeddings_file'], "saved.npy")
+        loaded = self.generator.load_embeddings(str(self.path))
+        self.assertIsInstance(loaded['embeddings'], np.memmap)
+        np.testing.assert_array_equal(loaded['embeddings'], [[1, 0], [1, 2]])
+        self.assertEqual(loaded['metadata'], {'source': "test"})
+        
+        in_memory = self.generator.load_embeddings(str(self.path), mmap=False)
+        self.assertNotIsInstance(in_memory['embeddings'], np.memmap)
+        self.assertEqual(in_memory['embeddings'].dtype, np.float32)
+    
+    def test_legacy_json_is_loaded_and_migrated(self):
+        self.path.parent.mkdir(parents=True)
+        with open(self.path, 'w') as f:
+            json.dump({'embeddings': [[1, 2], [3, 4]], 'dimension': 2}, f, indent=2)
+        
+        loaded = self.generator.load_embeddings(str(self.path))
+        self.assertEqual(loaded['embeddings'].dtype, np.float32)
+        self.assertEqual(loaded['dimension'], 2)
+        
+        self.generator.save_embeddings(loaded, str(self.path))
+        with open(self.path) as f:
+            self.assertNotIn('embeddings', json.load(f))
+        np.testing.assert_array_equal(self.generator.load_embeddings(str(self.path))['embeddings'], [[1, 2], [3, 4]])
+    
+    def test_npy_path_is_rejected(self):
+        result = self.generator.generate_embeddings("x")
+        with self.assertRaises(ValueError):
+            self.generator.save_embeddings(result, str(self.path.with_suffix(".npy")))
+
+if __name__ == '__main__':
+    unittest.main()
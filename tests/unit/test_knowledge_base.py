@@ -0,0 +1,151 @@
+"""
+Unit tests for the knowledge base.
+"""
+
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List, Union
+from unittest import mock
+
+import numpy as np
+
+from core.rag.knowledge_base import KnowledgeBase
+
+DIMENSION = 8
+
+class FakeEmbeddingGenerator:
+    """Embeds texts by hashing them, counting the texts embedded."""
+    
+    def __init__(self, model_name: str = "fake-model"):
+        self.model_name = model_name
+        self.embedding_dim = DIMENSION
+        self.embedded: List[str] = []
+    
+    def encode(self, texts: Union[str, List[str]], normalize: bool = True) -> np.ndarray:
+        texts = [texts] if isinstance(texts, str) else texts
+        self.embedded.extend(texts)
+        embeddings = np.array([self.embed(text) for text in texts], dtype=np.float32)
+        if normalize:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+    
+    @staticmethod
+    def embed(text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], 'little')
+        return np.random.default_rng(seed).random(DIMENSION, dtype=np.float32)
+
+def document_text(topic: str) -> str:
+    """Build a document long enough to be split into several chunks."""
+    return " ".join(f"Sentence {i} about {topic} and its treatment." for i in range(12))
+
+class KnowledgeBaseTestCase(unittest.TestCase):
+    """Base test case with a stand-in model and a temporary directory."""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base_dir = Path(tmp.name)
+        
+        # The tokenizer is unused by chunking and cannot be downloaded here
+        patcher = mock.patch('tiktoken.get_encoding')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def open_knowledge_base(self, model_name: str = "fake-model") -> KnowledgeBase:
+        """Open the knowledge base with a stand-in embedding model."""
+        with mock.patch('core.rag.knowledge_base.EmbeddingGenerator', lambda: FakeEmbeddingGenerator(model_name)):
+            return KnowledgeBase(base_dir=str(self.base_dir), chunk_size=200, chunk_overlap=20)
+    
+    def chunks(self, kb: KnowledgeBase) -> List[str]:
+        """Get the chunks held by the retriever."""
+        return sorted(chunk['content'] for chunk in kb.retriever._chunks.values())
+
+class TestEmbeddingSegments(KnowledgeBaseTestCase):
+    """Chunk embeddings are persisted as memory-mapped segments."""
+    
+    def test_reopening_reuses_segments(self):
+        kb = self.open_knowledge_base()
+        kb.add_document(document_text("asthma"), {'id': "asthma"})
+        kb.add_document(document_text("diabetes"), {'id': "diabetes"})
+        chunks = self.chunks(kb)
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(len(list(kb.embeddings_dir.glob("*.npy"))), 2)
+        
+        reopened = self.open_knowledge_base()
+        self.assertEqual(reopened.embedding_generator.embedded, [])
+        self.assertEqual(self.chunks(reopened), chunks)
+        result = reopened.query(chunks[1], top_k=1)[0]
+        self.assertEqual(result['content'], chunks[1])
+        self.assertAlmostEqual(result['score'], 1.0, places=5)
+        
+        embeddings = reopened._load_embeddings("asthma", reopened.get_document("asthma")['chunks'])
+        self.assertIsInstance(embeddings, np.memmap)
+        self.assertEqual(embeddings.dtype, np.float32)
+    
+    def test_identical_documents_share_a_segment(self):
+        kb = self.open_knowledge_base()
+        kb.add_document(document_text("asthma"), {'id': "first"})
+        embedded = len(kb.embedding_generator.embedded)
+        kb.add_document(document_text("asthma"), {'id': "second"})
+        
+        self.assertEqual(len(kb.embedding_generator.embedded), embedded)
+        self.assertEqual(len(list(kb.embeddings_dir.glob("*.npy"))), 1)
+    
+    def test_model_change_reembeds_and_drops_old_segments(self):
+        kb = self.open_knowledge_base()
+        kb.add_document(document_text("asthma"), {'id': "asthma"})
+        old_segments = set(kb.embeddings_dir.glob("*.npy"))
+        
+        reopened = self.open_knowledge_base(model_name="other-model")
+        self.assertEqual(len(reopened.embedding_generator.embedded), len(self.chunks(reopened)))
+        new_segments = set(reopened.embeddings_dir.glob("*.npy"))
+        self.assertEqual(len(new_segments), 1)
+        self.assertFalse(old_segments & new_segments)
+        self.assertEqual(list(reopened.embeddings_dir.glob("*.tmp")), [])
+
+class TestDeletion(KnowledgeBaseTestCase):
+    """Documents are removed from the retriever one at a time."""
+    
+    def test_delete_removes_only_that_document(self):
+        kb = self.open_knowledge_base()
+        kb.add_document(document_text("asthma"), {'id': "asthma"})
+        kb.add_document(document_text("diabetes"), {'id': "diabetes"})
+        kb.add_document(document_text("diabetes"), {'id': "diabetes-copy"})
+        embedded = len(kb.embedding_generator.embedded)
+        
+        kb.delete_document("asthma")
+        self.assertIsNone(kb.get_document("asthma"))
+        self.assertTrue(all("asthma" not in chunk for chunk in self.chunks(kb)))
+        self.assertEqual(len(kb.embedding_generator.embedded), embedded)
+        self.assertEqual(len(list(kb.embeddings_dir.glob("*.npy"))), 1)
+        
+        # A segment shared with another document is kept
+        kb.delete_document("diabetes")
+        self.assertEqual(len(list(kb.embeddings_dir.glob("*.npy"))), 1)
+        self.assertEqual(kb.get_stats()['retriever_stats']['num_documents'], 1)
+        self.assertEqual(kb.query(document_text("diabetes")[:150], top_k=1)[0]['document_id'], "diabetes-copy")
+    
+    def test_segments_are_reference_counted(self):
+        kb = self.open_knowledge_base()
+        kb.add_document(document_text("asthma"), {'id': "first"})
+        kb.add_document(document_text("asthma"), {'id': "second"})
+        shared = kb._embedding_keys["first"]
+        self.assertEqual(kb._embedding_refs, {shared: 2})
+        
+        # Re-adding a document releases its previous segment
+        kb.add_document(document_text("diabetes"), {'id': "second"})
+        replaced = kb._embedding_keys["second"]
+        self.assertEqual(kb._embedding_refs, {shared: 1, replaced: 1})
+        self.assertEqual(len(list(kb.embeddings_dir.glob("*.npy"))), 2)
+        
+        kb.delete_document("first")
+        self.assertEqual(kb._embedding_refs, {replaced: 1})
+        self.assertEqual(list(kb.embeddings_dir.glob("*.npy")), [kb.embeddings_dir / f"{replaced}.npy"])
+        
+        reopened = self.open_knowledge_base()
+        self.assertEqual(reopened._embedding_refs, {replaced: 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,457 @@
+"""
+Unit tests for long-term memory.
+"""
+
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from core.memory.long_term import HOT_SCHEMA, LongTermMemory, MemoryEntry
+from core.memory.serializers import get_serializer
+
+class LongTermMemoryTestCase(unittest.TestCase):
+    """Base test case providing a temporary database path."""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db_path = Path(tmp.name) / "memory.db"
+    
+    def open_memory(self, **kwargs) -> LongTermMemory:
+        """Open long-term memory at the temporary database path."""
+        memory = LongTermMemory(str(self.db_path), **kwargs)
+        self.addCleanup(memory.close)
+        return memory
+    
+    def set_updated_at(self, memory: LongTermMemory, entry_id: str, updated_at: datetime) -> None:
+        """Backdate the last update of a hot entry."""
+        with memory._get_connection() as conn:
+            conn.execute(
+                "UPDATE memories SET updated_at = ? WHERE id = ?",
+                (updated_at.isoformat(), entry_id)
+            )
+
+class TestConnectionPool(LongTermMemoryTestCase):
+    """Each thread reuses one persistent connection."""
+    
+    def test_connection_is_reused_per_thread(self):
+        memory = self.open_memory()
+        conn = memory._get_connection()
+        self.assertIs(memory._get_connection(), conn)
+        
+        other = []
+        thread = threading.Thread(target=lambda: other.append(memory._get_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], conn)
+        
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+    
+    def test_close_reopens_on_next_use(self):
+        memory = self.open_memory()
+        entry_id = memory.add("first note", {'source': "test"}, tags=["a"])
+        conn = memory._get_connection()
+        
+        memory.close()
+        self.assertIsNot(memory._get_connection(), conn)
+        entry = memory.get(entry_id)
+        self.assertEqual(entry.content, "first note")
+        self.assertEqual(entry.metadata, {'source': "test"})
+        self.assertEqual(entry.tags, ["a"])
+    
+    def test_writes_from_other_threads_are_visible(self):
+        memory = self.open_memory()
+        threads = [
+            threading.Thread(target=memory.add, args=(f"note {i}",), kwargs={'metadata': {'i': i}})
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(memory.get_stats()['total_entries'], 4)
+        self.assertEqual(len(memory.search("note")), 4)
+
+class TestFullTextSearch(LongTermMemoryTestCase):
+    """Searches go through the FTS5 index, ranked by BM25."""
+    
+    def test_results_are_ranked_with_snippets(self):
+        memory = self.open_memory()
+        once = memory.add("The patient mentioned hypertension once")
+        often = memory.add("hypertension hypertension hypertension")
+        memory.add("Nothing relevant here")
+        
+        results = memory.search("hypertension")
+        self.assertEqual([entry.id for entry in results], [often, once])
+        self.assertGreater(results[0].score, results[1].score)
+        self.assertIn("[hypertension]", results[1].snippet)
+    
+    def test_every_word_must_match(self):
+        memory = self.open_memory()
+        both = memory.add("blood pressure reading")
+        memory.add("blood test results")
+        
+        self.assertEqual([entry.id for entry in memory.search("pressure blood")], [both])
+        self.assertEqual(len(memory.search("blood")), 2)
+        self.assertEqual(len(memory.search("blo*")), 2)
+        self.assertEqual(memory.search("blo"), [])
+    
+    def test_query_syntax_is_not_interpreted(self):
+        memory = self.open_memory()
+        entry_id = memory.add("call NOT the doctor")
+        
+        self.assertEqual([entry.id for entry in memory.search('NOT "doctor')], [entry_id])
+        self.assertEqual([entry.id for entry in memory.search("content:doctor")], [])
+    
+    def test_index_follows_updates_and_deletes(self):
+        memory = self.open_memory()
+        entry_id = memory.add("initial text", {'topic': "café"}, tags=["x"])
+        other_id = memory.add("initial draft")
+        
+        memory.update(entry_id, content="revised text")
+        memory.delete(other_id)
+        self.assertEqual(memory.search("initial"), [])
+        self.assertEqual([entry.id for entry in memory.search("revised")], [entry_id])
+        self.assertEqual([entry.id for entry in memory.search("café", tags=["x"])], [entry_id])
+        self.assertEqual(memory.search("café", tags=["y"]), [])
+
+class TestTagQueries(LongTermMemoryTestCase):
+    """Tags are read in the main query and filtered through an index."""
+    
+    def test_tags_with_separators_round_trip(self):
+        memory = self.open_memory()
+        entry_id = memory.add("tagged note", tags=["a,b", "c d", "e"])
+        untagged_id = memory.add("plain note")
+        
+        self.assertEqual(sorted(memory.get(entry_id).tags), ["a,b", "c d", "e"])
+        self.assertEqual(memory.get(untagged_id).tags, [])
+        results = {entry.id: entry.tags for entry in memory.search("note")}
+        self.assertEqual(sorted(results[entry_id]), ["a,b", "c d", "e"])
+        self.assertEqual(results[untagged_id], [])
+        self.assertEqual([entry.id for entry in memory.search("note", tags=["a,b"])], [entry_id])
+    
+    def test_tag_filter_uses_index(self):
+        memory = self.open_memory()
+        with memory._get_connection() as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT memory_id FROM tags WHERE tag IN ('a', 'b')"
+            ).fetchall()
+        self.assertTrue(any("idx_tags_tag" in row[-1] for row in plan))
+    
+    def test_substring_search_returns_newest_first(self):
+        memory = self.open_memory()
+        first = memory.add("a - b")
+        second = memory.add("c - d")
+        with memory._get_connection() as conn:
+            conn.execute("UPDATE memories SET updated_at = '2000-01-01T00:00:00' WHERE id = ?", (first,))
+        
+        self.assertEqual([entry.id for entry in memory.search("-")], [second, first])
+
+class TestBulkWrites(LongTermMemoryTestCase):
+    """Entries added in bulk and imported from conversation files."""
+    
+    def test_add_many_upserts_in_place(self):
+        memory = self.open_memory()
+        created = datetime(2025, 4, 25, 14, 47, 3)
+        ids = memory.add_many(
+            ({'id': f"e{i}", 'content': f"entry {i}", 'tags': ["old"], 'created_at': created}
+             for i in range(5)),
+            batch_size=2
+        )
+        self.assertEqual(ids, [f"e{i}" for i in range(5)])
+        self.assertEqual(memory.get("e3").created_at, created)
+        self.assertEqual(memory.get("e3").updated_at, created)
+        
+        updated = datetime(2025, 5, 1)
+        memory.add_many([
+            {'id': "e3", 'content': "revised entry", 'tags': ["new"], 'updated_at': updated},
+            MemoryEntry(id="e9", content="object entry", metadata={'k': 1},
+                        created_at=created, updated_at=created, tags=[])
+        ])
+        
+        entry = memory.get("e3")
+        self.assertEqual(entry.content, "revised entry")
+        self.assertEqual(entry.tags, ["new"])
+        self.assertEqual(entry.created_at, created)
+        self.assertEqual(entry.updated_at, updated)
+        self.assertEqual(memory.get("e9").metadata, {'k': 1})
+        self.assertEqual(memory.get_stats()['total_entries'], 6)
+        self.assertEqual([entry.id for entry in memory.search("revised")], ["e3"])
+    
+    def test_import_conversations_is_idempotent(self):
+        path = self.db_path.parent / "medical_conversation_test.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': "2025-04-25T14:47:03",
+                'conversation': [
+                    {'timestamp': "2025-04-25T14:45:38", 'text': "sore throat and fever",
+                     'extracted_terms': {'symptoms': ["fever", "sore throat"]}},
+                    {'text': "take paracetamol", 'extracted_terms': {}}
+                ],
+                'insights': {'summary': "likely viral infection"}
+            }, f)
+        
+        memory = self.open_memory()
+        self.assertEqual(memory.import_conversations([path]), 3)
+        self.assertEqual(memory.import_conversations([str(path)]), 3)
+        self.assertEqual(memory.get_stats()['total_entries'], 3)
+        
+        turn = memory.get("medical_conversation_test_turn_0000")
+        self.assertEqual(turn.content, "sore throat and fever")
+        self.assertEqual(turn.tags, ["conversation", "fever", "sore throat"])
+        self.assertEqual(turn.metadata['file'], path.name)
+        self.assertEqual(memory.get("medical_conversation_test_turn_0001").created_at,
+                         datetime(2025, 4, 25, 14, 47, 3))
+        self.assertEqual(
+            [entry.id for entry in memory.search("viral", tags=["insights"])],
+            ["medical_conversation_test_insights"]
+        )
+
+class TestBaselineDatabase(LongTermMemoryTestCase):
+    """Databases written by the first version store JSON text rows."""
+    
+    def write_baseline_db(self) -> None:
+        """Create a database the way the first version of LongTermMemory did."""
+        now = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE memories (
+                    id TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE tags (
+                    memory_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (memory_id, tag),
+                    FOREIGN KEY (memory_id) REFERENCES memories (id)
+                )
+            """)
+            rows = [
+                ("legacy1", "Patient reports hypertension and headaches", {'source': "intake"}),
+                ("legacy2", {'note': "Follow-up on blood pressure"}, {'source': "visit"}),
+                ("legacy3", "Unrelated shopping list", {'source': "notes"})
+            ]
+            for entry_id, content, metadata in rows:
+                conn.execute("""
+                    INSERT INTO memories (id, content, metadata, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (entry_id, json.dumps(content), json.dumps(metadata), now, now))
+            conn.execute("INSERT INTO tags (memory_id, tag) VALUES ('legacy1', 'medical')")
+    
+    def test_text_rows_are_searchable(self):
+        self.write_baseline_db()
+        memory = self.open_memory()
+        self.assertTrue(memory.fts_enabled)
+        
+        results = memory.search("hypertension")
+        self.assertEqual([entry.id for entry in results], ["legacy1"])
+        self.assertEqual(results[0].content, "Patient reports hypertension and headaches")
+        self.assertEqual(results[0].tags, ["medical"])
+        
+        self.assertEqual([entry.id for entry in memory.search("blood pressure")], ["legacy2"])
+        self.assertEqual([entry.id for entry in memory.search("hyper*")], ["legacy1"])
+        self.assertEqual(
+            [entry.id for entry in memory.search("headaches", tags=["medical"])],
+            ["legacy1"]
+        )
+    
+    def test_text_rows_are_read_and_rewritten_as_blobs(self):
+        self.write_baseline_db()
+        memory = self.open_memory()
+        
+        entry = memory.get("legacy2")
+        self.assertEqual(entry.content, {'note': "Follow-up on blood pressure"})
+        self.assertEqual(entry.metadata, {'source': "visit"})
+        
+        memory.update("legacy2", content="Blood pressure normal")
+        new_id = memory.add("New hypertension reading", tags=["medical"])
+        
+        with memory._get_connection() as conn:
+            types = dict(conn.execute("SELECT id, typeof(content) FROM memories"))
+        self.assertEqual(types["legacy1"], "text")
+        self.assertEqual(types["legacy2"], "blob")
+        self.assertEqual(types[new_id], "blob")
+        
+        # Text and blob rows are found by the same index
+        self.assertEqual(
+            {entry.id for entry in memory.search("hypertension")},
+            {"legacy1", new_id}
+        )
+        self.assertEqual([entry.id for entry in memory.search("normal")], ["legacy2"])
+    
+    def test_substring_search_reads_text_and_blob_rows(self):
+        self.write_baseline_db()
+        memory = self.open_memory()
+        new_id = memory.add("Eggs - milk")
+        
+        # Queries without words are matched as substrings
+        self.assertEqual(
+            {entry.id for entry in memory.search("-")},
+            {"legacy2", new_id}
+        )
+
+class TestSerializers(LongTermMemoryTestCase):
+    """Values are stored as bytes by a pluggable serializer."""
+    
+    def test_serializers_read_each_others_rows(self):
+        memory = self.open_memory(serializer="json")
+        self.assertEqual(memory.get_stats()['serializer'], "json")
+        entry_id = memory.add({'text': "naïve café", 1: [1.5, None]}, {'source': "json"})
+        memory.close()
+        
+        for name in ("json", None):
+            with self.subTest(serializer=name):
+                reopened = self.open_memory(serializer=name)
+                entry = reopened.get(entry_id)
+                self.assertEqual(entry.content, {'text': "naïve café", '1': [1.5, None]})
+                self.assertEqual([e.id for e in reopened.search("café")], [entry_id])
+    
+    def test_unknown_serializer_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_serializer("msgpack")
+        self.assertEqual(get_serializer("json").loads(get_serializer("json").dumps([1])), [1])
+
+class TestTiers(LongTermMemoryTestCase):
+    """Memories move from the hot tier to the archive."""
+    
+    def test_archive_moves_old_entries(self):
+        memory = self.open_memory()
+        old_id = memory.add("Old hypertension note", {'visit': 1}, tags=["medical"])
+        new_id = memory.add("Recent hypertension note", {'visit': 2}, tags=["medical"])
+        self.set_updated_at(memory, old_id, datetime.now() - timedelta(days=60))
+        
+        self.assertEqual(memory.archive(timedelta(days=30)), 1)
+        
+        self.assertIsNone(memory.get(old_id))
+        archived = memory.get(old_id, include_archive=True)
+        self.assertEqual(archived.content, "Old hypertension note")
+        self.assertEqual(archived.metadata, {'visit': 1})
+        self.assertEqual(archived.tags, ["medical"])
+        
+        self.assertEqual([entry.id for entry in memory.search("hypertension")], [new_id])
+        self.assertEqual(
+            {entry.id for entry in memory.search("hypertension", include_archive=True)},
+            {old_id, new_id}
+        )
+        self.assertEqual(
+            {entry.id for entry in memory.search("hypertension", tags=["medical"], include_archive=True)},
+            {old_id, new_id}
+        )
+        
+        stats = memory.get_stats()
+        self.assertEqual(stats['total_entries'], 1)
+        self.assertEqual(stats['archived_entries'], 1)
+    
+    def test_archive_adds_summary(self):
+        memory = self.open_memory()
+        for i in range(3):
+            entry_id = memory.add(f"note {i}")
+            self.set_updated_at(memory, entry_id, datetime.now() - timedelta(days=60 - i))
+        
+        summaries = []
+        def summarize(entries):
+            summaries.append([entry.content for entry in entries])
+            return f"{len(entries)} notes"
+        
+        self.assertEqual(memory.archive(timedelta(days=30), summarize=summarize, batch_size=2), 3)
+        self.assertEqual(summaries, [["note 0", "note 1"], ["note 2"]])
+        
+        hot = memory.search("notes")
+        self.assertEqual(sorted(entry.content for entry in hot), ["1 notes", "2 notes"])
+        self.assertTrue(all(entry.tags == ["archive_summary"] for entry in hot))
+    
+    def test_compact_archives_by_retention_and_budget(self):
+        memory = self.open_memory()
+        old_ids = []
+        for i in range(5):
+            entry_id = memory.add(f"old entry {i}")
+            self.set_updated_at(memory, entry_id, datetime.now() - timedelta(days=90))
+            old_ids.append(entry_id)
+        new_ids = [memory.add(f"new entry {i} " + "x" * 2000) for i in range(50)]
+        
+        result = memory.compact(retention=timedelta(days=30))
+        self.assertEqual(result['archived'], 5)
+        self.assertEqual(
+            {entry.id for entry in memory.search("old", include_archive=True)},
+            set(old_ids)
+        )
+        
+        # A budget below the hot tier archives its oldest entries
+        result = memory.compact(retention=None, max_bytes=result['hot_bytes'] // 2)
+        self.assertGreater(result['archived'], 0)
+        self.assertLessEqual(result['hot_bytes'], memory.get_stats()['hot_bytes'])
+        self.assertEqual(memory.get_stats()['total_entries'], len(new_ids) - result['archived'])
+        
+        # Search still works after the tiers are vacuumed
+        self.assertEqual(len(memory.search("new", include_archive=True)), len(new_ids))
+    
+    def test_failed_vacuum_keeps_search_index(self):
+        memory = self.open_memory()
+        kept = memory.add("kept note")
+        for entry_id in [memory.add(f"removed note {i} " + "x" * 2000) for i in range(20)]:
+            memory.delete(entry_id)
+        
+        # VACUUM fails while a statement of the connection is running
+        pending = memory._get_connection().execute("SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3")
+        pending.fetchone()
+        with self.assertRaises(sqlite3.OperationalError):
+            memory._vacuum(HOT_SCHEMA)
+        pending.close()
+        
+        self.assertEqual([entry.id for entry in memory.search("kept")], [kept])
+    
+    def test_delete_reaches_archived_entries(self):
+        memory = self.open_memory()
+        entry_id = memory.add("archived note")
+        self.set_updated_at(memory, entry_id, datetime.now() - timedelta(days=60))
+        memory.archive(timedelta(days=30))
+        
+        memory.delete(entry_id)
+        self.assertIsNone(memory.get(entry_id, include_archive=True))
+        self.assertEqual(memory.get_stats()['archived_entries'], 0)
+    
+    def test_update_restores_archived_entry(self):
+        memory = self.open_memory()
+        entry_id = memory.add("archived note", tags=["kept"])
+        self.set_updated_at(memory, entry_id, datetime.now() - timedelta(days=60))
+        memory.archive(timedelta(days=30))
+        
+        memory.update(entry_id, content="revived note")
+        entry = memory.get(entry_id)
+        self.assertEqual(entry.content, "revived note")
+        self.assertEqual(entry.tags, ["kept"])
+        self.assertEqual([entry.id for entry in memory.search("revived")], [entry_id])
+        self.assertEqual(memory.get_stats()['archived_entries'], 0)
+    
+    def test_scheduled_compaction_runs_until_close(self):
+        memory = self.open_memory()
+        entry_id = memory.add("stale note")
+        self.set_updated_at(memory, entry_id, datetime.now() - timedelta(days=60))
+        
+        memory.schedule_compaction(0.01, retention=timedelta(days=30))
+        with self.assertRaises(RuntimeError):
+            memory.schedule_compaction(0.01)
+        thread = memory._compaction_thread
+        for _ in range(500):
+            if memory.get(entry_id) is None:
+                break
+            thread.join(0.01)
+        
+        memory.close()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(memory.get(entry_id))
+        self.assertIsNotNone(memory.get(entry_id, include_archive=True))
+
+if __name__ == '__main__':
+    unittest.main()
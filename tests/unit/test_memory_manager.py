@@ -0,0 +1,121 @@
+"""
+Unit tests for the memory manager.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core.memory.long_term import LongTermMemory
+from core.memory.manager import MemoryManager
+
+class MemoryManagerTestCase(unittest.IsolatedAsyncioTestCase):
+    """Base test case counting four characters per token."""
+    
+    def setUp(self):
+        # Token counts are estimated, as without tiktoken
+        patcher = mock.patch.object(MemoryManager, '_load_encoding', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage_path = Path(tmp.name)
+
+class TestHistoryBudget(MemoryManagerTestCase):
+    """The conversation history is bounded by a token budget."""
+    
+    async def test_oldest_turns_are_evicted(self):
+        manager = MemoryManager({'history_max_tokens': 10})
+        for i in range(5):
+            await manager.add_interaction(f"turn {i} ")  # 2 tokens each
+        
+        self.assertEqual(manager.history_tokens, 10)
+        await manager.add_interaction("twelve chars")
+        self.assertEqual([turn['text'] for turn in manager.conversation_history][0], "turn 2 ")
+        self.assertEqual(manager.history_tokens, 9)
+        
+        # The newest turn is kept even when it alone exceeds the budget
+        await manager.add_interaction("x" * 100, role="assistant")
+        self.assertEqual(len(manager.conversation_history), 1)
+        self.assertEqual(manager.get_summary()['conversation_tokens'], 25)
+    
+    async def test_recent_history_fits_budget(self):
+        manager = MemoryManager({})
+        for text in ("aaaa", "bbbbbbbb", "cccc"):
+            await manager.add_interaction(text)
+        
+        self.assertEqual([turn['text'] for turn in manager.get_recent_history(3)], ["bbbbbbbb", "cccc"])
+        self.assertEqual([turn['text'] for turn in manager.get_recent_history(2)], ["cccc"])
+        self.assertEqual(manager.get_recent_history(0), [])
+        self.assertEqual(len(manager.get_recent_history()), 3)
+
+class TestEncoding(unittest.IsolatedAsyncioTestCase):
+    """Token counts fall back to an estimate without an encoding."""
+    
+    async def test_unavailable_encoding_falls_back_to_estimate(self):
+        with mock.patch('tiktoken.get_encoding', side_effect=ConnectionError("offline")):
+            with self.assertLogs('core.memory.manager', level='WARNING'):
+                manager = MemoryManager({})
+        
+        self.assertIsNone(manager._encoding)
+        self.assertEqual(manager.count_tokens("twelve chars"), 3)
+        await manager.add_interaction("twelve chars")
+        self.assertEqual(manager.history_tokens, 3)
+
+class TestSpill(MemoryManagerTestCase):
+    """Evicted turns are written to long-term memory."""
+    
+    async def test_evicted_turns_reach_long_term_memory(self):
+        long_term = LongTermMemory(str(self.storage_path / "memory.db"))
+        self.addCleanup(long_term.close)
+        manager = MemoryManager({'history_max_tokens': 2}, long_term_memory=long_term)
+        
+        await manager.add_interaction("first question")
+        await manager.add_interaction("an answer", role="assistant")
+        await manager.shutdown()
+        
+        entries = long_term.search("question", tags=["conversation"])
+        self.assertEqual([entry.content for entry in entries], ["first question"])
+        self.assertEqual(entries[0].metadata['role'], "user")
+        self.assertEqual(sorted(entries[0].tags), ["conversation", "user"])
+    
+    async def test_identical_turns_are_kept_apart(self):
+        long_term = LongTermMemory(str(self.storage_path / "memory.db"))
+        self.addCleanup(long_term.close)
+        manager = MemoryManager({'history_max_tokens': 1}, long_term_memory=long_term)
+        
+        for _ in range(3):
+            await manager.add_interaction("yes")
+        
+        entries = long_term.search("yes")
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(len({entry.id for entry in entries}), 2)
+    
+    async def test_spill_builds_and_closes_long_term_memory(self):
+        manager = MemoryManager({
+            'history_max_tokens': 1,
+            'spill_to_long_term': True,
+            'long_term': {'storage_path': str(self.storage_path)}
+        })
+        await manager.add_interaction("spilled")
+        await manager.add_interaction("kept")
+        await manager.shutdown()
+        
+        long_term = LongTermMemory(str(self.storage_path / "memory.db"))
+        self.addCleanup(long_term.close)
+        self.assertEqual([entry.content for entry in long_term.search("spilled")], ["spilled"])
+    
+    async def test_failed_spill_does_not_fail_interaction(self):
+        long_term = mock.Mock(spec=LongTermMemory)
+        long_term.add_many.side_effect = OSError("disk full")
+        manager = MemoryManager({'history_max_tokens': 1}, long_term_memory=long_term)
+        
+        await manager.add_interaction("lost")
+        with self.assertLogs('core.memory.manager', level='ERROR'):
+            await manager.add_interaction("kept")
+        self.assertEqual([turn['text'] for turn in manager.conversation_history], ["kept"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Unit tests for the knowledge base retriever.
+"""
+
+import unittest
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+from core.rag.retriever import Retriever
+
+class QueryEmbeddings:
+    """Stand-in embedding generator returning preset query embeddings."""
+    
+    def __init__(self):
+        self.embeddings: Dict[str, np.ndarray] = {}
+    
+    def encode(self, texts: Union[str, List[str]], normalize: bool = True) -> np.ndarray:
+        texts = [texts] if isinstance(texts, str) else texts
+        embeddings = np.array([self.embeddings[text] for text in texts], dtype=np.float32)
+        if normalize:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+
+def chunks(*names: str) -> List[Dict[str, Any]]:
+    """Build chunk dicts named by their content."""
+    return [{'content': name, 'metadata': {}} for name in names]
+
+class TestRetriever(unittest.TestCase):
+    """Chunks are rows of one matrix, removed per document."""
+    
+    def setUp(self):
+        self.generator = QueryEmbeddings()
+        self.retriever = Retriever(self.generator, top_k=2, similarity_threshold=0.0, initial_capacity=2)
+    
+    def query(self, embedding: List[float], **kwargs) -> List[str]:
+        """Retrieve chunk contents for a query embedding."""
+        self.generator.embeddings['q'] = np.array(embedding, dtype=np.float32)
+        return [result['content'] for result in self.retriever.retrieve('q', **kwargs)]
+    
+    def test_retrieve_ranks_by_cosine_similarity(self):
+        self.retriever.add_documents(chunks("x", "y", "xy"), [[2, 0], [0, 3], [1, 1]], document_id="d")
+        
+        self.assertEqual(self.query([1, 0.1]), ["x", "xy"])
+        self.assertEqual(self.query([1, 0.1], top_k=5), ["x", "xy", "y"])
+        self.assertEqual(self.query([1, 0], similarity_threshold=0.8), ["x"])
+        results = self.retriever.retrieve('q', top_k=1)
+        self.assertAlmostEqual(results[0]['score'], 1.0, places=6)
+        self.assertEqual(results[0]['document_id'], "d")
+    
+    def test_remove_document_frees_rows_for_reuse(self):
+        first = self.retriever.add_documents(chunks("a", "b"), [[1, 0], [0, 1]], document_id="first")
+        self.retriever.add_documents(chunks("c"), [[1, 1]], document_id="second")
+        capacity = self.retriever.get_stats()['capacity']
+        
+        self.assertEqual(self.retriever.remove_document("first"), 2)
+        self.assertEqual(self.retriever.remove_document("first"), 0)
+        self.assertEqual(self.query([1, 0], top_k=5), ["c"])
+        
+        reused = self.retriever.add_documents(chunks("d", "e"), [[1, 0], [0, 1]], document_id="third")
+        self.assertEqual(sorted(reused), sorted(first))
+        self.assertEqual(self.retriever.get_stats()['capacity'], capacity)
+        self.assertEqual(self.query([1, 0], top_k=1), ["d"])
+    
+    def test_readding_document_replaces_chunks(self):
+        self.retriever.add_documents(chunks("old"), [[1, 0]], document_id="doc")
+        self.retriever.add_documents(chunks("new", "newer"), [[1, 0], [0, 1]], document_id="doc")
+        
+        self.assertEqual(self.query([1, 0], top_k=5), ["new", "newer"])
+        stats = self.retriever.get_stats()
+        self.assertEqual(stats['num_chunks'], 2)
+        self.assertEqual(stats['num_documents'], 1)
+    
+    def test_matrix_grows_by_doubling(self):
+        for i in range(5):
+            self.retriever.add_documents(chunks(f"c{i}"), [[1, i]])
+        
+        self.assertEqual(self.retriever.get_stats()['capacity'], 8)
+        self.assertEqual(self.retriever.get_stats()['num_chunks'], 5)
+        with self.assertRaises(ValueError):
+            self.retriever.add_documents(chunks("wide"), [[1, 2, 3]])
+        
+        self.retriever.clear()
+        self.assertEqual(self.query([1, 0]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Unit tests for the sharded vector store.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from core.memory.sharded_store import SHARD_ID_SHIFT, ShardedVectorStore
+from core.memory.vector_store import VectorStore
+
+DIMENSION = 16
+
+def random_vectors(count: int, seed: int = 0) -> np.ndarray:
+    """Generate reproducible float32 test vectors."""
+    return np.random.default_rng(seed).random((count, DIMENSION), dtype=np.float32)
+
+class ShardedStoreTestCase(unittest.TestCase):
+    """Base test case providing a temporary store directory."""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store_path = Path(tmp.name)
+    
+    def make_store(self, **kwargs) -> ShardedVectorStore:
+        """Create a sharded store in the temporary directory."""
+        kwargs.setdefault('dimension', DIMENSION)
+        store = ShardedVectorStore(store_path=str(self.store_path), **kwargs)
+        self.addCleanup(self.close_store, store)
+        return store
+    
+    def close_store(self, store: ShardedVectorStore) -> None:
+        """Shut down the thread pool and every shard's metadata."""
+        store.close()
+        for shard in store.shards:
+            shard.metadata.close()
+
+class TestHashPartition(ShardedStoreTestCase):
+    """Vectors spread over a fixed number of shards."""
+    
+    def test_search_matches_single_store(self):
+        vectors = random_vectors(200)
+        metadata = [{'text': f"m{i}", 'group': i % 3} for i in range(200)]
+        sharded = self.make_store(num_shards=4)
+        ids = sharded.add_vectors(vectors, metadata)
+        
+        single = VectorStore(dimension=DIMENSION, store_path=str(self.store_path / "single"))
+        self.addCleanup(single.metadata.close)
+        single.add_vectors(vectors, metadata)
+        
+        self.assertEqual(len(set(ids)), 200)
+        self.assertEqual({vector_id >> SHARD_ID_SHIFT for vector_id in ids}, {0, 1, 2, 3})
+        queries = random_vectors(5, seed=1)
+        for where in (None, {'group': 2}):
+            with self.subTest(where=where):
+                merged = sharded.search_batch(queries, k=5, where=where)
+                expected = single.search_batch(queries, k=5, where=where)
+                np.testing.assert_allclose(merged.distances, expected.distances, rtol=1e-5)
+                texts = [[meta['text'] for meta in row] for row in merged.metadata]
+                self.assertEqual(texts, [[meta['text'] for meta in row] for row in expected.metadata])
+    
+    def test_shard_key_routes_vectors(self):
+        vectors = random_vectors(30)
+        store = self.make_store(num_shards=3, shard_key='user')
+        ids = store.add_vectors(vectors, [{'user': f"u{i % 5}"} for i in range(30)])
+        
+        shard_of = {}
+        for i, vector_id in enumerate(ids):
+            shard_of.setdefault(f"u{i % 5}", set()).add(vector_id >> SHARD_ID_SHIFT)
+        self.assertTrue(all(len(shards) == 1 for shards in shard_of.values()))
+    
+    def test_global_ids_route_to_shard(self):
+        vectors = random_vectors(20)
+        store = self.make_store(num_shards=4)
+        ids = store.add_vectors(vectors, [{'text': f"m{i}"} for i in range(20)])
+        
+        np.testing.assert_allclose(store.get_vector(ids[7]), vectors[7])
+        store.update_metadata(ids[7], {'text': "updated"})
+        result = store.search(vectors[7], k=1)[0]
+        self.assertEqual(result['vector_id'], ids[7])
+        self.assertEqual(result['metadata']['text'], "updated")
+        self.assertEqual(result['metadata']['vector_id'], ids[7])
+        
+        self.assertEqual(store.delete_vectors([ids[7], ids[8]]), 2)
+        self.assertIsNone(store.get_vector(ids[7]))
+        self.assertEqual(store.get_stats()['num_vectors'], 18)
+        self.assertEqual(store.match_ids({'text': "m9"}), {ids[9]})
+    
+    def test_save_and_load(self):
+        vectors = random_vectors(40)
+        store = self.make_store(num_shards=3)
+        ids = store.add_vectors(vectors)
+        store.save()
+        
+        loaded = self.make_store(num_shards=1)
+        loaded.load()
+        self.assertEqual(len(loaded.shards), 3)
+        self.assertEqual(loaded.get_stats()['num_vectors'], 40)
+        self.assertEqual(loaded.search(vectors[25], k=1)[0]['vector_id'], ids[25])
+
+class TestTimePartition(ShardedStoreTestCase):
+    """One shard per time window."""
+    
+    def test_new_window_starts_new_shard(self):
+        vectors = random_vectors(4)
+        store = self.make_store(partition="time", time_window=3600)
+        self.assertEqual(store.shards, [])
+        self.assertEqual(store.search_batch(vectors, k=2).vector_ids.tolist(), [[-1, -1]] * 4)
+        
+        store.add_vectors(vectors[:2])
+        store.add_vectors(vectors[2:3])
+        self.assertEqual(len(store.shards), 1)
+        
+        # Pretend the first window has passed
+        store.windows[-1] -= 1
+        ids = store.add_vectors(vectors[3:])
+        self.assertEqual(len(store.shards), 2)
+        self.assertEqual(ids[0] >> SHARD_ID_SHIFT, 1)
+        self.assertEqual(store.search(vectors[3], k=1)[0]['vector_id'], ids[0])
+    
+    def test_rejects_unknown_partition(self):
+        with self.assertRaises(ValueError):
+            ShardedVectorStore(partition="range", store_path=str(self.store_path))
+
+if __name__ == '__main__':
+    unittest.main()
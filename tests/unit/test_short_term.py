@@ -0,0 +1,137 @@
+"""
+Unit tests for short-term memory.
+"""
+
+import unittest
+
+from core.memory.short_term import ShortTermMemory
+
+class TestItemStore(unittest.TestCase):
+    """Items are kept by ID in insertion order."""
+    
+    def test_oldest_items_are_evicted(self):
+        memory = ShortTermMemory(max_items=3)
+        ids = [memory.add(f"item {i}") for i in range(5)]
+        
+        self.assertEqual([item.id for item in memory.get_all()], ids[2:])
+        self.assertIsNone(memory.get(ids[0]))
+        self.assertEqual(memory.get(ids[3]).content, "item 3")
+        
+        memory.remove(ids[3])
+        memory.remove("missing")
+        self.assertEqual([item.content for item in memory.get_all()], ["item 2", "item 4"])
+    
+    def test_search_keeps_insertion_order(self):
+        memory = ShortTermMemory()
+        first = memory.add("Blood pressure is high")
+        memory.add("Unrelated")
+        third = memory.add({'note': "structured"}, metadata={'topic': "blood test"})
+        
+        self.assertEqual([item.id for item in memory.search("blood")], [first, third])
+        self.assertEqual([item.id for item in memory.search("BLOOD", max_results=1)], [first])
+
+class TestExpiry(unittest.TestCase):
+    """Items expire through a heap of expiry times."""
+    
+    def test_expired_items_are_removed(self):
+        memory = ShortTermMemory(default_ttl=3600)
+        expired = memory.add("expired", ttl=-1)
+        kept = memory.add("kept")
+        
+        self.assertIsNone(memory.get(expired))
+        memory.add("also expired", ttl=-1)
+        self.assertEqual([item.id for item in memory.get_all()], [kept])
+        self.assertEqual(memory.get_stats()['total_items'], 1)
+    
+    def test_items_without_ttl_never_expire(self):
+        memory = ShortTermMemory(default_ttl=None)
+        item_id = memory.add("forever")
+        
+        self.assertIsNone(memory.get(item_id).expires_at)
+        self.assertEqual(memory._expiry_heap, [])
+        self.assertEqual(len(memory.get_all()), 1)
+    
+    def test_heap_drops_entries_of_removed_items(self):
+        memory = ShortTermMemory(max_items=10)
+        for i in range(1000):
+            memory.remove(memory.add(f"item {i}"))
+            memory.add(f"kept {i}")
+        
+        self.assertEqual(len(memory.items), 10)
+        self.assertLessEqual(len(memory._expiry_heap), 2 * len(memory.items) + 17)
+        
+        memory.clear()
+        self.assertEqual(memory._expiry_heap, [])
+        self.assertEqual(memory.get_all(), [])
+
+class NoIteration(list):
+    """List failing when iterated, as by a scan, but not when bisected."""
+    
+    def __iter__(self):
+        raise AssertionError("vocabulary scanned")
+
+class TestWordIndex(unittest.TestCase):
+    """Searches narrow their candidates through an inverted index."""
+    
+    def test_search_matches_substrings(self):
+        memory = ShortTermMemory()
+        both = memory.add("Medication for blood pressure")
+        memory.add("blood test", metadata={'source': "lab"})
+        lab = memory.add("results", metadata={'source': "Lab report"})
+        hello = memory.add("hello world")
+        
+        self.assertEqual([item.id for item in memory.search("BLOOD pressure")], [both])
+        self.assertEqual(memory.search("pressure blood"), [])
+        self.assertEqual([item.id for item in memory.search("medica")], [both])
+        self.assertEqual([item.id for item in memory.search("ication for bl")], [both])
+        self.assertEqual([item.id for item in memory.search("lo wor")], [hello])
+        self.assertEqual(len(memory.search("lab")), 2)
+        self.assertEqual([item.id for item in memory.search("lab report")], [lab])
+        self.assertEqual([item.id for item in memory.search("ESUL")], [lab])
+    
+    def test_lookups_do_not_scan_vocabulary(self):
+        memory = ShortTermMemory(max_items=5000, default_ttl=None)
+        for i in range(4000):
+            memory.add(f"filler{i} note{i * 7919 % 4000}")
+        both = memory.add("Medication for blood pressure")
+        
+        # Only queries shorter than a trigram may iterate the vocabulary
+        memory._vocabulary = NoIteration(memory._vocabulary)
+        memory._reversed_vocabulary = NoIteration(memory._reversed_vocabulary)
+        self.assertEqual([item.id for item in memory.search("ication for bl")], [both])
+        self.assertEqual([item.id for item in memory.search("dicatio")], [both])
+        self.assertEqual([item.id for item in memory.search("ssure")], [both])
+        self.assertEqual(len(memory.search("ller12 not")), 1)
+        with self.assertRaises(AssertionError):
+            memory.search("ic")
+    
+    def test_queries_without_words_scan_substrings(self):
+        memory = ShortTermMemory()
+        item_id = memory.add("a - b")
+        memory.add("a b")
+        
+        self.assertEqual([item.id for item in memory.search(" - ")], [item_id])
+    
+    def test_index_follows_removal_eviction_and_expiry(self):
+        memory = ShortTermMemory(max_items=2)
+        removed = memory.add("removed word")
+        memory.remove(removed)
+        memory.add("evicted word")
+        kept = memory.add("kept word")
+        memory.add("expired word", ttl=-1)
+        
+        self.assertEqual([item.id for item in memory.search("word")], [kept])
+        memory.add("another")
+        self.assertEqual(sorted(memory._postings), ["another", "kept", "word"])
+        self.assertEqual(memory._vocabulary, ["another", "kept", "word"])
+        self.assertEqual(memory._reversed_vocabulary, ["drow", "rehtona", "tpek"])
+        self.assertEqual(memory._ngrams['ord'], {"word"})
+        self.assertNotIn('ved', memory._ngrams)
+        
+        memory.clear()
+        self.assertEqual(memory._vocabulary, [])
+        self.assertEqual(memory._ngrams, {})
+        self.assertEqual(memory.search("kept"), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,636 @@
+"""
+Unit tests for the vector store.
+"""
+
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from core.memory.vector_store import EXACT_FILTER_LIMIT, VectorStore
+
+DIMENSION = 16
+
+def random_vectors(count: int, seed: int = 0) -> np.ndarray:
+    """Generate reproducible float32 test vectors."""
+    return np.random.default_rng(seed).random((count, DIMENSION), dtype=np.float32)
+
+class VectorStoreTestCase(unittest.TestCase):
+    """Base test case providing a temporary store directory."""
+    
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store_path = Path(tmp.name)
+    
+    def make_store(self, subdir: str = "", **kwargs) -> VectorStore:
+        """Create a store in the temporary directory."""
+        kwargs.setdefault('dimension', DIMENSION)
+        store = VectorStore(store_path=str(self.store_path / subdir), **kwargs)
+        self.addCleanup(store.metadata.close)
+        return store
+    
+    def reopen(self, **kwargs) -> VectorStore:
+        """Load the store saved at the temporary directory."""
+        store = self.make_store(**kwargs)
+        store.load()
+        return store
+    
+    def nearest(self, store: VectorStore, vector: np.ndarray, **kwargs) -> int:
+        """Get the ID of the nearest stored vector."""
+        return store.search(vector, k=1, **kwargs)[0]['vector_id']
+
+class TestMetadataIndex(VectorStoreTestCase):
+    """Metadata is keyed by vector ID."""
+    
+    def test_search_resolves_metadata_by_id(self):
+        vectors = random_vectors(10)
+        store = self.make_store()
+        store.add_vectors(vectors, [{'text': f"m{i}"} for i in range(10)])
+        
+        results = store.search(vectors[6], k=3)
+        self.assertEqual(results[0]['vector_id'], 6)
+        for result in results:
+            self.assertEqual(result['metadata']['text'], f"m{result['vector_id']}")
+            self.assertEqual(result['metadata']['vector_id'], result['vector_id'])
+    
+    def test_update_and_get_vector_by_id(self):
+        vectors = random_vectors(5)
+        store = self.make_store()
+        store.add_vectors(vectors)
+        
+        store.update_metadata(2, {'text': "updated"})
+        self.assertEqual(store.metadata[2]['text'], "updated")
+        self.assertIn('updated_at', store.metadata[2])
+        np.testing.assert_allclose(store.get_vector(4), vectors[4])
+        self.assertIsNone(store.get_vector(5))
+
+class TestApproximateIndexes(VectorStoreTestCase):
+    """Training and searching of approximate indexes."""
+    
+    def test_ivf_trains_on_added_vectors(self):
+        vectors = random_vectors(1000)
+        store = self.make_store(index_type="IVF16,Flat")
+        store.add_vectors(vectors)
+        
+        self.assertTrue(store.index.is_trained)
+        self.assertEqual(self.nearest(store, vectors[123], nprobe=16), 123)
+    
+    def test_hnsw_search(self):
+        vectors = random_vectors(200)
+        store = self.make_store(index_type="HNSW32")
+        store.add_vectors(vectors)
+        
+        self.assertEqual(self.nearest(store, vectors[42], ef_search=128), 42)
+    
+    def test_auto_ivf_switch_survives_reload(self):
+        vectors = random_vectors(400)
+        store = self.make_store(auto_ivf_threshold=400)
+        store.add_vectors(vectors[:399])
+        self.assertEqual(store.index_type, "L2")
+        
+        store.add_vectors(vectors[399:])
+        self.assertTrue(store.index_type.startswith("IVF"))
+        self.assertEqual(self.nearest(store, vectors[100], nprobe=100), 100)
+        
+        store.save()
+        loaded = self.reopen()
+        self.assertEqual(loaded.index_type, store.index_type)
+        self.assertEqual(loaded.get_stats()['num_vectors'], 400)
+        self.assertEqual(self.nearest(loaded, vectors[250], nprobe=100), 250)
+    
+    def test_switch_after_first_save_survives_reload(self):
+        vectors = random_vectors(400)
+        store = self.make_store(auto_ivf_threshold=400)
+        store.add_vectors(vectors[:100])
+        store.save()
+        store.add_vectors(vectors[100:])
+        store.save()
+        
+        # The reload does not switch by itself, without the threshold
+        loaded = self.reopen()
+        self.assertEqual(loaded.index_type, store.index_type)
+        self.assertTrue(loaded.index_type.startswith("IVF"))
+        self.assertEqual(loaded.index.ntotal, 400)
+        self.assertEqual(self.nearest(loaded, vectors[250], nprobe=100), 250)
+    
+    def test_training_after_save_writes_checkpoint(self):
+        store = self.make_store(index_type="IVF4,Flat")
+        vectors = random_vectors(store.training_size())
+        store.add_vectors(vectors[:10])
+        store.save()
+        self.assertEqual(list(self.store_path.glob("checkpoint-*")), [])
+        
+        store.add_vectors(vectors[10:])
+        store.save()
+        self.assertEqual(len(list(self.store_path.glob("checkpoint-*"))), 1)
+        loaded = self.reopen(index_type="IVF4,Flat")
+        self.assertTrue(loaded.index.is_trained)
+        self.assertEqual(loaded.get_stats()['untrained_vectors'], 0)
+    
+    def test_single_vector_adds_before_training(self):
+        vectors = random_vectors(20)
+        for index_type in ("IVF64,Flat", "PQ", "SQ8"):
+            with self.subTest(index_type=index_type):
+                store = self.make_store(index_type.replace(',', '_'), index_type=index_type)
+                for vector in vectors:
+                    store.add_vectors([vector])
+                
+                self.assertFalse(store.index.is_trained)
+                self.assertEqual(store.get_stats()['untrained_vectors'], 20)
+                self.assertEqual(self.nearest(store, vectors[10]), 10)
+                
+                store.delete_vector(10)
+                self.assertNotEqual(self.nearest(store, vectors[10]), 10)
+    
+    def test_trains_once_enough_vectors_are_added(self):
+        store = self.make_store(index_type="SQ8")
+        vectors = random_vectors(store.training_size() + 10)
+        store.add_vectors(vectors[:10])
+        store.save()
+        store.add_vectors(vectors[10:])
+        
+        self.assertTrue(store.index.is_trained)
+        self.assertEqual(store.get_stats()['untrained_vectors'], 0)
+        self.assertEqual(store.index.ntotal, len(vectors))
+        self.assertEqual(self.nearest(store, vectors[5]), 5)
+        
+        store.save()
+        loaded = self.reopen(index_type="SQ8")
+        self.assertTrue(loaded.index.is_trained)
+        self.assertEqual(self.nearest(loaded, vectors[700]), 700)
+    
+    def test_checkpoint_keeps_untrained_vectors(self):
+        vectors = random_vectors(8)
+        store = self.make_store(index_type="IVF64,Flat")
+        store.add_vectors(vectors)
+        store.checkpoint()
+        
+        loaded = self.reopen(index_type="IVF64,Flat")
+        self.assertEqual(loaded.get_stats()['untrained_vectors'], 8)
+        self.assertEqual(self.nearest(loaded, vectors[6]), 6)
+
+class TestDeletion(VectorStoreTestCase):
+    """Vectors are deleted in place under stable IDs."""
+    
+    def test_delete_keeps_ids_stable(self):
+        vectors = random_vectors(1000)
+        for index_type in ("L2", "IVF16,Flat"):
+            with self.subTest(index_type=index_type):
+                store = self.make_store(index_type.replace(',', '_'), index_type=index_type)
+                store.add_vectors(vectors[:999])
+                
+                self.assertEqual(store.delete_vectors([3, 500, 3]), 2)
+                self.assertEqual(store.index.ntotal, 997)
+                self.assertIsNone(store.get_vector(3))
+                self.assertNotEqual(self.nearest(store, vectors[3], nprobe=16), 3)
+                self.assertEqual(self.nearest(store, vectors[4], nprobe=16), 4)
+                
+                # Deleted IDs are not reused
+                self.assertEqual(store.add_vectors(vectors[999:]), [999])
+                np.testing.assert_allclose(store.get_vector(999), vectors[999])
+    
+    def test_next_id_survives_reload(self):
+        vectors = random_vectors(5)
+        store = self.make_store()
+        store.add_vectors(vectors[:4])
+        store.delete_vector(3)
+        store.save()
+        
+        loaded = self.reopen()
+        self.assertEqual(loaded.add_vectors(vectors[4:]), [4])
+        self.assertEqual(self.nearest(loaded, vectors[4]), 4)
+
+class TestSegmentReplay(VectorStoreTestCase):
+    """Saves are log segments, replayed on load until a checkpoint."""
+    
+    def test_load_replays_segments_saved_before_crash(self):
+        vectors = random_vectors(20)
+        store = self.make_store(max_segments=100)
+        store.add_vectors(vectors[:10], [{'text': f"m{i}"} for i in range(10)])
+        store.save()
+        store.add_vectors(vectors[10:], [{'text': f"m{i}"} for i in range(10, 20)])
+        store.delete_vectors([3, 15])
+        store.update_metadata(4, {'text': "updated"})
+        store.save()
+        
+        # Crash: the store is dropped without a checkpoint
+        self.assertEqual(store.get_stats()['unsaved_segments'], 2)
+        self.assertFalse(any(self.store_path.glob("checkpoint-*")))
+        
+        loaded = self.reopen(max_segments=100)
+        self.assertEqual(loaded.get_stats()['num_vectors'], 18)
+        self.assertNotIn(3, loaded.metadata)
+        self.assertNotIn(15, loaded.metadata)
+        self.assertEqual(loaded.metadata[4]['text'], "updated")
+        self.assertEqual(loaded.metadata[12]['text'], "m12")
+        self.assertEqual(self.nearest(loaded, vectors[12]), 12)
+        self.assertNotEqual(self.nearest(loaded, vectors[15]), 15)
+        
+        # New IDs continue after the replayed ones
+        self.assertEqual(loaded.add_vectors(random_vectors(1, seed=1)), [20])
+    
+    def test_replay_recovers_metadata_commit_lost_in_crash(self):
+        vectors = random_vectors(10)
+        store = self.make_store(max_segments=100)
+        store.add_vectors(vectors[:5])
+        store.save()
+        
+        # Crash after the segment is written but before metadata commits
+        store.metadata.commit = lambda: None
+        store.add_vectors(vectors[5:], [{'text': f"m{i}"} for i in range(5, 10)])
+        store.save()
+        store.metadata.close()
+        
+        loaded = self.reopen(max_segments=100)
+        self.assertEqual(loaded.get_stats()['num_vectors'], 10)
+        self.assertEqual(loaded.metadata[7]['text'], "m7")
+        self.assertEqual(self.nearest(loaded, vectors[7]), 7)
+    
+    def test_partial_segment_is_ignored(self):
+        vectors = random_vectors(5)
+        store = self.make_store(max_segments=100)
+        store.add_vectors(vectors)
+        store.save()
+        
+        # A crash while writing leaves only the temporary file
+        (self.store_path / "wal" / "segment-0000000002.tmp").write_bytes(b"partial")
+        
+        loaded = self.reopen(max_segments=100)
+        self.assertEqual(loaded.get_stats()['num_vectors'], 5)
+    
+    def test_checkpoint_merges_segments(self):
+        vectors = random_vectors(30)
+        store = self.make_store(max_segments=100)
+        for start in range(0, 20, 5):
+            store.add_vectors(vectors[start:start + 5])
+            store.save()
+        store.delete_vector(2)
+        store.checkpoint()
+        
+        self.assertEqual(list((self.store_path / "wal").glob("segment-*.npz")), [])
+        self.assertEqual(len(list(self.store_path.glob("checkpoint-*"))), 1)
+        self.assertEqual(store.get_stats()['unsaved_segments'], 0)
+        
+        # Segments saved after the checkpoint are replayed on top of it
+        store.add_vectors(vectors[20:])
+        store.save()
+        
+        loaded = self.reopen(max_segments=100)
+        self.assertEqual(loaded.get_stats()['num_vectors'], 29)
+        self.assertNotIn(2, loaded.metadata)
+        self.assertEqual(self.nearest(loaded, vectors[25]), 25)
+    
+    def test_background_checkpoint_after_max_segments(self):
+        vectors = random_vectors(6)
+        store = self.make_store(max_segments=3)
+        for vector in vectors:
+            store.add_vectors([vector])
+            store.save()
+        store._checkpoint_thread.join()
+        
+        loaded = self.reopen()
+        self.assertEqual(loaded.get_stats()['num_vectors'], 6)
+        self.assertEqual(self.nearest(loaded, vectors[4]), 4)
+
+class TestTombstoneCompaction(VectorStoreTestCase):
+    """HNSW indexes cannot remove vectors and tombstone them instead."""
+    
+    def test_delete_and_compact_hnsw(self):
+        vectors = random_vectors(100)
+        store = self.make_store(index_type="HNSW32", compaction_threshold=0.2)
+        store.add_vectors(vectors)
+        
+        store.delete_vectors(range(10))
+        self.assertEqual(store.get_stats()['num_tombstones'], 10)
+        self.assertEqual(store.index.ntotal, 100)
+        results = store.search(vectors[5], k=5)
+        self.assertTrue(all(result['vector_id'] >= 10 for result in results))
+        
+        # Passing the threshold compacts in the background
+        store.delete_vectors(range(10, 30))
+        store._compaction_thread.join()
+        self.assertEqual(store.get_stats()['num_tombstones'], 0)
+        self.assertEqual(store.index.ntotal, 70)
+        self.assertEqual(self.nearest(store, vectors[50]), 50)
+        self.assertGreaterEqual(self.nearest(store, vectors[20]), 30)
+        
+        store.save()
+        loaded = self.reopen(index_type="HNSW32")
+        self.assertEqual(loaded.get_stats()['num_vectors'], 70)
+        self.assertEqual(loaded.index.ntotal, 70)
+    
+    def test_tombstones_survive_save_and_load(self):
+        vectors = random_vectors(50)
+        store = self.make_store(index_type="HNSW32", compaction_threshold=0.5)
+        store.add_vectors(vectors)
+        store.delete_vectors([7, 8])
+        store.checkpoint()
+        
+        loaded = self.reopen(index_type="HNSW32")
+        self.assertEqual(loaded.tombstones, {7, 8})
+        self.assertNotIn(7, [result['vector_id'] for result in loaded.search(vectors[7], k=5)])
+        
+        loaded.compact()
+        self.assertEqual(loaded.index.ntotal, 48)
+
+class TestMetadataFilters(VectorStoreTestCase):
+    """Searches restricted to vectors whose metadata matches a filter."""
+    
+    def add_people(self, store: VectorStore, vectors: np.ndarray) -> None:
+        """Add vectors with user, score and tag metadata."""
+        store.add_vectors(vectors, [
+            {'user': f"u{i % 3}", 'score': i, 'tags': ["even" if i % 2 == 0 else "odd"]}
+            for i in range(len(vectors))
+        ])
+    
+    def matches(self, meta: dict, field: str, condition) -> bool:
+        """Evaluate a filter clause in Python, for comparison."""
+        if field == '$or':
+            return any(all(self.matches(meta, f, c) for f, c in sub.items()) for sub in condition)
+        if field == '$and':
+            return all(all(self.matches(meta, f, c) for f, c in sub.items()) for sub in condition)
+        values = meta[field] if isinstance(meta[field], list) else [meta[field]]
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        checks = {
+            '$eq': lambda v, a: type(v) is type(a) and v == a,
+            '$ne': lambda v, a: not (type(v) is type(a) and v == a),
+            '$gt': lambda v, a: v > a,
+            '$gte': lambda v, a: v >= a,
+            '$lt': lambda v, a: v < a,
+            '$lte': lambda v, a: v <= a,
+            '$in': lambda v, a: v in a,
+            '$nin': lambda v, a: v not in a
+        }
+        return all(any(checks[op](v, arg) for v in values) for op, arg in condition.items())
+    
+    def test_indexed_and_scanned_fields_match_alike(self):
+        vectors = random_vectors(30)
+        filters = [
+            {'user': "u1"},
+            {'user': {'$ne': "u1"}, 'score': {'$lt': 10}},
+            {'score': {'$gte': 5, '$lte': 8}},
+            {'user': {'$in': ["u0", "u2"]}, 'tags': "odd"},
+            {'$or': [{'score': 0}, {'user': {'$nin': ["u0", "u1"]}}]},
+            {'$and': [{'score': {'$gt': 20}}, {'tags': "even"}]},
+            {'score': "5"}
+        ]
+        scanned = self.make_store("scanned")
+        indexed = self.make_store("indexed", indexed_fields=['user', 'score', 'tags'])
+        self.add_people(scanned, vectors)
+        self.add_people(indexed, vectors)
+        
+        for where in filters:
+            with self.subTest(where=where):
+                expected = {
+                    i for i in range(30)
+                    if all(self.matches(scanned.metadata[i], where_field, condition)
+                           for where_field, condition in where.items())
+                }
+                self.assertEqual(scanned.match_ids(where), expected)
+                self.assertEqual(indexed.match_ids(where), expected)
+    
+    def test_filtered_search_returns_only_matches(self):
+        vectors = random_vectors(3000)
+        for index_type in ("L2", "HNSW32"):
+            with self.subTest(index_type=index_type):
+                store = self.make_store(index_type, index_type=index_type, indexed_fields=['user'])
+                self.add_people(store, vectors)
+                
+                # Few matches are scored exactly, many go through a selector
+                for where in ({'score': {'$lt': 30}}, {'user': "u2"}):
+                    results = store.search(vectors[1], k=5, where=where, ef_search=256)
+                    self.assertEqual(len(results), 5)
+                    matching = store.match_ids(where)
+                    self.assertTrue(all(result['vector_id'] in matching for result in results))
+                
+                self.assertEqual(self.nearest(store, vectors[2], where={'user': "u2"}), 2)
+    
+    def test_index_follows_updates_and_deletes(self):
+        vectors = random_vectors(6)
+        store = self.make_store(indexed_fields=['user'])
+        self.add_people(store, vectors)
+        
+        store.update_metadata(0, {'user': "u9"})
+        store.delete_vector(3)
+        self.assertEqual(store.match_ids({'user': "u0"}), set())
+        self.assertEqual(store.match_ids({'user': "u9"}), {0})
+        self.assertEqual(self.nearest(store, vectors[3], where={'user': {'$in': ["u0", "u9"]}}), 0)
+
+class TestMetadataProjection(VectorStoreTestCase):
+    """Search results restricted to selected metadata fields."""
+    
+    def test_fields_selects_metadata(self):
+        vectors = random_vectors(10)
+        store = self.make_store(indexed_fields=['user'])
+        store.add_vectors(vectors, [{'text': f"m{i}", 'user': f"u{i % 2}"} for i in range(10)])
+        
+        result = store.search(vectors[3], k=1, fields=['text'])[0]
+        self.assertEqual(result['metadata'], {'text': "m3"})
+        batch = store.search_batch(vectors[:2], k=1, where={'user': "u1"}, fields=['user', 'missing'])
+        self.assertTrue(all(vector_id % 2 == 1 for vector_id in batch.vector_ids[:, 0]))
+        self.assertEqual(batch.metadata, [[{'user': "u1"}], [{'user': "u1"}]])
+
+class TestBatchSearch(VectorStoreTestCase):
+    """Several queries searched with one index call."""
+    
+    def test_batch_matches_single_searches(self):
+        vectors = random_vectors(50)
+        store = self.make_store()
+        store.add_vectors(vectors, [{'text': f"m{i}", 'group': i % 2} for i in range(50)])
+        queries = random_vectors(4, seed=1)
+        
+        for where in (None, {'group': 1}):
+            with self.subTest(where=where):
+                batch = store.search_batch(queries, k=3, where=where)
+                self.assertEqual(batch.vector_ids.shape, (4, 3))
+                self.assertEqual(batch.distances.shape, (4, 3))
+                for row, query in enumerate(queries):
+                    single = store.search(query, k=3, where=where)
+                    self.assertEqual(batch.vector_ids[row].tolist(), [r['vector_id'] for r in single])
+                    np.testing.assert_allclose(
+                        batch.distances[row], [r['distance'] for r in single], rtol=1e-5
+                    )
+                    self.assertEqual(batch.metadata[row], [r['metadata'] for r in single])
+    
+    def test_batch_pads_missing_results(self):
+        vectors = random_vectors(2)
+        store = self.make_store()
+        store.add_vectors(vectors)
+        
+        batch = store.search_batch(vectors[0], k=4, include_metadata=False)
+        self.assertEqual(batch.vector_ids.tolist(), [[0, 1, -1, -1]])
+        self.assertEqual(batch.metadata, [])
+
+class TestMemoryMappedLoad(VectorStoreTestCase):
+    """Stores mapped read-only from disk."""
+    
+    def test_mapped_store_matches_loaded_store(self):
+        vectors = random_vectors(40)
+        store = self.make_store(index_type="IVF4,Flat", indexed_fields=['group'])
+        store.add_vectors(vectors, [{'text': f"m{i}", 'group': i % 4} for i in range(40)])
+        store.checkpoint()
+        
+        mapped = self.make_store(indexed_fields=['group'])
+        mapped.load(memory_map=True)
+        self.assertTrue(mapped.read_only)
+        self.assertEqual(len(mapped.metadata), 40)
+        self.assertEqual(mapped.metadata[17]['text'], "m17")
+        self.assertNotIn(40, mapped.metadata)
+        self.assertEqual(self.nearest(mapped, vectors[17], nprobe=4), 17)
+        self.assertEqual(mapped.match_ids({'group': 3}), set(range(3, 40, 4)))
+        self.assertEqual(self.nearest(mapped, vectors[5], where={'group': 1}, nprobe=4), 5)
+    
+    def test_mapped_store_shows_only_checkpointed_metadata(self):
+        vectors = random_vectors(20)
+        store = self.make_store(indexed_fields=['group'])
+        store.add_vectors(vectors[:10], [{'group': i % 2} for i in range(10)])
+        store.save()
+        
+        mapped = self.make_store(indexed_fields=['group'])
+        mapped.load(memory_map=True)
+        self.assertEqual(len(mapped.metadata), 0)
+        self.assertEqual(mapped.search(vectors[4], k=3, where={'group': 0}), [])
+        self.assertIsNone(mapped.get_vector(4))
+        
+        store.checkpoint()
+        store.add_vectors(vectors[10:], [{'group': i % 2} for i in range(10, 20)])
+        store.save()
+        
+        mapped = self.make_store(indexed_fields=['group'])
+        mapped.load(memory_map=True)
+        self.assertEqual(len(mapped.metadata), 10)
+        self.assertEqual(mapped.match_ids({'group': 0}), {0, 2, 4, 6, 8})
+        results = mapped.search(vectors[14], k=3, where={'group': 0})
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result['vector_id'] < 10 for result in results))
+        self.assertIsNone(mapped.get_vector(14))
+        np.testing.assert_allclose(mapped.get_vector(4), vectors[4])
+    
+    def test_mapped_store_rejects_writes(self):
+        vectors = random_vectors(3)
+        store = self.make_store()
+        store.add_vectors(vectors)
+        store.save()
+        
+        mapped = self.make_store()
+        mapped.load(memory_map=True)
+        with self.assertRaises(RuntimeError):
+            mapped.add_vectors(vectors)
+        with self.assertRaises(RuntimeError):
+            mapped.delete_vector(0)
+        with self.assertRaises(RuntimeError):
+            mapped.save()
+
+class TestCompressedStorage(VectorStoreTestCase):
+    """Compressed codes with optional exact re-ranking."""
+    
+    def test_compressed_indexes_find_neighbours(self):
+        vectors = random_vectors(600)
+        for index_type in ("SQfp16", "SQ8", "PQ4"):
+            with self.subTest(index_type=index_type):
+                store = self.make_store(index_type, index_type=index_type, rerank=True)
+                store.add_vectors(vectors)
+                
+                self.assertEqual(self.nearest(store, vectors[77]), 77)
+                self.assertAlmostEqual(store.search(vectors[77], k=1)[0]['distance'], 0.0, places=5)
+                np.testing.assert_allclose(store.get_vector(300), vectors[300])
+    
+    def test_bytes_per_vector(self):
+        vectors = random_vectors(600)
+        flat = self.make_store("flat")
+        sq8 = self.make_store("sq8", index_type="SQ8")
+        reranked = self.make_store("reranked", index_type="SQ8", rerank=True)
+        for store in (flat, sq8, reranked):
+            store.add_vectors(vectors)
+        
+        self.assertEqual(flat.get_stats()['bytes_per_vector'], 4 * DIMENSION + 8)
+        self.assertEqual(sq8.get_stats()['bytes_per_vector'], DIMENSION + 8)
+        self.assertEqual(reranked.get_stats()['bytes_per_vector'], 5 * DIMENSION + 8)
+    
+    def test_reranked_store_survives_reload(self):
+        vectors = random_vectors(300)
+        store = self.make_store(index_type="SQ8", rerank=True)
+        store.add_vectors(vectors)
+        store.save()
+        
+        loaded = self.reopen(index_type="SQ8", rerank=True)
+        self.assertEqual(self.nearest(loaded, vectors[123]), 123)
+        np.testing.assert_allclose(loaded.get_vector(5), vectors[5])
+    
+    def test_replaced_store_drops_side_file(self):
+        old_vectors = random_vectors(50, seed=1)
+        store = self.make_store(index_type="SQ8", rerank=True)
+        store.add_vectors(old_vectors)
+        store.save()
+        
+        vectors = random_vectors(10)
+        replacement = self.make_store()
+        replacement.add_vectors(vectors)
+        replacement.save()
+        self.assertFalse((self.store_path / "vectors.f32").exists())
+        
+        loaded = self.reopen(rerank=True)
+        np.testing.assert_allclose(loaded.get_vector(5), vectors[5])
+    
+    def test_pq_filter_matching_many_vectors(self):
+        store = self.make_store(index_type="PQ")
+        vectors = random_vectors(store.training_size() + 100)
+        store.add_vectors(vectors)
+        self.assertTrue(store.index.is_trained)
+        
+        where = {'vector_id': {'$gte': 2500}}
+        self.assertGreater(len(store.match_ids(where)), EXACT_FILTER_LIMIT)
+        results = store.search(vectors[100], k=5, where=where)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result['vector_id'] >= 2500 for result in results))
+
+class TestLegacyStore(VectorStoreTestCase):
+    """Stores saved as index.faiss and metadata.pkl by earlier versions."""
+    
+    def write_baseline_store(self, vectors: np.ndarray) -> None:
+        """Save a store the way the first version of VectorStore did."""
+        index = faiss.IndexFlatL2(DIMENSION)
+        index.add(vectors)
+        faiss.write_index(index, str(self.store_path / "index.faiss"))
+        
+        metadata = [
+            {'text': f"m{i}", 'vector_id': i, 'added_at': "2025-04-25T14:47:03"}
+            for i in range(len(vectors))
+        ]
+        with open(self.store_path / "metadata.pkl", 'wb') as f:
+            pickle.dump(metadata, f)
+    
+    def test_loads_baseline_store(self):
+        vectors = random_vectors(12)
+        self.write_baseline_store(vectors)
+        
+        store = self.reopen()
+        self.assertEqual(store.get_stats()['num_vectors'], 12)
+        result = store.search(vectors[9], k=1)[0]
+        self.assertEqual(result['vector_id'], 9)
+        self.assertEqual(result['metadata']['text'], "m9")
+        np.testing.assert_allclose(store.get_vector(3), vectors[3])
+    
+    def test_baseline_store_is_migrated_by_checkpoint(self):
+        vectors = random_vectors(13)
+        self.write_baseline_store(vectors[:12])
+        
+        store = self.reopen()
+        self.assertEqual(store.add_vectors(vectors[12:]), [12])
+        store.delete_vector(0)
+        store.checkpoint()
+        self.assertFalse((self.store_path / "metadata.pkl").exists())
+        self.assertFalse((self.store_path / "index.faiss").exists())
+        
+        loaded = self.reopen()
+        self.assertEqual(loaded.get_stats()['num_vectors'], 12)
+        self.assertEqual(self.nearest(loaded, vectors[12]), 12)
+        self.assertEqual(loaded.metadata[5]['text'], "m5")
+
+if __name__ == '__main__':
+    unittest.main()